@@ -91,46 +91,196 @@ Position = Tuple[int, int]
 """A position on the board, as (x, y) coordinates."""
 
 
-class Vector(list):
-    def __init__(self, *args, **kwargs):
-        list.__init__(self, *args, **kwargs)
+def _values_of(other) -> list:
+    return other._values if isinstance(other, Vector) else other
+
+
+class Vector:
+    """
+    A fixed-width vector of counts, backed by a single list stored in a slot.
+
+    Supports indexing, iteration and element-wise arithmetic and comparisons.
+    Comparisons are element-wise (`a <= b` means every count in `a` is at most the matching count in `b`)
+    and do not allocate; use the in-place operators (`+=`, `-=`) to avoid allocating a new vector.
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values=()):
+        self._values = list(values)
+
+    def _new(self, values: list) -> "Vector":
+        result = object.__new__(type(self))
+        result._values = values
+        return result
+
+    def copy(self) -> "Vector":
+        return self._new(self._values[:])
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __reversed__(self):
+        return reversed(self._values)
+
+    def __contains__(self, item):
+        return item in self._values
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        self._values[index] = value
+
+    def index(self, value, *args) -> int:
+        return self._values.index(value, *args)
+
+    def count(self, value) -> int:
+        return self._values.count(value)
+
+    def __eq__(self, other):
+        if isinstance(other, (Vector, list)):
+            return self._values == _values_of(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._values)
+
+    def __getstate__(self):
+        return self._values
+
+    def __setstate__(self, state):
+        self._values = state
 
     def __add__(self, other: "Vector"):
-        return Vector([x + y for x, y in zip(self, other)])
+        return self._new([x + y for x, y in zip(self._values, _values_of(other))])
 
     def __sub__(self, other: "Vector"):
-        return Vector([x - y for x, y in zip(self, other)])
+        return self._new([x - y for x, y in zip(self._values, _values_of(other))])
 
     def __iadd__(self, other: "Vector"):
-        assert len(self) == len(other)
-        for i in range(len(self)):
-            self[i] += other[i]
+        a, b = self._values, _values_of(other)
+        assert len(a) == len(b)
+        for i in range(len(a)):
+            a[i] += b[i]
         return self
 
     def __isub__(self, other: "Vector"):
-        assert len(self) == len(other)
-        for i in range(len(self)):
-            self[i] -= other[i]
+        a, b = self._values, _values_of(other)
+        assert len(a) == len(b)
+        for i in range(len(a)):
+            a[i] -= b[i]
         return self
 
     def __le__(self, other: "Vector"):
-        return all([x <= y for x, y in zip(self, other)])
+        for x, y in zip(self._values, _values_of(other)):
+            if x > y:
+                return False
+        return True
 
     def __lt__(self, other: "Vector"):
-        return all([x < y for x, y in zip(self, other)])
+        for x, y in zip(self._values, _values_of(other)):
+            if x >= y:
+                return False
+        return True
 
     def __ge__(self, other: "Vector"):
-        return all([x >= y for x, y in zip(self, other)])
+        for x, y in zip(self._values, _values_of(other)):
+            if x < y:
+                return False
+        return True
 
     def __gt__(self, other: "Vector"):
-        return all([x > y for x, y in zip(self, other)])
+        for x, y in zip(self._values, _values_of(other)):
+            if x <= y:
+                return False
+        return True
 
 
-class ResourceCounts(Vector):
+class _Vector5(Vector):
+    """A `Vector` of exactly 5 counts, with the arithmetic and comparisons unrolled."""
+
+    __slots__ = ()
+
+    def __add__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        assert len(b) == 5
+        return self._new(
+            [a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3], a[4] + b[4]]
+        )
+
+    def __sub__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        assert len(b) == 5
+        return self._new(
+            [a[0] - b[0], a[1] - b[1], a[2] - b[2], a[3] - b[3], a[4] - b[4]]
+        )
+
+    def __iadd__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        assert len(b) == 5
+        a[0] += b[0]
+        a[1] += b[1]
+        a[2] += b[2]
+        a[3] += b[3]
+        a[4] += b[4]
+        return self
+
+    def __isub__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        assert len(b) == 5
+        a[0] -= b[0]
+        a[1] -= b[1]
+        a[2] -= b[2]
+        a[3] -= b[3]
+        a[4] -= b[4]
+        return self
+
+    def __le__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        return (
+            a[0] <= b[0]
+            and a[1] <= b[1]
+            and a[2] <= b[2]
+            and a[3] <= b[3]
+            and a[4] <= b[4]
+        )
+
+    def __lt__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        return (
+            a[0] < b[0] and a[1] < b[1] and a[2] < b[2] and a[3] < b[3] and a[4] < b[4]
+        )
+
+    def __ge__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        return (
+            a[0] >= b[0]
+            and a[1] >= b[1]
+            and a[2] >= b[2]
+            and a[3] >= b[3]
+            and a[4] >= b[4]
+        )
+
+    def __gt__(self, other: "_Vector5"):
+        a, b = self._values, _values_of(other)
+        return (
+            a[0] > b[0] and a[1] > b[1] and a[2] > b[2] and a[3] > b[3] and a[4] > b[4]
+        )
+
+
+class ResourceCounts(_Vector5):
     """The count of each resource, indexed by the `Resources` enum."""
 
+    __slots__ = ()
+
     def __init__(self, lumber=0, brick=0, grain=0, wool=0, ore=0):
-        Vector.__init__(self, [lumber, brick, grain, wool, ore])
+        self._values = [lumber, brick, grain, wool, ore]
 
     def __str__(self):
         return ", ".join(
@@ -141,32 +291,16 @@ class ResourceCounts(Vector):
             ]
         )
 
-    def __add__(self, other: "ResourceCounts"):
-        assert len(self) == len(other)
-        return ResourceCounts(*[x + y for x, y in zip(self, other)])
-
-    def __sub__(self, other: "ResourceCounts"):
-        assert len(self) == len(other)
-        return ResourceCounts(*[x - y for x, y in zip(self, other)])
-
 
-class DevelopmentCardCounts(Vector):
+class DevelopmentCardCounts(_Vector5):
     """The count of each development card, indexed by the `DevelopmentCards` enum."""
 
+    __slots__ = ()
+
     def __init__(
         self, knight=0, road_bulding=0, year_of_plenty=0, monopoly=0, victory_point=0
     ):
-        Vector.__init__(
-            self, [knight, road_bulding, year_of_plenty, monopoly, victory_point]
-        )
-
-    def __add__(self, other: "DevelopmentCardCounts"):
-        assert len(self) == len(other)
-        return DevelopmentCardCounts(*[x + y for x, y in zip(self, other)])
-
-    def __sub__(self, other: "DevelopmentCardCounts"):
-        assert len(self) == len(other)
-        return DevelopmentCardCounts(*[x - y for x, y in zip(self, other)])
+        self._values = [knight, road_bulding, year_of_plenty, monopoly, victory_point]
 
 
 @dataclass
@@ -191,6 +325,78 @@ class Trade:
         )
 
 
+@dataclass
+class Action:
+    """A data class describing a call of an `API` action method, for `API.execute_plan`."""
+
+    method: str
+    """The name of the action method, such as `"build_road"`."""
+    arguments: tuple = ()
+    """The arguments of the method, such as `((position_a, position_b),)` for `"build_road"`."""
+
+
+class Events(IntEnum):
+    """An enum representing all event types. See `API.get_events_since`."""
+
+    ROLL_DICE = 0
+    """`value` is the roll."""
+
+    PRODUCE = 1
+    """`resource_counts` are the resources produced by a roll, or given for the second setup settlement."""
+
+    DROP_RESOURCES = 2
+    """`resource_counts` are the (negative) resources dropped after a 7."""
+
+    BUILD_SETTLEMENT = 3
+    """`position` is the settlement's intersection and `resource_counts` its (negative) price, which is 0 in the setup stage."""
+
+    BUILD_CITY = 4
+    """`position` is the city's intersection and `resource_counts` its (negative) price."""
+
+    BUILD_ROAD = 5
+    """`edge` is the road's edge and `resource_counts` its (negative) price, which is 0 in the setup stage and with a `DevelopmentCards.ROAD_BUILDING` card."""
+
+    BUY_DEVELOPMENT_CARD = 6
+    """`resource_counts` is the (negative) price, and `value` is the bought `DevelopmentCards`, or None if it isn't yours."""
+
+    PLAY_DEVELOPMENT_CARD = 7
+    """`value` is the played `DevelopmentCards`, and `resource_counts` are the resources taken with a `DevelopmentCards.YEAR_OF_PLENTY` card."""
+
+    MOVE_ROBBER = 8
+    """`position` is the robber's new terrain, and `other_player_index` the player to steal from, or None."""
+
+    STEAL = 9
+    """`resource_counts` are the resources taken from `other_player_index` by the robber (None if you're neither of them) or by a `DevelopmentCards.MONOPOLY` card."""
+
+    MARITIME_TRADE = 10
+    """`resource_counts` are the resources paid (negative) and received from the bank."""
+
+    TRADE = 11
+    """`resource_counts` are the resources `player_index` gave (negative) and received in a trade with `other_player_index`, who accepted it."""
+
+    END_TURN = 12
+    """`player_index` ended their turn."""
+
+
+@dataclass
+class Event:
+    """A data class describing a change in the game, of one of the `Events` types."""
+
+    type: Events
+    player_index: int
+    """The player who acted, or who produced or dropped resources."""
+    other_player_index: Optional[int] = None
+    """The other player involved in a `Events.MOVE_ROBBER`, `Events.STEAL` or `Events.TRADE` event."""
+    position: Optional[Position] = None
+    """The intersection of a building or the terrain of the robber."""
+    edge: Optional[Tuple[Position, Position]] = None
+    """The edge of a road."""
+    resource_counts: Optional[ResourceCounts] = None
+    """The change in the resources of `player_index`, which is negative for resources spent, dropped or given away. In a `Events.STEAL` or `Events.TRADE` event, `other_player_index` lost (or gained) the same counts."""
+    value: Optional[int] = None
+    """The roll, or the development card bought or played."""
+
+
 class API:
     """
     The main access point for your bot. Access this using `self.context` inside your `run` method.
@@ -208,6 +414,41 @@ class API:
 
         raise NotImplementedError()
 
+    def log_info(self, message: str) -> None:
+        """Logs the given message to the simulation's log."""
+
+        raise NotImplementedError()
+
+    def fork(self) -> "API":
+        """
+        Returns a hypothetical copy of the game for lookahead search, sharing nothing with the real game.
+
+        Actions on the copy don't affect the game and don't call any bot methods, and you may run any number of them on your turn.
+        Use `roll_dice` and `end_turn` on the copy to advance it. The copy only knows what you do: the other players are dealt
+        new resources and development cards of the same counts, drawn from the cards you can't see, and the deck is reshuffled.
+        """
+
+        raise NotImplementedError()
+
+    def roll_dice(self, value: Optional[int] = None) -> Exceptions:
+        """
+        Only available on a copy returned by `fork`: roll the dice (or set them to the given value) and distribute resources.
+        Rolling a 7 doesn't make anyone drop resources or move the robber.
+
+        Possible exceptions: `Exceptions.BAD_AMOUNT`, `Exceptions.BAD_TIMING`.
+        """
+
+        raise NotImplementedError()
+
+    def end_turn(self) -> Exceptions:
+        """
+        Only available on a copy returned by `fork`: end your turn and pass it to the next player.
+
+        Possible exceptions: `Exceptions.BAD_TIMING`.
+        """
+
+        raise NotImplementedError()
+
     ### GENERAL ###
 
     def get_player_index(self) -> int:
@@ -215,6 +456,17 @@ class API:
 
         raise NotImplementedError()
 
+    def get_time_remaining(self) -> float:
+        """
+        Returns the seconds left for the current method of your bot, or `math.inf` if there is no time limit.
+
+        Actions run after the time is up return `Exceptions.BAD_TIMING`, so the method's default is used instead
+        (see each `CatanBot` method). Once your time for the whole game is up, your methods aren't called anymore.
+        Use it to deepen a search until the time is almost up.
+        """
+
+        raise NotImplementedError()
+
     ### BOARD GETTERS ###
 
     def get_terrains(self) -> list[Position]:
@@ -302,6 +554,11 @@ class API:
 
         raise NotImplementedError()
 
+    def get_harbor_intersections(self) -> dict[Position, Optional[Resources]]:
+        """Returns the intersections on a harbor and the harbor's resource, or None if a 3-to-1 harbor."""
+
+        raise NotImplementedError()
+
     def get_player_buildings(
         self, player_index: int
     ) -> list[Tuple[Position, Buildings]]:
@@ -314,6 +571,69 @@ class API:
 
         raise NotImplementedError()
 
+    ### PLACEMENT GETTERS ###
+
+    def get_legal_settlement_positions(self) -> list[Position]:
+        """
+        Returns the intersection positions where you may currently build a settlement.
+
+        Only positioning rules are considered, not your resources or remaining settlements.
+        """
+
+        raise NotImplementedError()
+
+    def get_legal_city_positions(self) -> list[Position]:
+        """
+        Returns the positions of your settlements, which you may upgrade to cities.
+
+        Only positioning rules are considered, not your resources or remaining cities.
+        """
+
+        raise NotImplementedError()
+
+    def get_legal_road_edges(self) -> list[Tuple[Position, Position]]:
+        """
+        Returns the edge positions (ends) where you may currently build a road.
+
+        Only positioning rules are considered, not your resources or remaining roads.
+        """
+
+        raise NotImplementedError()
+
+    def get_road_path(
+        self, position: Position
+    ) -> Optional[list[Tuple[Position, Position]]]:
+        """
+        Returns the shortest list of edges you would have to build roads on to reach the given intersection, in the
+        order to build them, or None if other players' roads and buildings block every path.
+
+        The list is empty if your buildings or roads already reach the intersection.
+        """
+
+        raise NotImplementedError()
+
+    ### PRODUCTION GETTERS ###
+
+    def get_production_matrix(self) -> list[ResourceCounts]:
+        """
+        Returns the expected production of every intersection, in the order of `get_intersections`.
+
+        Production is measured in pips per resource: the number of the 36 possible dice outcomes which produce that resource there.
+        The terrain the robber is on doesn't produce.
+        """
+
+        raise NotImplementedError()
+
+    def get_intersection_production(self, position: Position) -> ResourceCounts:
+        """Returns the expected production (see `get_production_matrix`) of the given intersection."""
+
+        raise NotImplementedError()
+
+    def get_player_production(self, player_index: int) -> ResourceCounts:
+        """Returns the expected production (see `get_production_matrix`) of the given player's buildings, where cities count twice."""
+
+        raise NotImplementedError()
+
     ### RESOURCE GETTERS ###
 
     def get_resource_counts(self) -> ResourceCounts:
@@ -341,6 +661,14 @@ class API:
 
         raise NotImplementedError()
 
+    def get_maritime_rates(self, player_index: int) -> ResourceCounts:
+        """
+        Returns how many of each resource the given player pays for a single resource in a `maritime_trade`: 4, or 3 or
+        2 with a settlement or city on a harbor.
+        """
+
+        raise NotImplementedError()
+
     ### ADDITIONAL GAME INFORMATION GETTERS ###
 
     def get_victory_points(self, player_index: int) -> int:
@@ -356,6 +684,16 @@ class API:
 
         raise NotImplementedError()
 
+    def get_road_length_with_road(self, ends: Tuple[Position, Position]) -> int:
+        """
+        Returns what your longest road length would be if you built a road between the given ends.
+        If you can't build a road there, returns your current longest road length.
+
+        **Note:** the order of the `ends` doesn't matter.
+        """
+
+        raise NotImplementedError()
+
     def get_army_size(self, player_index: int) -> int:
         """Returns the army size of the given player (i.e. the amount of knight cards they have played)."""
 
@@ -378,6 +716,27 @@ class API:
 
         raise NotImplementedError()
 
+    def get_state_hash(self) -> int:
+        """
+        Returns a 64-bit hash of the game state: buildings, roads, the robber, each player's resource and development card counts, and whose turn it is.
+
+        Equal states have equal hashes, so use it as a key for caching evaluations, including of states returned by `fork`.
+        """
+
+        raise NotImplementedError()
+
+    ### EVENT GETTERS ###
+
+    def get_events_since(self, cursor: int = 0) -> Tuple[list[Event], int]:
+        """
+        Returns the events that happened since the given cursor, in the order they happened, and the cursor to pass next time.
+        Pass 0 to get every event since the game started, or since the game was copied by `fork`.
+
+        Use it to keep your own state up to date, instead of getting the whole board again on every call.
+        """
+
+        raise NotImplementedError()
+
     ### OFFER GETTERS ###
 
     def get_pending_trade_offers(self) -> list[Trade]:
@@ -506,6 +865,22 @@ class API:
         """
         raise NotImplementedError()
 
+    def execute_plan(self, actions: list[Action]) -> list[Exceptions]:
+        """
+        Runs the given actions in order, all within a single `CatanBot.play` call.
+        Each action runs as if `play` was called again after the previous one, so this counts as your action in this call.
+
+        Returns the result of each action that ran. The plan stops after the first action that doesn't return `Exceptions.OK`,
+        after an action which is resolved after `play` returns (`play_knight` and `propose_trade_offer`), and once you win.
+
+        The actions may be `play_knight`, `play_road_building`, `play_year_of_plenty`, `play_monopoly`, `build_road`, `build_settlement`,
+        `build_city`, `buy_development_card`, `maritime_trade` and `propose_trade_offer`. Any other action returns `Exceptions.BAD_TIMING`.
+
+        Possible exceptions: `Exceptions.BAD_TIMING`, and those of the actions.
+        """
+
+        raise NotImplementedError()
+
     def set_resources_to_drop(self, resource_counts: ResourceCounts) -> Exceptions:
         """
         Select resources to drop if a 7 is rolled and you have more than 7 cards.
@@ -537,6 +912,11 @@ class CatanBot:
     """
 
     context: API
+    concurrent: bool = False
+    """
+    Whether your methods may run on another thread at the same time as other bots' methods. Set it if your bot
+    doesn't share anything with other bots, like the global `random` module, which would make games unrepeatable.
+    """
 
     def __init__(self, context: API):
         """Don't override this method!"""
@@ -567,6 +947,7 @@ class CatanBot:
 
         After running any specific action you MUST return from this method.
         It will be called again after the action is performed.
+        To run several actions in a single call, use `self.context.execute_plan`.
 
         When you don't set any action, your turn will end.
 
@@ -0,0 +1,67 @@
+"""
+Simple bots to measure other bots against in tournaments.
+
+They use the global `random` module, which the tournament runner seeds before every game.
+"""
+
+import random
+
+from api import CatanBot, DevelopmentCards, Exceptions, Resources
+from engine import PRICES
+
+
+class PassiveBot(CatanBot):
+    """Never acts, so the engine's defaults are used for every decision."""
+
+
+class RandomBot(CatanBot):
+    """Builds, buys and plays knights at random whenever it can afford to."""
+
+    def place_settlement_and_road(self):
+        self.context.build_settlement(
+            random.choice(self.context.get_legal_settlement_positions())
+        )
+        self.context.build_road(random.choice(self.context.get_legal_road_edges()))
+
+    def play(self):
+        context = self.context
+        cards = context.get_resource_counts()
+        options = []
+        if cards >= PRICES.CITY:
+            options += [
+                (context.build_city, p) for p in context.get_legal_city_positions()
+            ]
+        if cards >= PRICES.SETTLEMENT:
+            options += [
+                (context.build_settlement, p)
+                for p in context.get_legal_settlement_positions()
+            ]
+        if cards >= PRICES.ROAD:
+            options += [(context.build_road, e) for e in context.get_legal_road_edges()]
+        if cards >= PRICES.DEVELOPMENT_CARD:
+            options.append((context.buy_development_card, None))
+        random.shuffle(options)
+        for action, argument in options:
+            e = action() if argument is None else action(argument)
+            if e == Exceptions.OK:
+                return
+
+        for resource in Resources:
+            if cards[resource] >= 4:
+                context.maritime_trade(resource, Resources(cards.index(min(cards))))
+                return
+
+    def before_dice(self):
+        if self.context.get_playable_development_cards()[DevelopmentCards.KNIGHT] > 0:
+            self.context.play_knight()
+
+    def move_robber(self):
+        context = self.context
+        terrains = context.get_terrains()
+        random.shuffle(terrains)
+        for terrain in terrains:
+            for player_index in range(-1, 4):
+                if player_index == context.get_player_index():
+                    continue
+                if context.move_robber(terrain, player_index) == Exceptions.OK:
+                    return
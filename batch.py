@@ -0,0 +1,721 @@
+"""
+Many games at once in NumPy arrays, for fast random playouts.
+
+`GameBatch` holds N games on the same board as a struct of arrays indexed by game, then player or `BoardTopology`
+ID, and plays them in lock-step: every `step` plays a turn of the same player in every game that isn't over, with
+the random policy of `mcts` playouts and the rules of `GameState`. Production and legal settlements are kept up to
+date as the games go, and longest roads are searched for in all games at once, so a step costs a few array
+operations whatever the number of games:
+
+```python
+from batch import GameBatch
+
+batch = GameBatch([game.state] * 10_000, seed=1)
+winners = batch.run()
+wins = np.bincount(winners[winners >= 0], minlength=4)
+```
+
+The games start from `GameState`s after the setup stage, such as a game's state or samples of its hidden
+information (see `mcts.determinize`). Like `mcts` playouts, the policy only builds, buys development cards, trades
+with the bank and moves the robber, so nobody plays development cards or trades with other players.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from api import Buildings, DevelopmentCards, Lands, Resources
+from engine import (
+    CITY_COUNT,
+    DEVELOPMENT_DECK,
+    GENERIC_HARBOR_RATE,
+    HARBOR_RATE,
+    LONGEST_ROAD_MIN_LENGTH,
+    MAX_HAND_SIZE,
+    MAX_TURNS,
+    PRICES,
+    ROAD_COUNT,
+    SETTLEMENT_COUNT,
+    WINNING_VICTORY_POINTS,
+    GameState,
+)
+from mcts import MAX_DECISIONS
+from placements import NO_PLAYER
+
+RESOURCE_COUNT = len(Resources)
+NO_HARBOR = -1
+GENERIC_HARBOR = RESOURCE_COUNT
+NO_EDGE = -1
+
+CITY_PRICE = np.array(list(PRICES.CITY))
+SETTLEMENT_PRICE = np.array(list(PRICES.SETTLEMENT))
+ROAD_PRICE = np.array(list(PRICES.ROAD))
+DEVELOPMENT_CARD_PRICE = np.array(list(PRICES.DEVELOPMENT_CARD))
+PRICE_MATRIX = np.array(
+    [CITY_PRICE, SETTLEMENT_PRICE, ROAD_PRICE, DEVELOPMENT_CARD_PRICE]
+)
+
+
+class GameBatch:
+    """
+    Games on the same board with the same current player, stepped together.
+
+    Every array has the games on its first axis. Games which are over (see `finished`) are left as they are.
+    """
+
+    def __init__(
+        self,
+        states: Sequence[GameState],
+        seed: Optional[int] = None,
+        max_turns: int = MAX_TURNS,
+    ):
+        """Copies the states, which must share the board and the current player, and have finished the setup stage."""
+
+        first = states[0]
+        board = first.board
+        for state in states:
+            if state.board is not board or state.current_player != first.current_player:
+                raise ValueError("the states must share the board and current player")
+        topology = board.topology
+        self.board = board
+        self.topology = topology
+        self.player_count = first.player_count
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+
+        ### THE BOARD ###
+
+        terrains, intersections, edges = (
+            topology.num_terrains,
+            topology.num_intersections,
+            topology.num_edges,
+        )
+        self.terrain_intersections = np.zeros((terrains, intersections), np.float32)
+        for terrain_id in range(terrains):
+            self.terrain_intersections[
+                terrain_id, list(topology.terrain_intersections(terrain_id))
+            ] = 1
+        self.edge_ends = np.array(topology.edge_ends).reshape(edges, 2)
+        self.edge_intersections = np.zeros((edges, intersections), np.float32)
+        self.edge_intersections[np.arange(edges), self.edge_ends[:, 0]] = 1
+        self.edge_intersections[np.arange(edges), self.edge_ends[:, 1]] = 1
+        self.intersection_edges = np.full((intersections, 3), edges)
+        """The edges of every intersection, padded with `num_edges`."""
+        for intersection_id in range(intersections):
+            row = list(topology.intersection_edges(intersection_id))
+            self.intersection_edges[intersection_id, : len(row)] = row
+        self.closed = (self.edge_intersections.T @ self.edge_intersections > 0).astype(
+            np.float32
+        )
+        """Whether a building at the first intersection rules out a settlement at the second (itself or a neighbor)."""
+        self.numbers = np.array([number or 0 for number in board.numbers])
+        self.land_resources = np.zeros((terrains, RESOURCE_COUNT), np.float32)
+        for terrain_id, land in enumerate(board.lands):
+            if land != Lands.DESERT:
+                self.land_resources[terrain_id, land] = 1
+        self.intersection_production = np.zeros(
+            (intersections, 13, RESOURCE_COUNT), np.int32
+        )
+        """The resources every intersection produces on every roll, ignoring the robber, as (intersections, rolls,
+        resources)."""
+        for roll in range(2, 13):
+            producing = self.numbers == roll
+            self.intersection_production[:, roll] = (
+                self.terrain_intersections[producing].T @ self.land_resources[producing]
+            )
+        self.harbors = np.full(intersections, NO_HARBOR)
+        """The harbor of every intersection: a resource, `GENERIC_HARBOR` or `NO_HARBOR`."""
+        for intersection_id, resource in board.harbor_intersections.items():
+            self.harbors[intersection_id] = (
+                GENERIC_HARBOR if resource is None else int(resource)
+            )
+
+        ### THE GAMES ###
+
+        count = len(states)
+        self.resources = np.array(
+            [[list(hand) for hand in state.resources] for state in states], np.int32
+        )
+        self.bank = np.array([list(state.bank) for state in states], np.int32)
+        self.building_owners = np.array(
+            [state.building_owners for state in states], np.int8
+        )
+        self.building_types = np.array(
+            [state.building_types for state in states], np.int8
+        )
+        self.road_owners = np.array([state.road_owners for state in states], np.int8)
+        self.robber = np.array([state.robber for state in states])
+        self.deck = np.zeros((count, len(DEVELOPMENT_DECK)), np.int8)
+        """The cards of every game's deck, which are drawn from the end like `GameState.deck`."""
+        self.deck_sizes = np.array([len(state.deck) for state in states])
+        for game, state in enumerate(states):
+            self.deck[game, : len(state.deck)] = state.deck
+        self.development_cards = np.array(
+            [[list(cards) for cards in state.development_cards] for state in states],
+            np.int32,
+        )
+        self.new_development_cards = np.array(
+            [
+                [list(cards) for cards in state.new_development_cards]
+                for state in states
+            ],
+            np.int32,
+        )
+        self.settlements_left = np.array(
+            [state.settlements_left for state in states], np.int32
+        )
+        self.cities_left = np.array([state.cities_left for state in states], np.int32)
+        self.roads_left = np.array([state.roads_left for state in states], np.int32)
+        self.trade_rates = np.array([state.trade_rates for state in states], np.int32)
+        self.road_lengths = np.array([state.road_lengths for state in states])
+        """The longest road of every player, which is at most their road count below `LONGEST_ROAD_MIN_LENGTH`."""
+        self.longest_road_players = np.array(
+            [_player(state.longest_road_player) for state in states]
+        )
+        self.largest_army_players = np.array(
+            [_player(state.largest_army_player) for state in states]
+        )
+        self.current_player = first.current_player
+
+        # What `_build` and `_distribute` would otherwise recompute every time, updated as the games go.
+        players = np.arange(self.player_count)
+        buildings = (self.building_owners[:, None, :] == players[:, None]) * (
+            self.building_types[:, None, :] + 1
+        )
+        self.income = np.einsum(
+            "gpi,irk->grpk", buildings, self.intersection_production
+        ).astype(np.int32)
+        """The resources every player gets on every roll in every game, ignoring the robber, as (games, rolls,
+        players, resources)."""
+        occupied = (self.building_owners != NO_PLAYER).astype(np.float32)
+        self.open_intersections = occupied @ self.closed == 0
+        """Whether every intersection is empty and has no neighboring building in every game."""
+        roads = (self.road_owners[:, None, :] == players[:, None]).astype(np.float32)
+        self.road_intersections = roads @ self.edge_intersections > 0
+        """Whether every player has a road at every intersection in every game."""
+        self.turns = np.array([state.turn for state in states])
+        self.winners = np.full(count, NO_PLAYER)
+        self.finished = self.turns >= max_turns
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def shuffle_decks(self) -> None:
+        """Shuffles the deck of every game, which starts as the deck of its state."""
+
+        keys = self.rng.random(self.deck.shape)
+        keys[np.arange(self.deck.shape[1]) >= self.deck_sizes[:, None]] = np.inf
+        self.deck = np.take_along_axis(self.deck, keys.argsort(axis=1), axis=1)
+
+    ### QUERIES ###
+
+    def victory_points(self) -> np.ndarray:
+        """Returns the victory points of every player in every game, including victory point development cards."""
+
+        players = np.arange(self.player_count)
+        return (
+            (SETTLEMENT_COUNT - self.settlements_left)
+            + 2 * (CITY_COUNT - self.cities_left)
+            + 2 * (self.longest_road_players[:, None] == players)
+            + 2 * (self.largest_army_players[:, None] == players)
+            + self.development_cards[:, :, DevelopmentCards.VICTORY_POINT]
+            + self.new_development_cards[:, :, DevelopmentCards.VICTORY_POINT]
+        )
+
+    def _victory_points(self, games: np.ndarray, player_index: int) -> np.ndarray:
+        return (
+            (SETTLEMENT_COUNT - self.settlements_left[games, player_index])
+            + 2 * (CITY_COUNT - self.cities_left[games, player_index])
+            + 2 * (self.longest_road_players[games] == player_index)
+            + 2 * (self.largest_army_players[games] == player_index)
+            + self.development_cards[
+                games, player_index, DevelopmentCards.VICTORY_POINT
+            ]
+            + self.new_development_cards[
+                games, player_index, DevelopmentCards.VICTORY_POINT
+            ]
+        )
+
+    ### TURNS ###
+
+    def run(self) -> np.ndarray:
+        """Plays every game until it's over, and returns the winners (`NO_PLAYER` for games reaching `max_turns`)."""
+
+        while not self.finished.all():
+            self.step()
+        return self.winners.copy()
+
+    def step(self) -> None:
+        """Plays a turn of the current player in every game that isn't over."""
+
+        games = np.flatnonzero(~self.finished)
+        player_index = self.current_player
+        if len(games):
+            self._roll(games)
+            active = games
+            for _ in range(MAX_DECISIONS * 2):
+                active = active[self._build(active)]
+                if not len(active):
+                    break
+
+            # Like `Game`, the player wins at the end of their turn.
+            won = self._victory_points(games, player_index) >= WINNING_VICTORY_POINTS
+            self.winners[games[won]] = player_index
+            self.development_cards[games, player_index] += self.new_development_cards[
+                games, player_index
+            ]
+            self.new_development_cards[games, player_index] = 0
+            self.turns[games] += 1
+            self.finished[games] = won | (self.turns[games] >= self.max_turns)
+        self.current_player = (player_index + 1) % self.player_count
+
+    def _choose(self, mask: np.ndarray) -> np.ndarray:
+        """Returns the index of a random True entry of every row of a boolean matrix (0 for rows without one)."""
+
+        return np.where(mask, self.rng.random(mask.shape), -1.0).argmax(axis=1)
+
+    ### DICE AND ROBBER ###
+
+    def _roll(self, games: np.ndarray) -> None:
+        rolls = self.rng.integers(1, 7, len(games)) + self.rng.integers(
+            1, 7, len(games)
+        )
+        sevens = rolls == 7
+        self._distribute(games[~sevens], rolls[~sevens])
+        robbed = games[sevens]
+        if len(robbed):
+            self._drop(robbed)
+            self._move_robber(robbed)
+
+    def _distribute(self, games: np.ndarray, rolls: np.ndarray) -> None:
+        """Produces the rolls, following `GameState.distribute`."""
+
+        gains = self.income[games, rolls]
+        terrains = self.robber[games]
+        robbed = np.flatnonzero(self.numbers[terrains] == rolls)
+        if len(robbed):
+            terrains = terrains[robbed]
+            owners = self.building_owners[games[robbed]]
+            weights = np.where(
+                self.terrain_intersections[terrains] > 0,
+                self.building_types[games[robbed]] + 1,
+                0,
+            )
+            blocked = (
+                (owners[:, None, :] == np.arange(self.player_count)[:, None])
+                * weights[:, None, :]
+            ).sum(axis=2)
+            gains[robbed] -= blocked[:, :, None] * self.land_resources[terrains][
+                :, None, :
+            ].astype(np.int32)
+
+        bank = self.bank[games]
+        short = gains.sum(axis=1) > bank
+        if short.any():
+            # The bank can't pay everyone, so it only pays a single receiving player what's left.
+            single = (gains > 0).sum(axis=1) == 1
+            gains = np.where(
+                short[:, None, :],
+                np.where(single[:, None, :], np.minimum(gains, bank[:, None, :]), 0),
+                gains,
+            )
+        self.resources[games] += gains
+        self.bank[games] -= gains.sum(axis=1)
+
+    def _drop(self, games: np.ndarray) -> None:
+        """Makes every player with more than `MAX_HAND_SIZE` resources drop `GameState.default_drop`."""
+
+        hands = self.resources[games]
+        totals = hands.sum(axis=2)
+        half = np.where(totals > MAX_HAND_SIZE, totals // 2, 0)
+        before = hands.cumsum(axis=2) - hands
+        drops = np.clip(half[:, :, None] - before, 0, hands)
+        self.resources[games] -= drops
+        self.bank[games] += drops.sum(axis=1)
+
+    def _move_robber(self, games: np.ndarray) -> None:
+        """Moves the robber to a random terrain with an opponent's building if there's one, and robs one of them."""
+
+        player_index = self.current_player
+        owners = self.building_owners[games]
+        opponents = (owners[:, :, None] == np.arange(self.player_count)) & (
+            owners[:, :, None] != player_index
+        )
+        # Whether every player has a building around every terrain, as (games, terrains, players).
+        victims = self.terrain_intersections @ opponents.astype(np.float32) > 0
+        allowed = np.arange(len(self.numbers)) != self.robber[games, None]
+        robbable = allowed & victims.any(axis=2)
+        terrains = self._choose(
+            np.where(robbable.any(axis=1, keepdims=True), robbable, allowed)
+        )
+        self.robber[games] = terrains
+
+        victims = victims[np.arange(len(games)), terrains]
+        robbing = victims.any(axis=1)
+        self._steal(games[robbing], self._choose(victims[robbing]))
+
+    def _steal(self, games: np.ndarray, victims: np.ndarray) -> None:
+        hands = self.resources[games, victims]
+        totals = hands.sum(axis=1)
+        robbed = totals > 0
+        games, victims, hands = games[robbed], victims[robbed], hands[robbed]
+        picks = (self.rng.random(len(games)) * totals[robbed]).astype(np.int64)
+        resources = (hands.cumsum(axis=1) > picks[:, None]).argmax(axis=1)
+        self.resources[games, victims, resources] -= 1
+        self.resources[games, self.current_player, resources] += 1
+
+    ### BUILDING ###
+
+    def _build(self, games: np.ndarray) -> np.ndarray:
+        """
+        Makes the current player build the most valuable thing they can afford at a random place in every game, like
+        `mcts` playouts, and returns which games they did something in.
+        """
+
+        player_index = self.current_player
+        hands = self.resources[games, player_index]
+        acted = np.zeros(len(games), bool)
+        affordable = (hands[:, None, :] >= PRICE_MATRIX).all(axis=2)
+        # Only games where the player can afford something or has to trade matter.
+        candidates = np.flatnonzero(
+            affordable.any(axis=1) | (hands.sum(axis=1) > MAX_HAND_SIZE)
+        )
+        if not len(candidates):
+            return acted
+        games, hands = games[candidates], hands[candidates]
+        can_city, can_settle, can_road, can_buy = affordable[candidates].T
+        rest = np.ones(len(games), bool)
+        # The (games, players, edge IDs) whose road length changed, updated at once.
+        changed = []
+
+        # The placements are only worked out in the games where the player can afford to build on them.
+        rows = np.flatnonzero(can_city & (self.cities_left[games, player_index] > 0))
+        if len(rows):
+            cities = (self.building_owners[games[rows]] == player_index) & (
+                self.building_types[games[rows]] == Buildings.SETTLEMENT
+            )
+            building = cities.any(axis=1)
+            self._build_city(games[rows[building]], self._choose(cities[building]))
+            rest[rows[building]] = False
+
+        can_settle &= rest & (self.settlements_left[games, player_index] > 0)
+        can_road &= rest & (self.roads_left[games, player_index] > 0)
+        rows = np.flatnonzero(can_settle | can_road)
+        touched = self.road_intersections[games[rows], player_index]
+        settlements = touched & self.open_intersections[games[rows]]
+        open_settlements = settlements.any(axis=1)
+        building = can_settle[rows] & open_settlements
+        if building.any():
+            changed.append(
+                self._build_settlement(
+                    games[rows[building]], self._choose(settlements[building])
+                )
+            )
+            rest[rows[building]] = False
+
+        roll = self.rng.random(len(games)) < 0.5
+        road_rows = can_road[rows] & rest[rows] & (~open_settlements | roll[rows])
+        rows, touched = rows[road_rows], touched[road_rows]
+        # A road can start from the player's buildings, and from their roads where there's no other player's building.
+        owners = self.building_owners[games[rows]]
+        ends = (owners == player_index) | ((owners == NO_PLAYER) & touched)
+        edges = (self.road_owners[games[rows]] == NO_PLAYER) & (
+            ends[:, self.edge_ends[:, 0]] | ends[:, self.edge_ends[:, 1]]
+        )
+        building = edges.any(axis=1)
+        if building.any():
+            changed.append(
+                self._build_road(games[rows[building]], self._choose(edges[building]))
+            )
+            rest[rows[building]] = False
+
+        buying = (
+            rest
+            & (self.deck_sizes[games] > 0)
+            & can_buy
+            & (self.rng.random(len(games)) < 0.5)
+        )
+        if buying.any():
+            self._buy_development_card(games[buying])
+        rest &= ~buying
+
+        # Trade the most plentiful resource for the scarcest before a 7 halves the hand.
+        rates = self.trade_rates[games, player_index]
+        sell = (hands - rates).argmax(axis=1)
+        receive = hands.argmin(axis=1)
+        rows = np.arange(len(games))
+        trading = (
+            rest
+            & (hands.sum(axis=1) > MAX_HAND_SIZE)
+            & (hands[rows, sell] >= rates[rows, sell])
+            & (sell != receive)
+            & (self.bank[games, receive] > 0)
+        )
+        if trading.any():
+            self._maritime_trade(
+                games[trading],
+                sell[trading],
+                receive[trading],
+                rates[rows, sell][trading],
+            )
+        rest &= ~trading
+
+        if changed:
+            self._update_road_lengths(
+                *(np.concatenate(arrays) for arrays in zip(*changed))
+            )
+        acted[candidates] = ~rest
+        return acted
+
+    def _pay(self, games: np.ndarray, price: np.ndarray) -> None:
+        self.resources[games, self.current_player] -= price
+        self.bank[games] += price
+
+    def _build_city(self, games: np.ndarray, intersection_ids: np.ndarray) -> None:
+        player_index = self.current_player
+        self._pay(games, CITY_PRICE)
+        self.building_types[games, intersection_ids] = Buildings.CITY
+        self.income[games, :, player_index] += self.intersection_production[
+            intersection_ids
+        ]
+        self.cities_left[games, player_index] -= 1
+        self.settlements_left[games, player_index] += 1
+
+    def _build_settlement(
+        self, games: np.ndarray, intersection_ids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Builds the settlements, and returns the games and players whose roads they cut, with `NO_EDGE`s."""
+
+        player_index = self.current_player
+        self._pay(games, SETTLEMENT_PRICE)
+        self.building_owners[games, intersection_ids] = player_index
+        self.building_types[games, intersection_ids] = Buildings.SETTLEMENT
+        self.settlements_left[games, player_index] -= 1
+        self.income[games, :, player_index] += self.intersection_production[
+            intersection_ids
+        ]
+        closed = self.closed[intersection_ids] > 0
+        self.open_intersections[games] &= ~closed
+
+        harbors = self.harbors[intersection_ids]
+        generic = harbors == GENERIC_HARBOR
+        self.trade_rates[games[generic], player_index] = np.minimum(
+            self.trade_rates[games[generic], player_index], GENERIC_HARBOR_RATE
+        )
+        specific = (harbors != NO_HARBOR) & ~generic
+        self.trade_rates[games[specific], player_index, harbors[specific]] = HARBOR_RATE
+
+        # The settlement cuts the other players' roads through it, which only matters to those on both sides.
+        edges = self.edge_intersections[:, intersection_ids].T > 0
+        roads = np.where(edges, self.road_owners[games], NO_PLAYER)
+        through = (roads[:, :, None] == np.arange(self.player_count)).sum(axis=1) >= 2
+        through[:, player_index] = False
+        cut_games, cut_players = np.nonzero(through)
+        return games[cut_games], cut_players, np.full(len(cut_games), NO_EDGE)
+
+    def _build_road(
+        self, games: np.ndarray, edge_ids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Builds the roads, and returns the games, players and edge IDs whose road length may have changed."""
+
+        player_index = self.current_player
+        self._pay(games, ROAD_PRICE)
+        self.road_owners[games, edge_ids] = player_index
+        ends = self.edge_ends[edge_ids]
+        self.road_intersections[games, player_index, ends[:, 0]] = True
+        self.road_intersections[games, player_index, ends[:, 1]] = True
+        self.roads_left[games, player_index] -= 1
+        return games, np.full(len(games), player_index), edge_ids
+
+    def _buy_development_card(self, games: np.ndarray) -> None:
+        self._pay(games, DEVELOPMENT_CARD_PRICE)
+        self.deck_sizes[games] -= 1
+        cards = self.deck[games, self.deck_sizes[games]]
+        self.new_development_cards[games, self.current_player, cards] += 1
+
+    def _maritime_trade(
+        self,
+        games: np.ndarray,
+        sell: np.ndarray,
+        receive: np.ndarray,
+        rates: np.ndarray,
+    ) -> None:
+        player_index = self.current_player
+        self.resources[games, player_index, sell] -= rates
+        self.bank[games, sell] += rates
+        self.resources[games, player_index, receive] += 1
+        self.bank[games, receive] -= 1
+
+    ### LONGEST ROAD ###
+
+    def _trail_lengths(
+        self,
+        games: np.ndarray,
+        players: np.ndarray,
+        edge_ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Returns the longest trail of a player's roads in each of the games, like `RoadNetwork.trail_length`, or the
+        longest trail through one of their roads if `edge_ids` are given.
+
+        The trails are grown an edge at a time, all at once, as (pair, intersection, roads used) states, where the
+        roads used are a bitmask over the player's roads in edge order.
+        """
+
+        roads = self.road_owners[games] == players[:, None]
+        # The bit of every edge of the player's, with an extra edge for the padding of `intersection_edges`.
+        road_bits = np.full((len(games), len(self.edge_ends) + 1), -1)
+        road_bits[:, :-1] = np.where(roads, roads.cumsum(axis=1) - 1, -1)
+        owners = self.building_owners[games]
+        blocked = (owners != NO_PLAYER) & (owners != players[:, None])
+        lengths = np.zeros(len(games), np.int64)
+
+        if edge_ids is None:
+            # Trails may start anywhere, even at other players' buildings.
+            pairs, edges = np.nonzero(roads)
+            pairs = np.repeat(pairs, 2)
+            intersections = self.edge_ends[edges].reshape(-1)
+            used = np.zeros(len(pairs), np.int64)
+            self._grow_trails(
+                road_bits, blocked, lengths, pairs, intersections, used, used
+            )
+            return lengths
+
+        # A trail through the road is a trail from one of its ends (walking away from the road), reversed, then the
+        # road, then a trail from its other end which doesn't reuse any road.
+        pairs = np.arange(len(games))
+        ends = self.edge_ends[edge_ids]
+        used = np.int64(1) << road_bits[pairs, edge_ids]
+        counts = np.ones(len(games), np.int64)
+        lengths[:] = 1
+        going = ~blocked[pairs, ends[:, 0]]
+        first = self._grow_trails(
+            road_bits,
+            blocked,
+            lengths,
+            pairs[going],
+            ends[going, 0],
+            used[going],
+            counts[going],
+            collect=True,
+        )
+        pairs, used, counts = (
+            np.concatenate([pairs, first[0]]),
+            np.concatenate([used, first[1]]),
+            np.concatenate([counts, first[2]]),
+        )
+        intersections = ends[pairs, 1]
+        going = ~blocked[pairs, intersections]
+        self._grow_trails(
+            road_bits,
+            blocked,
+            lengths,
+            pairs[going],
+            intersections[going],
+            used[going],
+            counts[going],
+        )
+        return lengths
+
+    def _grow_trails(
+        self,
+        road_bits: np.ndarray,
+        blocked: np.ndarray,
+        lengths: np.ndarray,
+        pairs: np.ndarray,
+        intersections: np.ndarray,
+        used: np.ndarray,
+        counts: np.ndarray,
+        collect: bool = False,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Grows trails from the states until they can't go further, raising `lengths` to the roads of every trail, and
+        returns the (pairs, roads used, road counts) of the trails grown if `collect`.
+        """
+
+        collected = []
+        while len(pairs):
+            candidates = self.intersection_edges[intersections]
+            bits = road_bits[pairs[:, None], candidates]
+            free = (bits >= 0) & ((used[:, None] >> np.maximum(bits, 0)) & 1 == 0)
+            states, slots = np.nonzero(free)
+            if not len(states):
+                break
+            pairs = pairs[states]
+            counts = counts[states] + 1
+            np.maximum.at(lengths, pairs, counts)
+            ends = self.edge_ends[candidates[states, slots]]
+            intersections = np.where(
+                ends[:, 0] == intersections[states], ends[:, 1], ends[:, 0]
+            )
+            used = used[states] | (np.int64(1) << bits[states, slots])
+            if collect:
+                collected.append((pairs, used, counts))
+
+            # Trails end at other players' buildings, and trails reaching the same state continue the same way.
+            going = ~blocked[pairs, intersections]
+            keys = ((pairs * len(self.closed) + intersections) << ROAD_COUNT) | used
+            _, unique = np.unique(np.where(going, keys, -1), return_index=True)
+            unique = unique[going[unique]]
+            pairs, intersections, used, counts = (
+                pairs[unique],
+                intersections[unique],
+                used[unique],
+                counts[unique],
+            )
+        if not collect:
+            return None
+        if not collected:
+            empty = np.zeros(0, np.int64)
+            return empty, empty, empty
+        return tuple(np.concatenate(arrays) for arrays in zip(*collected))
+
+    def _update_road_lengths(
+        self, games: np.ndarray, players: np.ndarray, edge_ids: np.ndarray
+    ) -> None:
+        """
+        Updates the road length of a player in each of the games, then who holds the longest road in them. The edge
+        ID is the player's new road, or `NO_EDGE` if their roads were cut.
+        """
+
+        counts = ROAD_COUNT - self.roads_left[games, players]
+        # Shorter roads can't hold the longest road, so their count will do.
+        short = counts < LONGEST_ROAD_MIN_LENGTH
+        self.road_lengths[games[short], players[short]] = counts[short]
+        # A new road only adds the trails through it to roads which were already long enough to be measured.
+        added = ~short & (edge_ids != NO_EDGE) & (counts > LONGEST_ROAD_MIN_LENGTH)
+        if added.any():
+            self.road_lengths[games[added], players[added]] = np.maximum(
+                self.road_lengths[games[added], players[added]],
+                self._trail_lengths(games[added], players[added], edge_ids[added]),
+            )
+        measured = ~short & ~added
+        if measured.any():
+            self.road_lengths[games[measured], players[measured]] = self._trail_lengths(
+                games[measured], players[measured]
+            )
+
+        # Follows `GameState._update_longest_road`.
+        lengths = self.road_lengths[games]
+        holders = self.longest_road_players[games]
+        best = lengths.max(axis=1)
+        long_enough = best >= LONGEST_ROAD_MIN_LENGTH
+        keep = (
+            (holders != NO_PLAYER)
+            & (lengths[np.arange(len(games)), holders] == best)
+            & long_enough
+        )
+        leaders = lengths == best[:, None]
+        self.longest_road_players[games] = np.where(
+            keep,
+            holders,
+            np.where(
+                long_enough & (leaders.sum(axis=1) == 1),
+                leaders.argmax(axis=1),
+                NO_PLAYER,
+            ),
+        )
+
+
+def _player(player_index: Optional[int]) -> int:
+    return NO_PLAYER if player_index is None else player_index
@@ -0,0 +1,68 @@
+"""
+Benchmark of random playouts to the end of the game, one `GameState` at a time against a `GameBatch`.
+
+Both play the `mcts` playout policy from the same state after the setup stage, each game with its own shuffle of
+the development deck. Run with `python benchmarks/batch_benchmark.py` from the repository root.
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcts  # noqa: E402
+from baselines import RandomBot  # noqa: E402
+from batch import GameBatch  # noqa: E402
+from engine import MAX_TURNS, Game, GameState  # noqa: E402
+
+
+def start(seed: int = 11) -> GameState:
+    """Returns the state of a game of random bots after the setup stage."""
+
+    random.seed(seed)
+    game = Game([RandomBot] * 4, seed=seed)
+    game.setup()
+    return game.state
+
+
+def per_game(state: GameState, count: int) -> tuple[float, float]:
+    """Plays the games one at a time, and returns the games per second and their mean length in turns."""
+
+    turns = 0
+    begin = time.perf_counter()
+    for seed in range(count):
+        game = state.clone(random.Random(seed))
+        rng = random.Random(seed)
+        rng.shuffle(game.deck)
+        while game.winner() is None and game.turn < MAX_TURNS:
+            mcts._policy_turn(game, rng)
+        turns += game.turn
+    return count / (time.perf_counter() - begin), turns / count
+
+
+def batched(state: GameState, count: int) -> tuple[float, float]:
+    """Plays the games in a batch, and returns the games per second and their mean length in turns."""
+
+    begin = time.perf_counter()
+    batch = GameBatch([state] * count, seed=1)
+    batch.shuffle_decks()
+    batch.run()
+    return count / (time.perf_counter() - begin), float(np.mean(batch.turns))
+
+
+def main():
+    state = start()
+    baseline, turns = per_game(state, 1000)
+    print(f"{'games':<12}{'games/s':>10}{'turns':>8}{'speedup':>9}")
+    print(f"{'1 at a time':<12}{baseline:>10.0f}{turns:>8.1f}{1:>8.2f}x")
+    for count in (100, 1000, 10_000):
+        rate, turns = batched(state, count)
+        print(f"{count:<12}{rate:>10.0f}{turns:>8.1f}{rate / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Benchmark of `CatanBot` hook latency over a fixed corpus of replayed positions.
+
+Every position of the corpus is rebuilt from a replay, and each hook below is called on a freshly set up bot at it,
+with the global `random` module seeded by the position and hook, so the API calls a bot makes are the same on every
+run and machine. Latencies still depend on the machine, so compare them against a baseline from the same one:
+
+```
+python benchmarks/hook_benchmark.py --save benchmarks/hook_baseline.json
+python benchmarks/hook_benchmark.py --baseline benchmarks/hook_baseline.json
+```
+
+The corpus is recorded into `--corpus` from fixed seeds the first time it's missing, and kept from then on, so the
+positions don't change along with the bots.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List, NamedTuple, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import ResourceCounts, Resources, Trade  # noqa: E402
+from engine import MAX_HAND_SIZE, EventRecord, Events, Game, GameState  # noqa: E402
+from profiling import Profiler  # noqa: E402
+from replay import Replay, record_game  # noqa: E402
+from tournament import PLAYER_COUNT, load_bot  # noqa: E402
+
+HOOKS = (
+    "play",
+    "respond_to_trade_offers",
+    "move_robber",
+    "drop_resources",
+    "place_settlement_and_road",
+)
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CORPUS_BOT = "bot.MyBot"
+CORPUS_SEEDS = range(8)
+
+
+class Position(NamedTuple):
+    """A state to call hooks at, named after its replay and turn."""
+
+    name: str
+    state: GameState
+    player_index: int
+    """The player whose hooks are called: the current player, or the placing player in the setup stage."""
+    setup_round: int
+    """The setup round of a setup stage position, or -1 after the setup stage."""
+
+
+def record_corpus(
+    directory: str, seeds: Sequence[int] = CORPUS_SEEDS, bot: str = CORPUS_BOT
+) -> None:
+    """Records a game of the bot against itself for every seed."""
+
+    os.makedirs(directory, exist_ok=True)
+    bot_class = load_bot(bot)
+    for seed in seeds:
+        random.seed(seed)
+        record_game(
+            [bot_class] * PLAYER_COUNT,
+            os.path.join(directory, f"{seed}.ctnr"),
+            seed=seed,
+            seats=[bot] * PLAYER_COUNT,
+        )
+
+
+def _replayed(replay: Replay, events: List[EventRecord]) -> GameState:
+    state = GameState(replay.board, replay.player_count, random.Random(replay.seed))
+    for event in events:
+        state.apply(event)
+    return state
+
+
+def load_positions(directory: str, stride: int = 10) -> List[Position]:
+    """
+    Returns the positions of every replay in the directory: before each settlement of the setup stage, and at the
+    start of every `stride`th turn after it.
+    """
+
+    positions = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".ctnr"):
+            continue
+        with Replay(os.path.join(directory, file_name)) as replay:
+            name = file_name[: -len(".ctnr")]
+            events = list(replay.events(0, 1))
+            settlements = 0
+            for index, event in enumerate(events):
+                if event.type == Events.BUILD_SETTLEMENT:
+                    positions.append(
+                        Position(
+                            f"{name}/setup{settlements}",
+                            _replayed(replay, events[:index]),
+                            event.player_index,
+                            settlements // replay.player_count,
+                        )
+                    )
+                    settlements += 1
+            for turn in range(1, replay.turn_count + 1, stride):
+                state = replay.state_at(turn)
+                positions.append(
+                    Position(f"{name}/{turn}", state, state.current_player, -1)
+                )
+    return positions
+
+
+def _prepare(game: Game, hook: str, position: Position, rng: random.Random) -> int:
+    """Puts the game in the situation the hook is called in, and returns the player to call it for."""
+
+    state = game.state
+    player_index = position.player_index
+    if hook == "place_settlement_and_road":
+        game.setup_player = player_index
+        game.setup_round = position.setup_round
+    elif hook == "respond_to_trade_offers":
+        # The current player offers a resource they have for one the next player has.
+        proposer = player_index
+        player_index = (proposer + 1) % state.player_count
+        give, receive = ResourceCounts(), ResourceCounts()
+        give[rng.choice(list(Resources))] = 1
+        receive[rng.choice(list(Resources))] = 1
+        game.pending_offers = [(proposer, Trade(give, receive))]
+    elif hook == "drop_resources":
+        # Fill the hand up past the limit from the bank.
+        hand = state.resources[player_index]
+        while sum(hand) <= MAX_HAND_SIZE:
+            resource = rng.choice(list(Resources))
+            if state.bank[resource]:
+                state.bank[resource] -= 1
+                hand[resource] += 1
+    elif hook == "move_robber":
+        game.robber_pending = True
+    return player_index
+
+
+def _call(bot_class: type, hook: str, position: Position, profiler: Profiler) -> float:
+    """Calls the hook at a copy of the position, with its API calls timed into the profiler, and returns its time."""
+
+    seed = f"{position.name}/{hook}"
+    state = position.state.clone(random.Random(seed))
+    # Clones start without events, but freshly set up bots read the whole game's events.
+    state.events = position.state.events[:]
+    state.event_offset = position.state.event_offset
+    random.seed(seed)
+    game = Game([bot_class] * state.player_count, state=state, profiler=Profiler())
+    player_index = _prepare(game, hook, position, random.Random(seed))
+    # Only the API calls made inside the hook are counted.
+    game.contexts[player_index]._profiler = profiler
+    game.call(player_index, hook)
+    return game.profiler.histogram("hook." + hook).total
+
+
+def run_benchmark(
+    bot: str, positions: Sequence[Position], repeat: int = 5
+) -> Dict[str, dict]:
+    """
+    Calls every hook at every position, and returns the latency summary, call count and API call counts of each
+    hook. Setup stage positions are only used for `place_settlement_and_road`, and the others for the other hooks.
+
+    Each call is repeated `repeat` times, and its fastest time is used, so other load on the machine matters less.
+    """
+
+    bot_class = load_bot(bot)
+    profilers = {hook: Profiler() for hook in HOOKS}
+    for hook in HOOKS:
+        profiler = profilers[hook]
+        for position in positions:
+            if (hook == "place_settlement_and_road") != (position.setup_round >= 0):
+                continue
+            seconds = _call(bot_class, hook, position, profiler)
+            for _ in range(repeat - 1):
+                seconds = min(seconds, _call(bot_class, hook, position, Profiler()))
+            profiler.add("hook." + hook, seconds)
+
+    results = {}
+    for hook, profiler in profilers.items():
+        latency = profiler.histogram("hook." + hook)
+        results[hook] = {
+            "calls": latency.count,
+            "latency": latency.summary(),
+            "api_calls": {
+                name[len("api.") :]: histogram.count
+                for name, histogram in sorted(profiler.histograms.items())
+                if name.startswith("api.")
+            },
+        }
+    return results
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = 0.25
+) -> List[str]:
+    """
+    Returns a line for every regression from the baseline: a mean or median latency over `1 + tolerance` times the
+    baseline's, or any change in the number of calls of a hook or of an API method inside it.
+    """
+
+    regressions = []
+    for hook, result in results.items():
+        base = baseline.get(hook)
+        if base is None:
+            continue
+        if result["calls"] != base["calls"]:
+            regressions.append(
+                f"{hook}: called {result['calls']} times instead of {base['calls']}; the corpus changed"
+            )
+            continue
+        for statistic in ("mean", "p50"):
+            now, then = result["latency"][statistic], base["latency"][statistic]
+            if then and now > then * (1 + tolerance):
+                regressions.append(
+                    f"{hook}: {statistic} {now * 1e6:.0f}us, was {then * 1e6:.0f}us ({now / then - 1:+.0%})"
+                )
+        for name in sorted(set(result["api_calls"]) | set(base["api_calls"])):
+            now, then = result["api_calls"].get(name, 0), base["api_calls"].get(name, 0)
+            if now != then:
+                regressions.append(f"{hook}: {now} {name} calls, was {then}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bot", default=CORPUS_BOT)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument(
+        "--stride", type=int, default=10, help="use every this many turns"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        record_corpus(args.corpus)
+    positions = load_positions(args.corpus, args.stride)
+    results = run_benchmark(args.bot, positions, args.repeat)
+
+    print(
+        f"{'hook':<28}{'calls':>7}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}  api calls"
+    )
+    for hook, result in results.items():
+        latency = result["latency"]
+        api_calls = sum(result["api_calls"].values())
+        print(
+            f"{hook:<28}{result['calls']:>7}{latency['mean'] * 1e6:>10.0f}"
+            f"{latency['p50'] * 1e6:>10.0f}{latency['p99'] * 1e6:>10.0f}  {api_calls}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print("regression:", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of `ResourceCounts` against the previous list-subclass `Vector` implementation.
+
+Run with `python benchmarks/vector_benchmark.py` from the repository root.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import ResourceCounts  # noqa: E402
+
+
+class ListVector(list):
+    """The previous `Vector` implementation, kept here as the benchmark baseline."""
+
+    def __add__(self, other):
+        return ListVector([x + y for x, y in zip(self, other)])
+
+    def __sub__(self, other):
+        return ListVector([x - y for x, y in zip(self, other)])
+
+    def __iadd__(self, other):
+        assert len(self) == len(other)
+        for i in range(len(self)):
+            self[i] += other[i]
+        return self
+
+    def __isub__(self, other):
+        assert len(self) == len(other)
+        for i in range(len(self)):
+            self[i] -= other[i]
+        return self
+
+    def __le__(self, other):
+        return all([x <= y for x, y in zip(self, other)])
+
+    def __ge__(self, other):
+        return all([x >= y for x, y in zip(self, other)])
+
+
+class ListResourceCounts(ListVector):
+    def __init__(self, lumber=0, brick=0, grain=0, wool=0, ore=0):
+        ListVector.__init__(self, [lumber, brick, grain, wool, ore])
+
+    def __add__(self, other):
+        return ListResourceCounts(*[x + y for x, y in zip(self, other)])
+
+    def __sub__(self, other):
+        return ListResourceCounts(*[x - y for x, y in zip(self, other)])
+
+
+CASES = {
+    "construct": "cls(1, 2, 3, 4, 5)",
+    "a >= price": "hand >= price",
+    "a <= price": "hand <= price",
+    "a + b": "hand + price",
+    "a - b": "hand - price",
+    "a += b; a -= b": "hand += price; hand -= price",
+    "index": "hand[2]",
+}
+
+
+def run(number: int = 200_000, repeat: int = 5) -> list[tuple[str, float, float]]:
+    """Returns (case, baseline ns/op, current ns/op) for every benchmark case."""
+
+    results = []
+    for name, statement in CASES.items():
+        timings = []
+        for cls in (ListResourceCounts, ResourceCounts):
+            best = min(
+                timeit.repeat(
+                    statement,
+                    setup="hand = cls(3, 2, 4, 1, 3); price = cls(1, 1, 1, 1, 0)",
+                    globals={"cls": cls},
+                    number=number,
+                    repeat=repeat,
+                )
+            )
+            timings.append(best / number * 1e9)
+        results.append((name, timings[0], timings[1]))
+    return results
+
+
+def main():
+    print(f"{'case':<20}{'list ns/op':>12}{'slots ns/op':>13}{'speedup':>9}")
+    for name, baseline, current in run():
+        print(f"{name:<20}{baseline:>12.1f}{current:>13.1f}{baseline / current:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
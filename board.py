@@ -0,0 +1,167 @@
+"""
+Board generation for the reference engine.
+
+Terrains are pointy-top hexagons laid out in rings around the center terrain at (0, 0).
+A terrain with axial coordinates (q, r) is centered at (8q + 4r, 6r), and its corners are 4 units above and below
+its center and 4 units to each side, 2 units up or down.
+"""
+
+import functools
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from api import Lands, Position, Resources
+from topology import BoardTopology
+
+CORNER_OFFSETS: Tuple[Position, ...] = (
+    (0, -4),
+    (4, -2),
+    (4, 2),
+    (0, 4),
+    (-4, 2),
+    (-4, -2),
+)
+"""The offsets of a terrain's corners from its center, in clockwise order."""
+
+STANDARD_RADIUS = 2
+
+STANDARD_LANDS = (
+    [Lands.FOREST] * 4
+    + [Lands.HILLS] * 3
+    + [Lands.FIELDS] * 4
+    + [Lands.PASTURE] * 4
+    + [Lands.MOUNTAINS] * 3
+)
+"""The non-desert lands of the standard board."""
+
+STANDARD_NUMBERS = [2, 3, 3, 4, 4, 5, 5, 6, 6, 8, 8, 9, 9, 10, 10, 11, 11, 12]
+
+STANDARD_HARBORS: List[Optional[Resources]] = [None] * 4 + list(Resources)
+"""The harbors of the standard board, None being a 3-to-1 harbor."""
+
+
+@dataclass
+class Board:
+    """A generated board: its topology plus the land, number and harbor layout, indexed by topology IDs."""
+
+    topology: BoardTopology
+    lands: List[Lands]
+    """The land of each terrain."""
+    numbers: List[Optional[int]]
+    """The number of each terrain, or None for the desert."""
+    harbors: List[Tuple[int, Optional[Resources]]]
+    """The edge of each harbor and its resource, or None if a 3-to-1 harbor."""
+    desert: int
+    """The terrain the robber starts on."""
+    harbor_intersections: Dict[int, Optional[Resources]] = field(
+        init=False, repr=False, compare=False
+    )
+    """The resource of the harbor of every intersection on one, or None if a 3-to-1 harbor."""
+
+    def __post_init__(self):
+        self.harbor_intersections = {
+            intersection_id: resource
+            for edge_id, resource in self.harbors
+            for intersection_id in self.topology.edge_intersections(edge_id)
+        }
+
+
+def terrain_centers(radius: int = STANDARD_RADIUS) -> List[Position]:
+    """Returns the centers of the terrains of a board with the given number of rings around the center terrain."""
+
+    centers = []
+    for r in range(-radius, radius + 1):
+        for q in range(max(-radius, -r - radius), min(radius, -r + radius) + 1):
+            centers.append((8 * q + 4 * r, 6 * r))
+    return centers
+
+
+@functools.lru_cache(maxsize=None)
+def build_topology(radius: int = STANDARD_RADIUS) -> BoardTopology:
+    """
+    Returns the topology of a board with the given number of rings around the center terrain.
+
+    The topology is cached and shared, so it must not be modified.
+    """
+
+    terrains = terrain_centers(radius)
+    terrain_intersections: Dict[Position, List[Position]] = {}
+    intersections: Dict[Position, None] = {}
+    edges: Dict[frozenset, Tuple[Position, Position]] = {}
+    for x, y in terrains:
+        corners = [(x + dx, y + dy) for dx, dy in CORNER_OFFSETS]
+        terrain_intersections[(x, y)] = corners
+        for i, corner in enumerate(corners):
+            intersections.setdefault(corner)
+            ends = (corner, corners[(i + 1) % len(corners)])
+            edges.setdefault(frozenset(ends), ends)
+    return BoardTopology(
+        terrains, list(intersections), list(edges.values()), terrain_intersections
+    )
+
+
+def coastal_edges(topology: BoardTopology) -> List[int]:
+    """Returns the edges which border a single terrain, ordered clockwise around the board."""
+
+    terrain_counts = [0] * topology.num_edges
+    for terrain_id in range(topology.num_terrains):
+        for edge_id in topology.terrain_edges(terrain_id):
+            terrain_counts[edge_id] += 1
+
+    def angle(edge_id: int) -> float:
+        (ax, ay), (bx, by) = topology.edge_positions[edge_id]
+        return math.atan2(ay + by, ax + bx)
+
+    return sorted(
+        (edge_id for edge_id, count in enumerate(terrain_counts) if count == 1),
+        key=angle,
+    )
+
+
+def _numbers_are_spread(topology: BoardTopology, numbers: List[Optional[int]]) -> bool:
+    """Returns whether no two 6 or 8 terrains share an intersection."""
+
+    for intersection_id in range(topology.num_intersections):
+        hot = 0
+        for terrain_id in topology.intersection_terrains(intersection_id):
+            if numbers[terrain_id] in (6, 8):
+                hot += 1
+        if hot > 1:
+            return False
+    return True
+
+
+def generate_board(rng: random.Random, radius: int = STANDARD_RADIUS) -> Board:
+    """
+    Generates a random board. The desert is always the center terrain.
+
+    Larger boards repeat the standard land, number and harbor distributions.
+    """
+
+    topology = build_topology(radius)
+    desert = topology.terrain_id((0, 0))
+    producing = topology.num_terrains - 1
+
+    lands = [STANDARD_LANDS[i % len(STANDARD_LANDS)] for i in range(producing)]
+    rng.shuffle(lands)
+    lands.insert(desert, Lands.DESERT)
+
+    pool = [STANDARD_NUMBERS[i % len(STANDARD_NUMBERS)] for i in range(producing)]
+    for _ in range(100):
+        rng.shuffle(pool)
+        numbers: List[Optional[int]] = pool[:]
+        numbers.insert(desert, None)
+        if _numbers_are_spread(topology, numbers):
+            break
+
+    coast = coastal_edges(topology)
+    harbor_count = len(coast) * 3 // 10
+    kinds = [STANDARD_HARBORS[i % len(STANDARD_HARBORS)] for i in range(harbor_count)]
+    rng.shuffle(kinds)
+    harbors = [
+        (coast[i * len(coast) // harbor_count], kind) for i, kind in enumerate(kinds)
+    ]
+
+    return Board(topology, lands, numbers, harbors, desert)
@@ -1,4 +1,9 @@
 from api import *
+from hands import HandTracker
+from opening import OpeningEvaluator
+from opening_book import BoardLayout, default_book
+from topology import BoardTopology
+import numpy
 import random
 import math
 
@@ -10,41 +15,89 @@ class PRICES:
     DEVELOPMENT_CARD = ResourceCounts(grain=1, wool=1, ore=1)
 
 class MyBot(CatanBot):
-    def rank_land(self, position, curr_land_worth):
-        land = self.context.get_land(position)
+    def rank_land(self, terrain_id, curr_land_worth):
+        # The robber moves all the time, so rank the land as if it weren't there.
+        land, score = self.get_land_scores()[terrain_id]
         if land is None:
             return 0
-        land_num = self.context.get_number(position)
-        if land_num is None:
-            return 0
-
-        score = self.land_num_to_score[land_num]
-        res = self.land_worth_mult[land.value] * curr_land_worth[land.value] * score
-        curr_land_worth[land.value] -= score
+        res = self.land_worth_mult[land] * curr_land_worth[land] * score
+        curr_land_worth[land] -= score
         return res
 
     def update_land_worth_after_buy(self, intersection_position):
         # Calling rank_land with self.land_worth on each land updates it directly.
-        terrains = self.context.get_adjacent_terrains(intersection_position)
-        for land_pos in terrains:
-            self.rank_land(land_pos, self.land_worth)
+        topology = self.get_topology()
+        for terrain_id in topology.intersection_terrains(topology.intersection_id(intersection_position)):
+            self.rank_land(terrain_id, self.land_worth)
 
     def rank_intersection(self, position):
-        terrains = self.context.get_adjacent_terrains(position)
+        topology = self.get_topology()
+        terrain_ids = topology.intersection_terrains(topology.intersection_id(position))
         temp_land_worth = self.land_worth[::]
-        res = sum(self.rank_land(land_pos, temp_land_worth) for land_pos in terrains)
+        res = sum(self.rank_land(terrain_id, temp_land_worth) for terrain_id in terrain_ids)
         return res
 
+    def get_land_scores(self):
+        # Lands and numbers don't change during the game, so read them once.
+        if self.land_scores is None:
+            self.land_scores = []
+            for position in self.get_topology().terrain_positions:
+                land = self.context.get_land(position)
+                land_num = self.context.get_number(position)
+                if land is None or land_num is None:
+                    self.land_scores.append((None, 0))
+                else:
+                    self.land_scores.append((land.value, self.land_num_to_score[land_num]))
+        return self.land_scores
+
+    def get_topology(self) -> BoardTopology:
+        # The board doesn't change during the game, so index it once.
+        if self.topology is None:
+            self.topology = BoardTopology.from_api(self.context)
+        return self.topology
+
+    def get_opening(self) -> OpeningEvaluator:
+        if self.opening is None:
+            self.opening = OpeningEvaluator.from_api(self.context, self.get_topology())
+        return self.opening
+
+    def get_layout(self) -> BoardLayout:
+        if self.layout is None:
+            self.layout = BoardLayout.from_api(self.context, self.get_topology())
+        return self.layout
+
+    def update_from_events(self):
+        # Only look at what changed since the last call, instead of every intersection.
+        events, self.event_cursor = self.context.get_events_since(self.event_cursor)
+        self.hands.update(events)
+        topology = self.get_topology()
+        for event in events:
+            if event.type == Events.BUILD_SETTLEMENT:
+                self.built.add(topology.intersection_id(event.position))
+            elif event.type == Events.BUILD_ROAD:
+                self.roads.add(topology.edge_id(event.edge))
+
     def setup(self):
         self.current_stage = 1
+        self.topology = None
+        self.opening = None
+        self.layout = None
+        self.land_scores = None
+        self.event_cursor = 0
+        self.built = set()
+        self.roads = set()
+        self.hands = HandTracker(self.context.get_player_index())
         self.city_amounts = 0
 
         # [LUMBER, BRICK, GRAIN, WOOL, ORE, DESERT]
         self.land_worth = [36, 36, 36, 36, 36, 0]
         self.land_worth_mult = [1, 1, 1, 0.99, 1, 1]  # slightly less want wool
+        self.new_resource_worth = 20  # per resource an opening settlement adds to our production
+        self.harbor_worth = 4  # per pip of production a harbor can trade
 
         self.land_num_to_score = {2: 1, 3: 2, 4: 3, 5: 4, 6: 5, 8: 5, 9: 4, 10: 3, 11: 2, 12: 1}
-        self.min_count_to_trade = 6
+        self.cards_to_keep_after_trade = 2
+        self.max_road_path_length = 3
         self.development_card_chance = 3
 
     def play(self):
@@ -81,7 +134,7 @@ class MyBot(CatanBot):
             requested_counts[self.most_needed_resource()] = 2  # Request all.
             self.context.play_year_of_plenty(requested_counts)
         elif dev_cards[DevelopmentCards.MONOPOLY] > 0:
-            self.context.play_monopoly(self.most_needed_resource())
+            self.context.play_monopoly(self.best_monopoly_resource())
         elif dev_cards[DevelopmentCards.ROAD_BUILDING] > 0:
             roads_near_roads = self.get_roads_next_to_road()
             # Try to play 2 roads
@@ -96,33 +149,30 @@ class MyBot(CatanBot):
             my_cards -= save_cards
         if not (my_cards >= PRICES.CITY):
             return False
-        buildings = self.context.get_player_buildings(self.context.get_player_index())
-        for pos, building in buildings:
-            if building == Buildings.SETTLEMENT:
-                e = self.context.build_city(pos)
-                if e == Exceptions.OK:
-                    self.city_amounts += 1
-                    self.update_land_worth_after_buy(pos)
-                    return True
-                else:
-                    return False
+        for pos in self.context.get_legal_city_positions():
+            e = self.context.build_city(pos)
+            if e == Exceptions.OK:
+                self.city_amounts += 1
+                self.update_land_worth_after_buy(pos)
+                return True
+            else:
+                return False
         return False
     
     def valid_settlement_locations_now(self):
-        roads = self.context.get_player_roads(self.context.get_player_index())
-        valid_locations=[]
-        for intersection in self.context.get_intersections():
-            if self.context.get_current_building(intersection):
+        topology = self.get_topology()
+        road_ids = {topology.edge_id(road) for road in self.context.get_player_roads(self.context.get_player_index())}
+        self.update_from_events()
+        built = self.built
+        valid_locations = []
+        for intersection_id, position in enumerate(topology.intersection_positions):
+            if intersection_id in built:
                 continue
-            edges = self.context.get_adjacent_edges(intersection)
-            if not (set(roads) & set(edges)):
+            if not any(edge_id in road_ids for edge_id in topology.intersection_edges(intersection_id)):
                 continue
-            adj_intersections = self.context.get_adjacent_intersections(intersection)
-            for adj in adj_intersections:
-                if self.context.get_current_building(adj):
-                    break
-            else:
-                valid_locations.append(intersection)
+            if any(adj in built for adj in topology.intersection_neighbors(intersection_id)):
+                continue
+            valid_locations.append(position)
         return valid_locations
 
     def build_settlement(self, save_cards=None):
@@ -131,7 +181,7 @@ class MyBot(CatanBot):
             my_cards -= save_cards
         if not (my_cards >= PRICES.SETTLEMENT):
             return False
-        intersections= self.context.get_intersections()
+        intersections = self.context.get_legal_settlement_positions()
         random.shuffle(intersections)
         for intersection in intersections:
             e = self.context.build_settlement(intersection)
@@ -151,7 +201,14 @@ class MyBot(CatanBot):
             my_cards -= save_cards
         if not (my_cards >= PRICES.ROAD):
             return False
-        edges= self.context.get_edges()
+        path = self.best_road_path()
+        if path:
+            e = self.context.build_road(path[0])
+            if e == Exceptions.OK:
+                return True
+            elif e == Exceptions.NOT_ENOUGH_RESOURCES:
+                return False
+        edges = self.context.get_legal_road_edges()
         random.shuffle(edges)
         for edge in edges:
             e = self.context.build_road(edge)
@@ -163,35 +220,83 @@ class MyBot(CatanBot):
                 pass
         return
 
+    def best_monopoly_resource(self):
+        # Take the resource the opponents are expected to hold the most of.
+        self.update_from_events()
+        expected = [0.0] * 5
+        for player_index in range(4):
+            if player_index != self.context.get_player_index():
+                for resource, count in enumerate(self.hands.expected_counts(player_index)):
+                    expected[resource] += count
+        return Resources(expected.index(max(expected)))
+
+    def best_road_path(self):
+        # Head for the open settlement spot near our buildings that is worth the most per road it takes.
+        topology = self.get_topology()
+        self.update_from_events()
+        built = self.built
+        own = [topology.intersection_id(position) for position, _ in self.context.get_player_buildings(self.context.get_player_index())]
+        best_path = None
+        best_score = 0
+        for intersection_id, position in enumerate(topology.intersection_positions):
+            if intersection_id in built or any(adj in built for adj in topology.intersection_neighbors(intersection_id)):
+                continue
+            if not any(topology.distance(intersection_id, other) <= self.max_road_path_length for other in own):
+                continue
+            path = self.context.get_road_path(position)
+            if not path:
+                continue
+            score = self.rank_intersection(position) / len(path)
+            if score > best_score:
+                best_path, best_score = path, score
+        return best_path
+
     def most_needed_resource(self):
         res_counts = self.context.get_resource_counts()
         return Resources(res_counts.index(min(res_counts)))
 
     def trade_with_bank(self):
         res_counts = self.context.get_resource_counts()
+        rates = self.context.get_maritime_rates(self.context.get_player_index())
         min_resource = self.most_needed_resource()
         for i, count in enumerate(res_counts):
-            if count >= self.min_count_to_trade:
+            if count >= rates[i] + self.cards_to_keep_after_trade:
                 self.context.log_info(f"trading {i} with {min_resource}")
                 self.context.maritime_trade(i, Resources(min_resource))
                 return True
         return False
 
     def place_settlement_and_road(self):
-        best_position: Position | None = None
-        best_rank = 0
-        for position in self.context.get_intersections():
-            if self.context.get_current_building(position):
-                continue
-            rank = self.rank_intersection(position)
-            if rank > best_rank:
-                best_position = position
-                best_rank = rank
-        if best_position:
+        topology = self.get_topology()
+        # The buildings and roads so far come from the events, and the setup stage only has the distance rule.
+        self.update_from_events()
+        occupied = numpy.zeros(topology.num_intersections, dtype=bool)
+        occupied[list(self.built)] = True
+        roads = numpy.zeros(topology.num_edges, dtype=bool)
+        roads[list(self.roads)] = True
+        weights = [mult * worth for mult, worth in zip(self.land_worth_mult, self.land_worth[:5])]
+        production = [36 - worth for worth in self.land_worth[:5]]
+        book = default_book()
+        if book is None:
+            opening = self.get_opening()
+            best = opening.best_placement(
+                opening.legal_mask(occupied), weights, production, self.new_resource_worth, self.harbor_worth, ~roads
+            )
+        else:
+            # Boards repeat across games, so the placements may already be in the book.
+            placements = book.ranked_placements(
+                self.get_layout(), self.get_opening, occupied, roads, weights, production,
+                self.new_resource_worth, self.harbor_worth,
+            )
+            best = placements[0] if placements else None
+        if best:
+            intersection_id, edge_id, _ = best
+            best_position = topology.intersection_positions[intersection_id]
             self.context.build_settlement(best_position)
             #  Update worth of resources because the ones we bought are less needed.
             self.update_land_worth_after_buy(best_position)
-            self.context.build_road(self.context.get_adjacent_edges(best_position)[0])
+            if edge_id is not None:
+                self.context.build_road(topology.edge_positions[edge_id])
 
     def drop_resources(self):
         """
@@ -217,11 +322,13 @@ class MyBot(CatanBot):
             return
 
     def get_player_terrains(self, player_index: int) -> set[Position]:
+        topology = self.get_topology()
         buildings = self.context.get_player_buildings(player_index)
         my_terrains = set()
         for building in buildings:
             building: tuple[Position, Buildings]
-            my_terrains = my_terrains.union(self.context.get_adjacent_terrains(building[0]))
+            for terrain_id in topology.intersection_terrains(topology.intersection_id(building[0])):
+                my_terrains.add(topology.terrain_positions[terrain_id])
         return my_terrains
 
 
@@ -251,7 +358,11 @@ class MyBot(CatanBot):
             if self.context.get_number(target_terrain) is not None and self.land_num_to_score.get(self.context.get_number(target_terrain)) > best_score:
                 best_score = self.land_num_to_score.get(self.context.get_number(target_terrain))
                 best_target = target_terrain
-        for i in range(-1, 4):
+        # Steal from whoever most likely holds the resource we need most.
+        self.update_from_events()
+        needed = self.most_needed_resource()
+        victims = sorted(range(4), key=lambda i: -self.hands.probability(i, needed))
+        for i in victims + [-1]:
             if self.context.move_robber(best_target, i) != Exceptions.ILLEGAL_PLAYER_INDEX:
                 return
             
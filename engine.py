@@ -0,0 +1,2269 @@
+"""
+A headless reference engine implementing the `API` contract.
+
+`GameState` holds the rules and all mutable game state, indexed by `BoardTopology` IDs.
+`Game` owns a `GameState`, creates a `PlayerAPI` context and a bot per player, and drives the `CatanBot` hooks:
+
+```python
+from engine import Game
+from bot import MyBot
+
+result = Game([MyBot] * 4, seed=1).run()
+```
+"""
+
+import functools
+import inspect
+import logging
+import math
+import random
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from api import (
+    API,
+    Action,
+    Buildings,
+    CatanBot,
+    DevelopmentCardCounts,
+    DevelopmentCards,
+    Event,
+    Events,
+    Exceptions,
+    Lands,
+    Position,
+    ResourceCounts,
+    Resources,
+    Trade,
+)
+from board import Board, generate_board
+from placements import NO_PLAYER, LegalPlacements
+from production import ProductionTable
+from profiling import Profiler, profiled_api_class
+from roads import RoadNetwork
+from zobrist import zobrist_keys
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_COUNT = 5
+CITY_COUNT = 4
+ROAD_COUNT = 15
+BANK_RESOURCE_COUNT = 19
+DEVELOPMENT_DECK = (
+    [DevelopmentCards.KNIGHT] * 14
+    + [DevelopmentCards.ROAD_BUILDING] * 2
+    + [DevelopmentCards.YEAR_OF_PLENTY] * 2
+    + [DevelopmentCards.MONOPOLY] * 2
+    + [DevelopmentCards.VICTORY_POINT] * 5
+)
+
+WINNING_VICTORY_POINTS = 10
+LONGEST_ROAD_MIN_LENGTH = 5
+LARGEST_ARMY_MIN_SIZE = 3
+MAX_TRADE_OFFERS = 5
+MAX_HAND_SIZE = 7
+MARITIME_RATE = 4
+GENERIC_HARBOR_RATE = 3
+HARBOR_RATE = 2
+MAX_ACTIONS_PER_TURN = 100
+"""`play` is not called again after this many actions in a single turn."""
+MAX_TURNS = 1000
+"""The game ends without a winner after this many turns."""
+PLAN_ACTIONS = frozenset(
+    (
+        "play_knight",
+        "play_road_building",
+        "play_year_of_plenty",
+        "play_monopoly",
+        "build_road",
+        "build_settlement",
+        "build_city",
+        "buy_development_card",
+        "maritime_trade",
+        "propose_trade_offer",
+    )
+)
+"""The action methods allowed in `API.execute_plan`."""
+FINAL_PLAN_ACTIONS = frozenset(("play_knight", "propose_trade_offer"))
+"""The actions which end a plan, since `Game` resolves them after `play` returns."""
+ACTION_METHODS = tuple(
+    sorted(PLAN_ACTIONS)
+    + ["accept_trade_offer", "move_robber", "set_resources_to_drop"]
+)
+"""The names of all `API` action methods, which are reported to `Game.on_action`."""
+
+
+class PRICES:
+    ROAD = ResourceCounts(lumber=1, brick=1)
+    SETTLEMENT = ResourceCounts(lumber=1, brick=1, grain=1, wool=1)
+    CITY = ResourceCounts(grain=2, ore=3)
+    DEVELOPMENT_CARD = ResourceCounts(grain=1, wool=1, ore=1)
+
+
+class SPENT:
+    """The negative `PRICES`, shared by every `EventRecord` since records are copied before bots see them."""
+
+    NOTHING = ResourceCounts()
+    ROAD = NOTHING - PRICES.ROAD
+    SETTLEMENT = NOTHING - PRICES.SETTLEMENT
+    CITY = NOTHING - PRICES.CITY
+    DEVELOPMENT_CARD = NOTHING - PRICES.DEVELOPMENT_CARD
+
+
+@dataclass
+class GameResult:
+    """The outcome of a finished game."""
+
+    winner: Optional[int]
+    """The index of the winning player, or None if the game hit the turn limit."""
+    victory_points: List[int]
+    """The victory points of each player, including victory point development cards."""
+    turns: int
+    seed: Optional[int]
+
+
+class EventRecord(NamedTuple):
+    """An `Event` as recorded by `GameState`, over `BoardTopology` IDs."""
+
+    type: Events
+    player_index: int
+    other_player_index: int = NO_PLAYER
+    target: int = -1
+    """The intersection, edge or terrain ID, depending on the type."""
+    resource_counts: Optional[ResourceCounts] = None
+    value: Optional[int] = None
+    private: bool = False
+    """Whether only `player_index` and `other_player_index` may see the resource counts and value."""
+
+    def seen_by(self, player_index: int) -> "EventRecord":
+        """
+        Returns the record as the given player may see it: a private record of other players without its value, and
+        without its resource counts unless it's a development card purchase, whose price everyone sees.
+        """
+
+        if not self.private or player_index in (
+            self.player_index,
+            self.other_player_index,
+        ):
+            return self
+        if self.type == Events.BUY_DEVELOPMENT_CARD:
+            return self._replace(value=None)
+        return self._replace(resource_counts=None, value=None)
+
+
+class GameState:
+    """
+    The full state of a game and its rules, indexed by `BoardTopology` IDs.
+
+    Action methods apply the action for the given player if it is legal and return `Exceptions`.
+    They don't check timing (whose turn or which hook it is), which is the responsibility of `Game`.
+    """
+
+    def __init__(self, board: Board, player_count: int, rng: random.Random):
+        topology = board.topology
+        self.board = board
+        self.topology = topology
+        self.player_count = player_count
+        self.rng = rng
+
+        self.placements = LegalPlacements(topology, player_count)
+        self.building_owners = self.placements.building_owners
+        self.road_owners = self.placements.road_owners
+        self.roads = RoadNetwork(
+            topology, player_count, self.building_owners, self.road_owners
+        )
+        self.road_lengths = self.roads.lengths
+        self.building_types: List[int] = [NO_PLAYER] * topology.num_intersections
+        self.robber = board.desert
+        self.production = ProductionTable(
+            board, player_count, self.building_owners, self.building_types
+        )
+
+        self.bank = ResourceCounts(*[BANK_RESOURCE_COUNT] * len(Resources))
+        self.resources = [ResourceCounts() for _ in range(player_count)]
+        self.development_cards = [DevelopmentCardCounts() for _ in range(player_count)]
+        self.new_development_cards = [
+            DevelopmentCardCounts() for _ in range(player_count)
+        ]
+        """Development cards bought this turn, which are added to `development_cards` at the end of the turn."""
+        self.deck = DEVELOPMENT_DECK[:]
+        rng.shuffle(self.deck)
+
+        self.settlements_left = [SETTLEMENT_COUNT] * player_count
+        self.cities_left = [CITY_COUNT] * player_count
+        self.roads_left = [ROAD_COUNT] * player_count
+        self.army_sizes = [0] * player_count
+        self.trade_rates = [
+            [MARITIME_RATE] * len(Resources) for _ in range(player_count)
+        ]
+        """The amount of each resource every player has to pay the bank for a single resource."""
+        self.longest_road_player: Optional[int] = None
+        self.largest_army_player: Optional[int] = None
+
+        self.current_player = 0
+        self.turn = 0
+        self.roll = 0
+        self.played_development_card = False
+        self.trade_offer_count = 0
+
+        self.zobrist = zobrist_keys(topology, player_count)
+        self.hash = self.compute_hash()
+        """The Zobrist hash of the state, updated on every change."""
+
+        self.events: List[EventRecord] = []
+        self.event_offset = 0
+        """The number of events that happened before `events[0]`, which is nonzero in clones."""
+
+    def clone(self, rng: Optional[random.Random] = None) -> "GameState":
+        """
+        Returns an independent copy of the state, sharing only the immutable board.
+
+        The copy draws from `rng`, or from a copy of this state's random generator if not given.
+        """
+
+        clone = object.__new__(GameState)
+        clone.__dict__.update(self.__dict__)
+        if rng is None:
+            rng = random.Random()
+            rng.setstate(self.rng.getstate())
+        clone.rng = rng
+
+        clone.placements = self.placements.copy()
+        clone.building_owners = clone.placements.building_owners
+        clone.road_owners = clone.placements.road_owners
+        clone.roads = self.roads.copy(clone.building_owners, clone.road_owners)
+        clone.road_lengths = clone.roads.lengths
+        clone.building_types = self.building_types[:]
+        clone.production = self.production.copy(
+            clone.building_owners, clone.building_types
+        )
+        clone.bank = self.bank.copy()
+        clone.resources = [hand.copy() for hand in self.resources]
+        clone.development_cards = [cards.copy() for cards in self.development_cards]
+        clone.new_development_cards = [
+            cards.copy() for cards in self.new_development_cards
+        ]
+        clone.deck = self.deck[:]
+        clone.settlements_left = self.settlements_left[:]
+        clone.cities_left = self.cities_left[:]
+        clone.roads_left = self.roads_left[:]
+        clone.army_sizes = self.army_sizes[:]
+        clone.trade_rates = [rates[:] for rates in self.trade_rates]
+        clone.events = []
+        clone.event_offset = self.event_offset + len(self.events)
+        return clone
+
+    ### HIDDEN INFORMATION ###
+
+    def sample_hidden_resources(self, player_index: int, rng: random.Random) -> None:
+        """
+        Deals the other players new resources of the same counts, drawn from every card outside the given player's
+        hand, so the state only shows what that player can see. The bank keeps the rest.
+        """
+
+        keys = self.zobrist
+        left = [BANK_RESOURCE_COUNT - count for count in self.resources[player_index]]
+        remaining = sum(left)
+        for p in range(self.player_count):
+            if p == player_index:
+                continue
+            hand = self.resources[p]
+            old = list(hand)
+            new = [0] * len(old)
+            # Draw the cards one at a time without replacement, instead of shuffling every card outside the hand.
+            for _ in range(sum(old)):
+                pick = rng.randrange(remaining)
+                r = 0
+                while pick >= left[r]:
+                    pick -= left[r]
+                    r += 1
+                left[r] -= 1
+                new[r] += 1
+                remaining -= 1
+            for r, count in enumerate(new):
+                if count != old[r]:
+                    self.hash ^= keys.resource(p, r, old[r]) ^ keys.resource(
+                        p, r, count
+                    )
+                    hand[r] = count
+        for r, count in enumerate(left):
+            self.bank[r] = count
+
+    def shuffle_hidden_development_cards(
+        self, player_index: int, rng: random.Random
+    ) -> None:
+        """
+        Shuffles the other players' development cards together with the deck and deals them the same counts again,
+        so the state only shows what the given player can see.
+        """
+
+        keys = self.zobrist
+        cards = self.deck[:]
+        hidden = []
+        for p in range(self.player_count):
+            if p == player_index:
+                continue
+            for held, key in (
+                (self.development_cards[p], keys.development_card),
+                (self.new_development_cards[p], keys.new_development_card),
+            ):
+                old = list(held)
+                if any(old):
+                    for card, count in enumerate(old):
+                        if count:
+                            cards += [DevelopmentCards(card)] * count
+                    hidden.append((p, held, key, old))
+        rng.shuffle(cards)
+        for p, held, key, old in hidden:
+            new = [0] * len(old)
+            for card in cards[-sum(old) :]:
+                new[card] += 1
+            del cards[-sum(old) :]
+            for card, count in enumerate(new):
+                if count != old[card]:
+                    self.hash ^= key(p, card, old[card]) ^ key(p, card, count)
+                    held[card] = count
+        self.deck = cards
+
+    def record(
+        self,
+        type: Events,
+        player_index: int,
+        other_player_index: int = NO_PLAYER,
+        target: int = -1,
+        resource_counts: Optional[ResourceCounts] = None,
+        value: Optional[int] = None,
+        private: bool = False,
+    ) -> None:
+        """Records an event, which bots read through `PlayerAPI.get_events_since`."""
+
+        self.events.append(
+            EventRecord(
+                type,
+                player_index,
+                other_player_index,
+                target,
+                resource_counts,
+                value,
+                private,
+            )
+        )
+
+    ### HASHING ###
+
+    def compute_hash(self) -> int:
+        """Returns the Zobrist hash of the state, computed from scratch."""
+
+        keys = self.zobrist
+        result = keys.robber[self.robber] ^ keys.current_player[self.current_player]
+        if self.played_development_card:
+            result ^= keys.played_development_card
+        for intersection_id, owner in enumerate(self.building_owners):
+            if owner != NO_PLAYER:
+                result ^= keys.building(
+                    intersection_id, owner, self.building_types[intersection_id]
+                )
+        for edge_id, owner in enumerate(self.road_owners):
+            if owner != NO_PLAYER:
+                result ^= keys.road(edge_id, owner)
+        for player_index in range(self.player_count):
+            result ^= keys.army_size(player_index, self.army_sizes[player_index])
+            for i in range(len(Resources)):
+                result ^= keys.resource(
+                    player_index, i, self.resources[player_index][i]
+                )
+                result ^= keys.development_card(
+                    player_index, i, self.development_cards[player_index][i]
+                )
+                result ^= keys.new_development_card(
+                    player_index, i, self.new_development_cards[player_index][i]
+                )
+        return result
+
+    def _change_resource(self, player_index: int, resource: int, amount: int) -> None:
+        """Adds the given amount (which may be negative) of a resource to a player's hand, without touching the bank."""
+
+        hand = self.resources[player_index]
+        keys = self.zobrist
+        count = hand[resource]
+        self.hash ^= keys.resource(player_index, resource, count) ^ keys.resource(
+            player_index, resource, count + amount
+        )
+        hand[resource] = count + amount
+
+    def _change_resources(
+        self, player_index: int, counts: ResourceCounts, sign: int
+    ) -> None:
+        for resource in Resources:
+            if counts[resource]:
+                self._change_resource(player_index, resource, sign * counts[resource])
+
+    def _change_development_card(
+        self, player_index: int, card: int, amount: int, new: bool = False
+    ) -> None:
+        keys = self.zobrist
+        if new:
+            cards, key = (
+                self.new_development_cards[player_index],
+                keys.new_development_card,
+            )
+        else:
+            cards, key = self.development_cards[player_index], keys.development_card
+        count = cards[card]
+        self.hash ^= key(player_index, card, count) ^ key(
+            player_index, card, count + amount
+        )
+        cards[card] = count + amount
+
+    def _set_played_development_card(self, played: bool) -> None:
+        if played != self.played_development_card:
+            self.hash ^= self.zobrist.played_development_card
+            self.played_development_card = played
+
+    def place_robber(self, terrain_id: int) -> None:
+        """Moves the robber to the given terrain, without stealing."""
+
+        self.hash ^= self.zobrist.robber[self.robber] ^ self.zobrist.robber[terrain_id]
+        self.robber = terrain_id
+        self.production.move_robber(terrain_id)
+
+    ### VICTORY POINTS ###
+
+    def victory_points(self, player_index: int) -> int:
+        """Returns the visible victory points of the given player."""
+
+        points = (SETTLEMENT_COUNT - self.settlements_left[player_index]) + 2 * (
+            CITY_COUNT - self.cities_left[player_index]
+        )
+        if self.longest_road_player == player_index:
+            points += 2
+        if self.largest_army_player == player_index:
+            points += 2
+        return points
+
+    def total_victory_points(self, player_index: int) -> int:
+        """Returns the victory points of the given player, including victory point development cards."""
+
+        return (
+            self.victory_points(player_index)
+            + self.development_cards[player_index][DevelopmentCards.VICTORY_POINT]
+            + self.new_development_cards[player_index][DevelopmentCards.VICTORY_POINT]
+        )
+
+    def winner(self) -> Optional[int]:
+        """Returns the current player if they have won, since you can only win on your turn."""
+
+        if self.total_victory_points(self.current_player) >= WINNING_VICTORY_POINTS:
+            return self.current_player
+        return None
+
+    ### LONGEST ROAD AND LARGEST ARMY ###
+
+    def _update_longest_road(self) -> None:
+        holder = self.longest_road_player
+        best = max(self.road_lengths)
+        if (
+            holder is not None
+            and self.road_lengths[holder] == best
+            and best >= LONGEST_ROAD_MIN_LENGTH
+        ):
+            return
+        leaders = [p for p, length in enumerate(self.road_lengths) if length == best]
+        if best >= LONGEST_ROAD_MIN_LENGTH and len(leaders) == 1:
+            self.longest_road_player = leaders[0]
+        else:
+            self.longest_road_player = None
+
+    def _update_largest_army(self, player_index: int) -> None:
+        size = self.army_sizes[player_index]
+        holder = self.largest_army_player
+        if size < LARGEST_ARMY_MIN_SIZE or holder == player_index:
+            return
+        if holder is None or size > self.army_sizes[holder]:
+            self.largest_army_player = player_index
+
+    ### RESOURCES ###
+
+    def maritime_rates(self, player_index: int) -> List[int]:
+        """Returns the amount of each resource the player has to pay the bank for a single resource."""
+
+        return self.trade_rates[player_index]
+
+    def _add_harbor(self, player_index: int, resource: Optional[Resources]) -> None:
+        rates = self.trade_rates[player_index]
+        if resource is None:
+            for other in Resources:
+                rates[other] = min(rates[other], GENERIC_HARBOR_RATE)
+        else:
+            rates[resource] = HARBOR_RATE
+
+    def _pay(self, player_index: int, price: ResourceCounts) -> None:
+        self._change_resources(player_index, price, -1)
+        self.bank += price
+
+    def distribute(self, roll: int) -> None:
+        """Gives resources to every player with a building next to a terrain with the given number, unless the robber is on it."""
+
+        topology = self.topology
+        board = self.board
+        gains = [[0] * self.player_count for _ in Resources]
+        for terrain_id, number in enumerate(board.numbers):
+            if number != roll or terrain_id == self.robber:
+                continue
+            resource = board.lands[terrain_id]
+            for intersection_id in topology.terrain_intersections(terrain_id):
+                owner = self.building_owners[intersection_id]
+                if owner != NO_PLAYER:
+                    gains[resource][owner] += (
+                        2
+                        if self.building_types[intersection_id] == Buildings.CITY
+                        else 1
+                    )
+
+        produced: List[Optional[ResourceCounts]] = [None] * self.player_count
+        for resource, per_player in enumerate(gains):
+            total = sum(per_player)
+            if total == 0:
+                continue
+            if total > self.bank[resource]:
+                # The bank can't pay everyone, so it only pays a single receiving player what's left.
+                receivers = [p for p, amount in enumerate(per_player) if amount > 0]
+                if len(receivers) > 1:
+                    continue
+                per_player[receivers[0]] = self.bank[resource]
+            for player_index, amount in enumerate(per_player):
+                if amount:
+                    self._change_resource(player_index, resource, amount)
+                    self.bank[resource] -= amount
+                    if produced[player_index] is None:
+                        produced[player_index] = ResourceCounts()
+                    produced[player_index][resource] += amount
+
+        for player_index, counts in enumerate(produced):
+            if counts is not None:
+                self.record(Events.PRODUCE, player_index, resource_counts=counts)
+
+    def steal(self, thief: int, victim: int) -> Optional[Resources]:
+        """Moves a random resource from the victim to the thief, and returns it if the victim had any."""
+
+        hand = self.resources[victim]
+        total = sum(hand)
+        if total == 0:
+            return None
+        pick = self.rng.randrange(total)
+        for resource in Resources:
+            pick -= hand[resource]
+            if pick < 0:
+                self._change_resource(victim, resource, -1)
+                self._change_resource(thief, resource, 1)
+                stolen = ResourceCounts()
+                stolen[resource] = 1
+                self.record(
+                    Events.STEAL, thief, victim, resource_counts=stolen, private=True
+                )
+                return resource
+        return None
+
+    def check_drop(self, player_index: int, counts: ResourceCounts) -> Exceptions:
+        """Returns whether the player may drop the given resources, without dropping them."""
+
+        hand = self.resources[player_index]
+        if any(count < 0 for count in counts) or sum(counts) != sum(hand) // 2:
+            return Exceptions.BAD_AMOUNT
+        if not (counts <= hand):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        return Exceptions.OK
+
+    def drop(self, player_index: int, counts: ResourceCounts) -> Exceptions:
+        """Drops the given resources of a player who has to discard half of their hand."""
+
+        e = self.check_drop(player_index, counts)
+        if e != Exceptions.OK:
+            return e
+        self._pay(player_index, ResourceCounts(*counts))
+        self.record(
+            Events.DROP_RESOURCES,
+            player_index,
+            resource_counts=ResourceCounts() - counts,
+        )
+        return Exceptions.OK
+
+    def default_drop(self, player_index: int) -> ResourceCounts:
+        """Returns the first half of the player's resources, sorted according to the order in `Resources`."""
+
+        hand = self.resources[player_index]
+        remaining = sum(hand) // 2
+        counts = ResourceCounts()
+        for resource in Resources:
+            counts[resource] = min(hand[resource], remaining)
+            remaining -= counts[resource]
+        return counts
+
+    ### BUILDING ###
+
+    def build_settlement(
+        self, player_index: int, intersection_id: int, setup: bool = False
+    ) -> Exceptions:
+        """Builds a settlement. In the setup stage it is free and doesn't have to connect to a road."""
+
+        if self.settlements_left[player_index] == 0:
+            return Exceptions.OUT_OF_ITEMS
+        if not setup and not (PRICES.SETTLEMENT <= self.resources[player_index]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        legal = (
+            self.placements.open_intersections
+            if setup
+            else self.placements.settlements[player_index]
+        )
+        if intersection_id not in legal:
+            return Exceptions.ILLEGAL_POSITION
+
+        if not setup:
+            self._pay(player_index, PRICES.SETTLEMENT)
+        self._place_settlement(player_index, intersection_id)
+        self.record(
+            Events.BUILD_SETTLEMENT,
+            player_index,
+            target=intersection_id,
+            resource_counts=(SPENT.NOTHING if setup else SPENT.SETTLEMENT),
+        )
+        return Exceptions.OK
+
+    def _place_settlement(self, player_index: int, intersection_id: int) -> None:
+        self.settlements_left[player_index] -= 1
+        self.building_types[intersection_id] = Buildings.SETTLEMENT
+        self.hash ^= self.zobrist.building(
+            intersection_id, player_index, Buildings.SETTLEMENT
+        )
+        self.placements.add_settlement(player_index, intersection_id)
+        self.production.add_building(player_index, intersection_id)
+        harbors = self.board.harbor_intersections
+        if intersection_id in harbors:
+            self._add_harbor(player_index, harbors[intersection_id])
+
+        # The settlement may cut other players' roads.
+        if self.roads.add_settlement(player_index, intersection_id):
+            self._update_longest_road()
+
+    def build_city(self, player_index: int, intersection_id: int) -> Exceptions:
+        if self.cities_left[player_index] == 0:
+            return Exceptions.OUT_OF_ITEMS
+        if not (PRICES.CITY <= self.resources[player_index]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        if intersection_id not in self.placements.cities[player_index]:
+            return Exceptions.ILLEGAL_POSITION
+
+        self._pay(player_index, PRICES.CITY)
+        self._place_city(player_index, intersection_id)
+        self.record(
+            Events.BUILD_CITY,
+            player_index,
+            target=intersection_id,
+            resource_counts=SPENT.CITY,
+        )
+        return Exceptions.OK
+
+    def _place_city(self, player_index: int, intersection_id: int) -> None:
+        self.cities_left[player_index] -= 1
+        self.settlements_left[player_index] += 1
+        self.building_types[intersection_id] = Buildings.CITY
+        self.hash ^= self.zobrist.building(
+            intersection_id, player_index, Buildings.SETTLEMENT
+        ) ^ self.zobrist.building(intersection_id, player_index, Buildings.CITY)
+        self.placements.add_city(player_index, intersection_id)
+        self.production.add_building(player_index, intersection_id)
+
+    def build_road(
+        self, player_index: int, edge_id: int, free: bool = False
+    ) -> Exceptions:
+        """Builds a road. It is free in the setup stage and with a `DevelopmentCards.ROAD_BUILDING` card."""
+
+        if self.roads_left[player_index] == 0:
+            return Exceptions.OUT_OF_ITEMS
+        if not free and not (PRICES.ROAD <= self.resources[player_index]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        if edge_id not in self.placements.roads[player_index]:
+            return Exceptions.ILLEGAL_POSITION
+
+        if not free:
+            self._pay(player_index, PRICES.ROAD)
+        self._place_road(player_index, edge_id, SPENT.NOTHING if free else SPENT.ROAD)
+        return Exceptions.OK
+
+    def _place_road(
+        self, player_index: int, edge_id: int, spent: ResourceCounts = SPENT.NOTHING
+    ) -> None:
+        self.roads_left[player_index] -= 1
+        self.hash ^= self.zobrist.road(edge_id, player_index)
+        self.placements.add_road(player_index, edge_id)
+        self.roads.add_road(player_index, edge_id)
+        self._update_longest_road()
+        self.record(
+            Events.BUILD_ROAD,
+            player_index,
+            target=edge_id,
+            resource_counts=spent,
+        )
+
+    def place_setup_road(
+        self, player_index: int, edge_id: int, settlement: int
+    ) -> Exceptions:
+        """Builds the free road of the setup stage, which must touch the settlement just placed."""
+
+        if edge_id not in self.placements.setup_road_edges(settlement):
+            return Exceptions.ILLEGAL_POSITION
+        self._place_road(player_index, edge_id)
+        return Exceptions.OK
+
+    def give_setup_resources(self, player_index: int, intersection_id: int) -> None:
+        """Gives one resource from each terrain around the player's second setup settlement."""
+
+        produced = ResourceCounts()
+        for terrain_id in self.topology.intersection_terrains(intersection_id):
+            land = self.board.lands[terrain_id]
+            if land != Lands.DESERT and self.bank[land] > 0:
+                self.bank[land] -= 1
+                self._change_resource(player_index, land, 1)
+                produced[land] += 1
+        self.record(Events.PRODUCE, player_index, resource_counts=produced)
+
+    ### DEVELOPMENT CARDS ###
+
+    def buy_development_card(self, player_index: int) -> Exceptions:
+        if not self.deck:
+            return Exceptions.OUT_OF_ITEMS
+        if not (PRICES.DEVELOPMENT_CARD <= self.resources[player_index]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        self._pay(player_index, PRICES.DEVELOPMENT_CARD)
+        card = self.deck.pop()
+        self._change_development_card(player_index, card, 1, new=True)
+        self.record(
+            Events.BUY_DEVELOPMENT_CARD,
+            player_index,
+            resource_counts=SPENT.DEVELOPMENT_CARD,
+            value=card,
+            private=True,
+        )
+        return Exceptions.OK
+
+    def _use_development_card(
+        self, player_index: int, card: DevelopmentCards
+    ) -> Exceptions:
+        if self.played_development_card:
+            return Exceptions.ALREADY_PLAYED_DEVELOPMENT_CARD
+        if self.development_cards[player_index][card] == 0:
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        return Exceptions.OK
+
+    def _consume_development_card(
+        self,
+        player_index: int,
+        card: DevelopmentCards,
+        resources: Optional[ResourceCounts] = None,
+    ) -> None:
+        self._change_development_card(player_index, card, -1)
+        self._set_played_development_card(True)
+        self.record(
+            Events.PLAY_DEVELOPMENT_CARD,
+            player_index,
+            resource_counts=resources,
+            value=card,
+        )
+
+    def play_knight(self, player_index: int) -> Exceptions:
+        """Plays a knight. The caller is responsible for moving the robber afterwards."""
+
+        e = self._use_development_card(player_index, DevelopmentCards.KNIGHT)
+        if e != Exceptions.OK:
+            return e
+        self._consume_development_card(player_index, DevelopmentCards.KNIGHT)
+        self._add_knight(player_index)
+        return Exceptions.OK
+
+    def _add_knight(self, player_index: int) -> None:
+        self.hash ^= self.zobrist.army_size(
+            player_index, self.army_sizes[player_index]
+        ) ^ self.zobrist.army_size(player_index, self.army_sizes[player_index] + 1)
+        self.army_sizes[player_index] += 1
+        self._update_largest_army(player_index)
+
+    def play_road_building(self, player_index: int, edge_ids: List[int]) -> Exceptions:
+        e = self._use_development_card(player_index, DevelopmentCards.ROAD_BUILDING)
+        if e != Exceptions.OK:
+            return e
+        if not 1 <= len(edge_ids) <= 2 or len(set(edge_ids)) != len(edge_ids):
+            return Exceptions.BAD_AMOUNT
+        if self.roads_left[player_index] < len(edge_ids):
+            return Exceptions.OUT_OF_ITEMS
+
+        legal = self.placements.roads[player_index]
+        first, *rest = edge_ids
+        if first not in legal:
+            # The first road may instead be connected through the second one.
+            if not rest or rest[0] not in legal:
+                return Exceptions.ILLEGAL_POSITION
+            first, rest = rest[0], [first]
+        if (
+            rest
+            and rest[0] not in legal
+            and not self._extends(player_index, first, rest[0])
+        ):
+            return Exceptions.ILLEGAL_POSITION
+
+        self._consume_development_card(player_index, DevelopmentCards.ROAD_BUILDING)
+        for edge_id in (first, *rest):
+            self._place_road(player_index, edge_id)
+        return Exceptions.OK
+
+    def _extends(self, player_index: int, edge_id: int, other_edge_id: int) -> bool:
+        """Returns whether the empty `other_edge_id` would be connected to the player's network by a road at `edge_id`."""
+
+        if self.road_owners[other_edge_id] != NO_PLAYER:
+            return False
+        shared = set(self.topology.edge_intersections(edge_id)) & set(
+            self.topology.edge_intersections(other_edge_id)
+        )
+        return any(
+            self.building_owners[end] in (NO_PLAYER, player_index) for end in shared
+        )
+
+    def play_year_of_plenty(
+        self, player_index: int, resources: ResourceCounts
+    ) -> Exceptions:
+        e = self._use_development_card(player_index, DevelopmentCards.YEAR_OF_PLENTY)
+        if e != Exceptions.OK:
+            return e
+        if len(resources) != len(Resources) or any(count < 0 for count in resources):
+            return Exceptions.BAD_AMOUNT
+        if sum(resources) != 2:
+            return Exceptions.BAD_AMOUNT
+        if not (resources <= self.bank):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        self._consume_development_card(
+            player_index, DevelopmentCards.YEAR_OF_PLENTY, ResourceCounts(*resources)
+        )
+        self.bank -= resources
+        self._change_resources(player_index, resources, 1)
+        return Exceptions.OK
+
+    def play_monopoly(self, player_index: int, resource: Resources) -> Exceptions:
+        e = self._use_development_card(player_index, DevelopmentCards.MONOPOLY)
+        if e != Exceptions.OK:
+            return e
+        self._consume_development_card(player_index, DevelopmentCards.MONOPOLY)
+        for other in range(self.player_count):
+            count = self.resources[other][resource]
+            if other != player_index and count:
+                self._change_resource(other, resource, -count)
+                self._change_resource(player_index, resource, count)
+                taken = ResourceCounts()
+                taken[resource] = count
+                self.record(Events.STEAL, player_index, other, resource_counts=taken)
+        return Exceptions.OK
+
+    ### TRADING ###
+
+    def maritime_trade(
+        self, player_index: int, sell: Resources, receive: Resources
+    ) -> Exceptions:
+        if sell == receive:
+            return Exceptions.NOT_A_RESOURCE
+        rate = self.maritime_rates(player_index)[sell]
+        if self.resources[player_index][sell] < rate or self.bank[receive] == 0:
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        self._change_resource(player_index, sell, -rate)
+        self.bank[sell] += rate
+        self.bank[receive] -= 1
+        self._change_resource(player_index, receive, 1)
+        traded = ResourceCounts()
+        traded[sell] = -rate
+        traded[receive] = 1
+        self.record(Events.MARITIME_TRADE, player_index, resource_counts=traded)
+        return Exceptions.OK
+
+    def check_exchange(self, proposer: int, accepter: int, trade: Trade) -> Exceptions:
+        """Returns whether the players can afford the trade, without executing it."""
+
+        if not (trade.give_counts <= self.resources[proposer]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        if not (trade.receive_counts <= self.resources[accepter]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        return Exceptions.OK
+
+    def exchange(self, proposer: int, accepter: int, trade: Trade) -> Exceptions:
+        """Executes a trade offer proposed by `proposer` and accepted by `accepter`."""
+
+        e = self.check_exchange(proposer, accepter, trade)
+        if e != Exceptions.OK:
+            return e
+        self._change_resources(proposer, trade.give_counts, -1)
+        self._change_resources(accepter, trade.give_counts, 1)
+        self._change_resources(accepter, trade.receive_counts, -1)
+        self._change_resources(proposer, trade.receive_counts, 1)
+        self.record(
+            Events.TRADE,
+            proposer,
+            accepter,
+            resource_counts=trade.receive_counts - trade.give_counts,
+        )
+        return Exceptions.OK
+
+    ### ROBBER ###
+
+    def robber_victims(self, player_index: int, terrain_id: int) -> List[int]:
+        """Returns the other players with a building around the given terrain."""
+
+        victims = set()
+        for intersection_id in self.topology.terrain_intersections(terrain_id):
+            owner = self.building_owners[intersection_id]
+            if owner != NO_PLAYER and owner != player_index:
+                victims.add(owner)
+        return sorted(victims)
+
+    def move_robber(
+        self, player_index: int, terrain_id: int, victim: int
+    ) -> Exceptions:
+        if terrain_id == self.robber:
+            return Exceptions.ILLEGAL_POSITION
+        victims = self.robber_victims(player_index, terrain_id)
+        if victim not in victims and (victims or victim != -1):
+            return Exceptions.ILLEGAL_PLAYER_INDEX
+        self.place_robber(terrain_id)
+        self.record(Events.MOVE_ROBBER, player_index, victim, target=terrain_id)
+        if victim != -1:
+            self.steal(player_index, victim)
+        return Exceptions.OK
+
+    ### TURNS ###
+
+    def roll_dice(self, value: Optional[int] = None) -> int:
+        """Rolls the dice, or sets them to the given value."""
+
+        if value is None:
+            value = self.rng.randint(1, 6) + self.rng.randint(1, 6)
+        self.roll = value
+        self.record(Events.ROLL_DICE, self.current_player, value=value)
+        return value
+
+    def end_turn(self) -> None:
+        """Adds the development cards bought this turn and passes the turn to the next player."""
+
+        player_index = self.current_player
+        for card, count in enumerate(self.new_development_cards[player_index]):
+            if count:
+                self._change_development_card(player_index, card, -count, new=True)
+                self._change_development_card(player_index, card, count)
+        self._set_played_development_card(False)
+        self.trade_offer_count = 0
+        self.record(Events.END_TURN, player_index)
+        self.current_player = (player_index + 1) % self.player_count
+        self.hash ^= (
+            self.zobrist.current_player[player_index]
+            ^ self.zobrist.current_player[self.current_player]
+        )
+        self.turn += 1
+
+    ### REPLAYING ###
+
+    def apply(self, record: EventRecord, viewer: int = NO_PLAYER) -> None:
+        """
+        Applies a recorded event without checking it, to rebuild a state from the events of another one.
+        Random outcomes (the roll, stolen resources and bought cards) are taken from the events.
+
+        Pass the `viewer` to rebuild the state as a player sees it from records redacted by `EventRecord.seen_by`.
+        The other players are then given placeholder resources and development cards, which keep every count the
+        viewer can see right, and are swapped whenever a later event shows they were wrong.
+        """
+
+        events = self.events
+        # The methods below record their own events, which are replaced by the given one.
+        self.events = []
+        try:
+            self._apply(record, viewer)
+        finally:
+            self.events = events
+        events.append(record)
+
+    def _apply(self, record: EventRecord, viewer: int) -> None:
+        kind = record.type
+        player_index = record.player_index
+        other = record.other_player_index
+        counts = record.resource_counts
+        if viewer != NO_PLAYER:
+            counts = self._placeholder_counts(record)
+        if kind == Events.ROLL_DICE:
+            self.roll = record.value
+        elif kind in (Events.PRODUCE, Events.MARITIME_TRADE):
+            self.bank -= counts
+            self._change_resources(player_index, counts, 1)
+        elif kind == Events.DROP_RESOURCES:
+            self._pay(player_index, SPENT.NOTHING - counts)
+        elif kind == Events.BUILD_SETTLEMENT:
+            self._pay(player_index, SPENT.NOTHING - counts)
+            self._place_settlement(player_index, record.target)
+        elif kind == Events.BUILD_CITY:
+            self._pay(player_index, PRICES.CITY)
+            self._place_city(player_index, record.target)
+        elif kind == Events.BUILD_ROAD:
+            self._pay(player_index, SPENT.NOTHING - counts)
+            self._place_road(player_index, record.target)
+        elif kind == Events.BUY_DEVELOPMENT_CARD:
+            self._pay(player_index, PRICES.DEVELOPMENT_CARD)
+            card = record.value
+            if card is None:
+                card = max(sorted(set(self.deck)), key=self.deck.count)
+            elif card not in self.deck:
+                self._reclaim_development_card(card, viewer)
+            self.deck.remove(card)
+            self._change_development_card(player_index, card, 1, new=True)
+        elif kind == Events.PLAY_DEVELOPMENT_CARD:
+            if (
+                viewer != NO_PLAYER
+                and not self.development_cards[player_index][record.value]
+            ):
+                self._swap_development_card(player_index, record.value, viewer)
+            # The roads and resources taken by a road building or monopoly card are separate events.
+            self._consume_development_card(player_index, record.value)
+            if record.value == DevelopmentCards.KNIGHT:
+                self._add_knight(player_index)
+            elif record.value == DevelopmentCards.YEAR_OF_PLENTY:
+                self.bank -= counts
+                self._change_resources(player_index, counts, 1)
+        elif kind == Events.MOVE_ROBBER:
+            self.place_robber(record.target)
+        elif kind in (Events.STEAL, Events.TRADE):
+            self._change_resources(other, counts, -1)
+            self._change_resources(player_index, counts, 1)
+        elif kind == Events.END_TURN:
+            self.end_turn()
+        if viewer != NO_PLAYER:
+            for p in (player_index, other):
+                if p != NO_PLAYER:
+                    self._settle_placeholder_resources(p)
+
+    def _placeholder_counts(self, record: EventRecord) -> Optional[ResourceCounts]:
+        """Returns the record's resource counts, or a placeholder for those of a redacted steal."""
+
+        counts = record.resource_counts
+        if counts is None and record.type == Events.STEAL:
+            hand = self.resources[record.other_player_index]
+            counts = ResourceCounts()
+            counts[max(Resources, key=hand.__getitem__)] = 1
+        return counts
+
+    def _settle_placeholder_resources(self, player_index: int) -> None:
+        """Makes up for the negative counts of a player with placeholder resources from their largest counts."""
+
+        hand = self.resources[player_index]
+        for resource in Resources:
+            while hand[resource] < 0:
+                largest = max(Resources, key=hand.__getitem__)
+                if hand[largest] <= 0:
+                    return
+                self._change_resource(player_index, largest, -1)
+                self._change_resource(player_index, resource, 1)
+
+    def _reclaim_development_card(self, card: int, viewer: int) -> None:
+        """Puts the card back in the deck from another player's placeholder cards, giving them a deck card instead."""
+
+        for p in range(self.player_count):
+            if p == viewer:
+                continue
+            for new in (False, True):
+                held = (
+                    self.new_development_cards[p] if new else self.development_cards[p]
+                )
+                if held[card]:
+                    replacement = max(sorted(set(self.deck)), key=self.deck.count)
+                    self.deck.remove(replacement)
+                    self.deck.append(card)
+                    self._change_development_card(p, card, -1, new)
+                    self._change_development_card(p, replacement, 1, new)
+                    return
+
+    def _swap_development_card(self, player_index: int, card: int, viewer: int) -> None:
+        """Gives a player the card they played in place of one of their placeholder cards which they can play."""
+
+        held = self.development_cards[player_index]
+        placeholder = max(DevelopmentCards, key=held.__getitem__)
+        if not held[placeholder]:
+            return
+        if card in self.deck:
+            self.deck.remove(card)
+            self.deck.append(placeholder)
+        else:
+            for p in range(self.player_count):
+                if p == viewer:
+                    continue
+                for new in (False, True):
+                    other = (
+                        self.new_development_cards[p]
+                        if new
+                        else self.development_cards[p]
+                    )
+                    if other[card] and (p, new) != (player_index, False):
+                        self._change_development_card(p, card, -1, new)
+                        self._change_development_card(p, placeholder, 1, new)
+                        break
+                else:
+                    continue
+                break
+            else:
+                return
+        self._change_development_card(player_index, placeholder, -1)
+        self._change_development_card(player_index, card, 1)
+
+
+def _resource(value) -> Optional[Resources]:
+    try:
+        return Resources(value)
+    except ValueError:
+        return None
+
+
+class PlayerAPI(API):
+    """The `API` context of a single player in a `Game`."""
+
+    def __init__(self, game: "Game", player_index: int):
+        self.game = game
+        self.state = game.state
+        self.topology = game.state.topology
+        self.player_index = player_index
+
+    ### HELPERS ###
+
+    def _intersection_id(self, position) -> Optional[int]:
+        try:
+            return self.topology.intersection_ids.get(tuple(position))
+        except TypeError:
+            return None
+
+    def _terrain_id(self, position) -> Optional[int]:
+        try:
+            return self.topology.terrain_ids.get(tuple(position))
+        except TypeError:
+            return None
+
+    def _edge_id(self, ends) -> Optional[int]:
+        try:
+            a, b = ends
+            return self.topology.edge_ids.get((tuple(a), tuple(b)))
+        except (TypeError, ValueError):
+            return None
+
+    def _edges(self, edge_ids) -> list[Tuple[Position, Position]]:
+        positions = self.topology.edge_positions
+        return [positions[edge_id] for edge_id in edge_ids]
+
+    def _intersections(self, intersection_ids) -> list[Position]:
+        positions = self.topology.intersection_positions
+        return [positions[intersection_id] for intersection_id in intersection_ids]
+
+    def _can_act(self, *hooks: str) -> bool:
+        return self.game.can_act(self.player_index, hooks)
+
+    def _acted(self, e: Exceptions) -> Exceptions:
+        if e == Exceptions.OK:
+            call = self.game.concurrent_calls.get(self.player_index)
+            if call is None:
+                self.game.acted = True
+            else:
+                call.acted = True
+        return e
+
+    def _event(self, record: EventRecord) -> Event:
+        topology = self.topology
+        event = Event(
+            record.type,
+            record.player_index,
+            (
+                None
+                if record.other_player_index == NO_PLAYER
+                else record.other_player_index
+            ),
+        )
+        if record.type in (Events.BUILD_SETTLEMENT, Events.BUILD_CITY):
+            event.position = topology.intersection_positions[record.target]
+        elif record.type == Events.BUILD_ROAD:
+            event.edge = topology.edge_positions[record.target]
+        elif record.type == Events.MOVE_ROBBER:
+            event.position = topology.terrain_positions[record.target]
+        record = record.seen_by(self.player_index)
+        if record.resource_counts is not None:
+            event.resource_counts = record.resource_counts.copy()
+        event.value = record.value
+        return event
+
+    ### SIMULATION UTILITIES ###
+
+    def breakpoint(self) -> None:
+        self.game.breakpoint_requested = True
+
+    def log_info(self, message: str) -> None:
+        logger.info("[player %d] %s", self.player_index, message)
+
+    def fork(self) -> "SimulationAPI":
+        game = self.game
+        game.fork_count += 1
+        # Seed the fork without drawing from the game's generator, so forking doesn't change the game.
+        rng = random.Random(hash((game.seed or 0, self.state.turn, game.fork_count)))
+        state = self.state.clone(rng)
+        # The fork must not reveal the opponents' hands, so deal them cards consistent with what the player sees.
+        state.sample_hidden_resources(self.player_index, rng)
+        state.shuffle_hidden_development_cards(self.player_index, rng)
+        simulation = Simulation(
+            state, game.distance, game.player_deadline(self.player_index)
+        )
+        return simulation.contexts[self.player_index]
+
+    def roll_dice(self, value: Optional[int] = None) -> Exceptions:
+        return Exceptions.BAD_TIMING
+
+    def end_turn(self) -> Exceptions:
+        return Exceptions.BAD_TIMING
+
+    ### GENERAL ###
+
+    def get_player_index(self) -> int:
+        return self.player_index
+
+    def get_time_remaining(self) -> float:
+        return self.game.time_remaining(self.player_index)
+
+    ### BOARD GETTERS ###
+
+    def get_terrains(self) -> list[Position]:
+        return self.topology.terrain_positions[:]
+
+    def get_intersections(self) -> list[Position]:
+        return self.topology.intersection_positions[:]
+
+    def get_edges(self) -> list[Tuple[Position, Position]]:
+        return self.topology.edge_positions[:]
+
+    def get_adjacent_terrains(self, position: Position) -> list[Position]:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return []
+        positions = self.topology.terrain_positions
+        return [
+            positions[terrain_id]
+            for terrain_id in self.topology.intersection_terrains(intersection_id)
+        ]
+
+    def get_adjacent_intersections(self, position: Position) -> list[Position]:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is not None:
+            return self._intersections(
+                self.topology.intersection_neighbors(intersection_id)
+            )
+        terrain_id = self._terrain_id(position)
+        if terrain_id is not None:
+            return self._intersections(self.topology.terrain_intersections(terrain_id))
+        return []
+
+    def get_adjacent_edges(self, position: Position) -> list[Tuple[Position, Position]]:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is not None:
+            return self._edges(self.topology.intersection_edges(intersection_id))
+        terrain_id = self._terrain_id(position)
+        if terrain_id is not None:
+            return self._edges(self.topology.terrain_edges(terrain_id))
+        return []
+
+    def get_distance(self, x: Position, y: Position) -> int:
+        x_id, y_id = self._intersection_id(x), self._intersection_id(y)
+        if x_id is None or y_id is None:
+            return -1
+        return self.game.distance(x_id, y_id)
+
+    def get_land(self, position: Position) -> Optional[Lands]:
+        terrain_id = self._terrain_id(position)
+        if terrain_id is None:
+            return None
+        return self.state.board.lands[terrain_id]
+
+    def get_number(self, position: Position) -> Optional[int]:
+        terrain_id = self._terrain_id(position)
+        if terrain_id is None:
+            return None
+        return self.state.board.numbers[terrain_id]
+
+    def get_current_building(
+        self, position: Position
+    ) -> Optional[Tuple[Buildings, int]]:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return None
+        owner = self.state.building_owners[intersection_id]
+        if owner == NO_PLAYER:
+            return None
+        return Buildings(self.state.building_types[intersection_id]), owner
+
+    def get_current_road(self, ends: Tuple[Position, Position]) -> Optional[int]:
+        edge_id = self._edge_id(ends)
+        if edge_id is None:
+            return None
+        owner = self.state.road_owners[edge_id]
+        return None if owner == NO_PLAYER else owner
+
+    def get_current_robber_position(self) -> Position:
+        return self.topology.terrain_positions[self.state.robber]
+
+    def get_harbor_positions(
+        self,
+    ) -> list[Tuple[Tuple[Position, Position], Optional[Resources]]]:
+        positions = self.topology.edge_positions
+        return [
+            (positions[edge_id], resource)
+            for edge_id, resource in self.state.board.harbors
+        ]
+
+    def get_harbor_intersections(self) -> dict[Position, Optional[Resources]]:
+        positions = self.topology.intersection_positions
+        return {
+            positions[intersection_id]: resource
+            for intersection_id, resource in self.state.board.harbor_intersections.items()
+        }
+
+    def get_player_buildings(
+        self, player_index: int
+    ) -> list[Tuple[Position, Buildings]]:
+        positions = self.topology.intersection_positions
+        types = self.state.building_types
+        return [
+            (positions[intersection_id], Buildings(types[intersection_id]))
+            for intersection_id, owner in enumerate(self.state.building_owners)
+            if owner == player_index
+        ]
+
+    def get_player_roads(self, player_index: int) -> list[Tuple[Position, Position]]:
+        return self._edges(
+            edge_id
+            for edge_id, owner in enumerate(self.state.road_owners)
+            if owner == player_index
+        )
+
+    ### PLACEMENT GETTERS ###
+
+    def get_legal_settlement_positions(self) -> list[Position]:
+        game = self.game
+        if game.setup_player == self.player_index:
+            if game.setup_settlement is not None:
+                return []
+            return self._intersections(sorted(self.state.placements.open_intersections))
+        return self._intersections(
+            sorted(self.state.placements.settlements[self.player_index])
+        )
+
+    def get_legal_city_positions(self) -> list[Position]:
+        return self._intersections(
+            sorted(self.state.placements.cities[self.player_index])
+        )
+
+    def get_legal_road_edges(self) -> list[Tuple[Position, Position]]:
+        game = self.game
+        if game.setup_player == self.player_index:
+            if game.setup_settlement is None or game.setup_road_built:
+                return []
+            return self._edges(
+                self.state.placements.setup_road_edges(game.setup_settlement)
+            )
+        return self._edges(sorted(self.state.placements.roads[self.player_index]))
+
+    def get_road_path(
+        self, position: Position
+    ) -> Optional[list[Tuple[Position, Position]]]:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return None
+        path = self.state.roads.shortest_path(self.player_index, intersection_id)
+        return None if path is None else self._edges(path)
+
+    ### RESOURCE GETTERS ###
+
+    def get_resource_counts(self) -> ResourceCounts:
+        return self.state.resources[self.player_index].copy()
+
+    def get_development_cards(self) -> DevelopmentCardCounts:
+        return self.state.development_cards[self.player_index].copy()
+
+    def get_playable_development_cards(self) -> DevelopmentCardCounts:
+        state = self.state
+        if state.played_development_card or state.current_player != self.player_index:
+            return DevelopmentCardCounts()
+        playable = self.state.development_cards[self.player_index].copy()
+        playable[DevelopmentCards.VICTORY_POINT] = 0
+        return playable
+
+    def get_total_resource_count(self, player_index: int) -> int:
+        if not 0 <= player_index < self.state.player_count:
+            return 0
+        return sum(self.state.resources[player_index])
+
+    def get_total_development_card_count(self, player_index: int) -> int:
+        if not 0 <= player_index < self.state.player_count:
+            return 0
+        return sum(self.state.development_cards[player_index]) + sum(
+            self.state.new_development_cards[player_index]
+        )
+
+    def get_maritime_rates(self, player_index: int) -> ResourceCounts:
+        if not 0 <= player_index < self.state.player_count:
+            return ResourceCounts()
+        return ResourceCounts(*self.state.trade_rates[player_index])
+
+    ### ADDITIONAL GAME INFORMATION GETTERS ###
+
+    def get_victory_points(self, player_index: int) -> int:
+        if not 0 <= player_index < self.state.player_count:
+            return 0
+        return self.state.victory_points(player_index)
+
+    def get_road_length(self, player_index: int) -> int:
+        if not 0 <= player_index < self.state.player_count:
+            return 0
+        return self.state.road_lengths[player_index]
+
+    def get_army_size(self, player_index: int) -> int:
+        if not 0 <= player_index < self.state.player_count:
+            return 0
+        return self.state.army_sizes[player_index]
+
+    def get_road_length_with_road(self, ends: Tuple[Position, Position]) -> int:
+        edge_id = self._edge_id(ends)
+        if (
+            edge_id is None
+            or edge_id not in self.state.placements.roads[self.player_index]
+        ):
+            return self.state.road_lengths[self.player_index]
+        return self.state.roads.length_with(self.player_index, edge_id)
+
+    def get_longest_road_player_index(self) -> Optional[int]:
+        return self.state.longest_road_player
+
+    def get_largest_army_player_index(self) -> Optional[int]:
+        return self.state.largest_army_player
+
+    ### TURN GETTERS ###
+
+    def get_current_roll(self) -> int:
+        return self.state.roll
+
+    def get_state_hash(self) -> int:
+        return self.state.hash
+
+    def get_production_matrix(self) -> list[ResourceCounts]:
+        production = self.state.production
+        return [
+            production.intersection(intersection_id)
+            for intersection_id in range(self.topology.num_intersections)
+        ]
+
+    def get_intersection_production(self, position: Position) -> ResourceCounts:
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return ResourceCounts()
+        return self.state.production.intersection(intersection_id)
+
+    def get_player_production(self, player_index: int) -> ResourceCounts:
+        if not 0 <= player_index < self.state.player_count:
+            return ResourceCounts()
+        return self.state.production.player(player_index)
+
+    ### EVENT GETTERS ###
+
+    def get_events_since(self, cursor: int = 0) -> Tuple[list[Event], int]:
+        state = self.state
+        start = max(cursor - state.event_offset, 0)
+        return [self._event(record) for record in state.events[start:]], (
+            state.event_offset + len(state.events)
+        )
+
+    ### OFFER GETTERS ###
+
+    def get_pending_trade_offers(self) -> list[Trade]:
+        game = self.game
+        if (
+            game.hook_player != self.player_index
+            and self.player_index not in game.concurrent_calls
+        ):
+            return []
+        return [trade.copy() for _, trade in game.pending_offers]
+
+    ### ACTIONS ###
+
+    def play_knight(self) -> Exceptions:
+        if not self._can_act("play", "before_dice"):
+            return Exceptions.BAD_TIMING
+        e = self.state.play_knight(self.player_index)
+        if e == Exceptions.OK:
+            self.game.robber_pending = True
+        return self._acted(e)
+
+    def play_road_building(
+        self, road_positions: List[Tuple[Position, Position]]
+    ) -> Exceptions:
+        if not self._can_act("play", "before_dice"):
+            return Exceptions.BAD_TIMING
+        edge_ids = [self._edge_id(ends) for ends in road_positions]
+        if None in edge_ids:
+            return Exceptions.ILLEGAL_POSITION
+        return self._acted(self.state.play_road_building(self.player_index, edge_ids))
+
+    def play_year_of_plenty(self, resources: ResourceCounts) -> Exceptions:
+        if not self._can_act("play", "before_dice"):
+            return Exceptions.BAD_TIMING
+        return self._acted(
+            self.state.play_year_of_plenty(
+                self.player_index, ResourceCounts(*resources)
+            )
+        )
+
+    def play_monopoly(self, resource: Resources) -> Exceptions:
+        if not self._can_act("play", "before_dice"):
+            return Exceptions.BAD_TIMING
+        resource = _resource(resource)
+        if resource is None:
+            return Exceptions.NOT_A_RESOURCE
+        return self._acted(self.state.play_monopoly(self.player_index, resource))
+
+    def build_road(self, ends: Tuple[Position, Position]) -> Exceptions:
+        game = self.game
+        if game.setup_player == self.player_index:
+            if not self._can_act("place_settlement_and_road"):
+                return Exceptions.BAD_TIMING
+            if game.setup_settlement is None or game.setup_road_built:
+                return Exceptions.BAD_TIMING
+            edge_id = self._edge_id(ends)
+            if edge_id is None:
+                return Exceptions.ILLEGAL_POSITION
+            e = self.state.place_setup_road(
+                self.player_index, edge_id, game.setup_settlement
+            )
+            if e == Exceptions.OK:
+                game.setup_road_built = True
+            return e
+        if not self._can_act("play"):
+            return Exceptions.BAD_TIMING
+        edge_id = self._edge_id(ends)
+        if edge_id is None:
+            return Exceptions.ILLEGAL_POSITION
+        return self._acted(self.state.build_road(self.player_index, edge_id))
+
+    def build_settlement(self, position: Position) -> Exceptions:
+        game = self.game
+        if game.setup_player == self.player_index:
+            if not self._can_act("place_settlement_and_road"):
+                return Exceptions.BAD_TIMING
+            if game.setup_settlement is not None:
+                return Exceptions.BAD_TIMING
+            intersection_id = self._intersection_id(position)
+            if intersection_id is None:
+                return Exceptions.ILLEGAL_POSITION
+            e = self.state.build_settlement(
+                self.player_index, intersection_id, setup=True
+            )
+            if e == Exceptions.OK:
+                game.setup_settlement = intersection_id
+            return e
+        if not self._can_act("play"):
+            return Exceptions.BAD_TIMING
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return Exceptions.ILLEGAL_POSITION
+        return self._acted(
+            self.state.build_settlement(self.player_index, intersection_id)
+        )
+
+    def build_city(self, position: Position) -> Exceptions:
+        if not self._can_act("play"):
+            return Exceptions.BAD_TIMING
+        intersection_id = self._intersection_id(position)
+        if intersection_id is None:
+            return Exceptions.ILLEGAL_POSITION
+        return self._acted(self.state.build_city(self.player_index, intersection_id))
+
+    def buy_development_card(self) -> Exceptions:
+        if not self._can_act("play"):
+            return Exceptions.BAD_TIMING
+        return self._acted(self.state.buy_development_card(self.player_index))
+
+    def maritime_trade(self, sell: Resources, receive: Resources) -> Exceptions:
+        if not self._can_act("play"):
+            return Exceptions.BAD_TIMING
+        sell, receive = _resource(sell), _resource(receive)
+        if sell is None or receive is None:
+            return Exceptions.NOT_A_RESOURCE
+        return self._acted(self.state.maritime_trade(self.player_index, sell, receive))
+
+    def propose_trade_offer(self, trade: Trade) -> Exceptions:
+        game = self.game
+        state = self.state
+        own_turn = state.current_player == self.player_index
+        if not (
+            self._can_act("play")
+            or (not own_turn and self._can_act("respond_to_trade_offers"))
+        ):
+            return Exceptions.BAD_TIMING
+        give, receive = ResourceCounts(*trade.give_counts), ResourceCounts(
+            *trade.receive_counts
+        )
+        if any(count < 0 for count in give) or any(count < 0 for count in receive):
+            return Exceptions.BAD_AMOUNT
+        if not (give <= state.resources[self.player_index]):
+            return Exceptions.NOT_ENOUGH_RESOURCES
+        if own_turn:
+            if state.trade_offer_count >= MAX_TRADE_OFFERS:
+                return Exceptions.TOO_MANY_TRADES
+            state.trade_offer_count += 1
+        call = game.concurrent_calls.get(self.player_index)
+        if call is None:
+            game.proposed_trade = Trade(give, receive)
+        else:
+            call.proposed_trade = Trade(give, receive)
+        return self._acted(Exceptions.OK)
+
+    def accept_trade_offer(self, trade_offer_index: int) -> Exceptions:
+        game = self.game
+        if not self._can_act("respond_to_trade_offers"):
+            return Exceptions.BAD_TIMING
+        if not 0 <= trade_offer_index < len(game.pending_offers):
+            return Exceptions.ILLEGAL_OFFER_INDEX
+        proposer, trade = game.pending_offers[trade_offer_index]
+        call = game.concurrent_calls.get(self.player_index)
+        if call is not None:
+            # Only the first accepting player in seat order trades, once every call returns.
+            e = self.state.check_exchange(proposer, self.player_index, trade)
+            if e == Exceptions.OK:
+                call.accepted_offer = trade_offer_index
+            return self._acted(e)
+        e = self.state.exchange(proposer, self.player_index, trade)
+        if e == Exceptions.OK:
+            game.accepted_offer = trade_offer_index
+        return self._acted(e)
+
+    def move_robber(self, position: Position, player_index: int) -> Exceptions:
+        if not self._can_act("move_robber"):
+            return Exceptions.BAD_TIMING
+        terrain_id = self._terrain_id(position)
+        if terrain_id is None:
+            return Exceptions.ILLEGAL_POSITION
+        if not -1 <= player_index < self.state.player_count:
+            return Exceptions.ILLEGAL_PLAYER_INDEX
+        return self._acted(
+            self.state.move_robber(self.player_index, terrain_id, player_index)
+        )
+
+    def execute_plan(self, actions: List[Action]) -> List[Exceptions]:
+        if not actions:
+            return []
+        if not self._can_act("play"):
+            return [Exceptions.BAD_TIMING]
+        game = self.game
+        results = []
+        acted = False
+        try:
+            for action in actions:
+                if action.method not in PLAN_ACTIONS:
+                    results.append(Exceptions.BAD_TIMING)
+                    break
+                # Every action runs as if in a new `play` call.
+                game.acted = False
+                e = getattr(self, action.method)(*action.arguments)
+                results.append(e)
+                if e != Exceptions.OK:
+                    break
+                acted = True
+                if (
+                    action.method in FINAL_PLAN_ACTIONS
+                    or self.state.winner() is not None
+                ):
+                    break
+        finally:
+            game.acted = acted
+        return results
+
+    def set_resources_to_drop(self, resource_counts: ResourceCounts) -> Exceptions:
+        if not self._can_act("drop_resources"):
+            return Exceptions.BAD_TIMING
+        if len(resource_counts) != len(Resources):
+            return Exceptions.BAD_AMOUNT
+        call = self.game.concurrent_calls.get(self.player_index)
+        if call is not None:
+            e = self.state.check_drop(self.player_index, resource_counts)
+            if e == Exceptions.OK:
+                call.drop = ResourceCounts(*resource_counts)
+            return self._acted(e)
+        return self._acted(self.state.drop(self.player_index, resource_counts))
+
+
+def _observed(name: str, method):
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if kwargs:
+            args = signature.bind(self, *args, **kwargs).args[1:]
+        self.game.on_action(self, name, args, result)
+        return result
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def observed_api_class(api_class: type) -> type:
+    """Returns a subclass of the given `PlayerAPI` class which reports every action to `Game.on_action`."""
+
+    methods = {
+        name: _observed(name, getattr(api_class, name)) for name in ACTION_METHODS
+    }
+    return type("Observed" + api_class.__name__, (api_class,), methods)
+
+
+class HookCall:
+    """
+    A hook call running at the same time as the other players' calls of the hook, in `Game.call_concurrently`.
+
+    Its actions are only checked against the state, and kept here for the game to run once every call returns.
+    """
+
+    __slots__ = (
+        "hook",
+        "limits",
+        "deadline",
+        "acted",
+        "proposed_trade",
+        "accepted_offer",
+        "drop",
+    )
+
+    def __init__(self, hook: str, limits: Optional[Tuple[float, float]]):
+        self.hook = hook
+        self.limits = limits
+        self.deadline: Optional[float] = None
+        self.acted = False
+        self.proposed_trade: Optional[Trade] = None
+        self.accepted_offer: Optional[int] = None
+        self.drop: Optional[ResourceCounts] = None
+
+
+class Game:
+    """
+    A single game between bots, driving their `CatanBot` hooks in the order their docstrings describe.
+
+    Bots may only run actions in the hooks which allow them, and only a single successful action per hook
+    invocation; any other action returns `Exceptions.BAD_TIMING`. Exceptions raised by bots are logged and
+    treated as if the hook did nothing.
+
+    With `hook_threads`, `respond_to_trade_offers` and `drop_resources` are called for all the players they concern
+    at once (see `call_concurrently`): every opponent answers a trade offer, and the first one in seat order from the
+    current player who accepts it trades. Without, the opponents are asked one after another until one accepts.
+    """
+
+    def __init__(
+        self,
+        bot_classes: Sequence[Type[CatanBot]],
+        seed: Optional[int] = None,
+        board: Optional[Board] = None,
+        max_turns: int = MAX_TURNS,
+        profiler: Optional[Profiler] = None,
+        hook_time_limit: Optional[float] = None,
+        game_time_limit: Optional[float] = None,
+        on_action: Optional[
+            Callable[["PlayerAPI", str, tuple, Exceptions], None]
+        ] = None,
+        state: Optional["GameState"] = None,
+        hook_threads: int = 0,
+    ):
+        """
+        Pass a `Profiler` to time every hook and `API` call of the bots.
+
+        `hook_time_limit` is the seconds each hook call may take, and `game_time_limit` the seconds each bot's hooks
+        may take in total. Actions after the limit fail, and bots out of game time aren't called anymore.
+
+        `on_action` is called with the context, method name, positional arguments and result of every action a bot
+        runs. Pass a `state` at the start of a turn after the setup stage to continue a game from it, using its
+        board and random generator.
+
+        `hook_threads` is the number of threads running the hooks of `CatanBot.concurrent` bots concurrently, or 0 to
+        call every hook one at a time.
+        """
+
+        self.seed = seed
+        if state is None:
+            self.rng = random.Random(seed)
+            if board is None:
+                board = generate_board(self.rng)
+            state = GameState(board, len(bot_classes), self.rng)
+        else:
+            self.rng = state.rng
+        self.state = state
+        self.max_turns = max_turns
+
+        self.hook: Optional[str] = None
+        self.hook_player = NO_PLAYER
+        self.acted = False
+        self.breakpoint_requested = False
+        self.robber_pending = False
+        self.proposed_trade: Optional[Trade] = None
+        self.pending_offers: List[Tuple[int, Trade]] = []
+        """The trade offers available to the player in `respond_to_trade_offers`, with the index of their proposer."""
+        self.accepted_offer: Optional[int] = None
+        self.setup_player = NO_PLAYER
+        self.setup_settlement: Optional[int] = None
+        self.setup_road_built = False
+        self.setup_round = 0
+        self.set_up = state.turn > 0
+        self.finished = False
+        self.winner: Optional[int] = None
+        self.bot_errors = [0] * len(bot_classes)
+        self.hook_time_limit = hook_time_limit
+        self.game_time_limit = game_time_limit
+        self.deadline: Optional[float] = None
+        """The `time.perf_counter` time the current hook's actions must run by, if there's a time limit."""
+        self.time_used = [0.0] * len(bot_classes)
+        self.timeouts = [0] * len(bot_classes)
+        """The number of hook calls which ran out of time (or were skipped because of it) per player."""
+        self.fork_count = 0
+        self.hook_threads = hook_threads
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.concurrent_calls: Dict[int, HookCall] = {}
+        """The running concurrent hook calls by player, while `call_concurrently` waits for them."""
+
+        self.profiler = profiler
+        self.on_action = on_action
+        context_class = PlayerAPI
+        if on_action is not None:
+            context_class = observed_api_class(context_class)
+        if profiler is not None:
+            context_class = profiled_api_class(context_class)
+        self.contexts = [context_class(self, i) for i in range(len(bot_classes))]
+        if profiler is not None:
+            for context in self.contexts:
+                context._profiler = profiler
+        self.bots: List[Optional[CatanBot]] = []
+        for player_index, bot_class in enumerate(bot_classes):
+            start = time.perf_counter()
+            try:
+                self.bots.append(bot_class(self.contexts[player_index]))
+            except Exception:
+                logger.debug("bot %d failed to set up", player_index, exc_info=True)
+                self.bot_errors[player_index] += 1
+                self.bots.append(None)
+            if profiler is not None:
+                profiler.add("hook.setup", time.perf_counter() - start)
+
+    ### HOOKS ###
+
+    def can_act(self, player_index: int, hooks: Sequence[str]) -> bool:
+        """Returns whether the given player may run an action right now, in one of the given hooks."""
+
+        call = self.concurrent_calls.get(player_index)
+        if call is not None:
+            return (
+                call.hook in hooks
+                and not call.acted
+                and (call.deadline is None or time.perf_counter() <= call.deadline)
+            )
+        if self.hook_player != player_index or self.hook not in hooks or self.acted:
+            return False
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            return False
+        if self.hook in ("play", "before_dice"):
+            return player_index == self.state.current_player
+        return True
+
+    def call(self, player_index: int, hook: str) -> bool:
+        """Calls the given hook of the player's bot, and returns whether it ran an action successfully."""
+
+        limits = self._time_limits(player_index)
+        if limits is not None and min(limits) <= 0:
+            # Out of time for the whole game, so the hook's default is used.
+            self.timeouts[player_index] += 1
+            return False
+        self.hook, self.hook_player, self.acted = hook, player_index, False
+        try:
+            elapsed, failed = self._invoke(player_index, hook, limits, self)
+        finally:
+            self.hook, self.hook_player = None, NO_PLAYER
+        self._record_call(player_index, hook, limits, elapsed, failed)
+        return self.acted
+
+    def call_concurrently(
+        self, player_indices: Sequence[int], hook: str
+    ) -> List[Optional[HookCall]]:
+        """
+        Calls the given hook of every given player at once, and returns their calls in the same order (None for the
+        players out of time for the game).
+
+        The hooks of `CatanBot.concurrent` bots run on the game's threads, while the others run one after another in
+        this thread. Their actions don't change the state but are kept in their calls for the caller to run, so the
+        outcome doesn't depend on the order the calls finish in.
+        """
+
+        calls: List[Optional[HookCall]] = []
+        for player_index in player_indices:
+            limits = self._time_limits(player_index)
+            if limits is not None and min(limits) <= 0:
+                self.timeouts[player_index] += 1
+                calls.append(None)
+            else:
+                calls.append(HookCall(hook, limits))
+        running = [
+            (player_index, call)
+            for player_index, call in zip(player_indices, calls)
+            if call is not None
+        ]
+
+        results = {}
+        self.concurrent_calls = dict(running)
+        try:
+            futures = {}
+            for player_index, call in running:
+                bot = self.bots[player_index]
+                if bot is not None and bot.concurrent:
+                    futures[player_index] = self._executor().submit(
+                        self._invoke, player_index, hook, call.limits, call
+                    )
+            for player_index, call in running:
+                if player_index not in futures:
+                    results[player_index] = self._invoke(
+                        player_index, hook, call.limits, call
+                    )
+            for player_index, future in futures.items():
+                results[player_index] = future.result()
+        finally:
+            self.concurrent_calls = {}
+        for player_index, call in running:
+            self._record_call(player_index, hook, call.limits, *results[player_index])
+        return calls
+
+    def _invoke(
+        self,
+        player_index: int,
+        hook: str,
+        limits: Optional[Tuple[float, float]],
+        call: Union["Game", HookCall],
+    ) -> Tuple[float, bool]:
+        """Runs the hook of the player's bot until the `deadline` of `call`, and returns its time and whether it raised."""
+
+        start = time.perf_counter()
+        if limits is not None:
+            call.deadline = start + min(limits)
+        failed = False
+        try:
+            bot = self.bots[player_index]
+            if bot is not None:
+                getattr(bot, hook)()
+        except Exception:
+            logger.debug("bot %d failed in %s", player_index, hook, exc_info=True)
+            failed = True
+        finally:
+            call.deadline = None
+        return time.perf_counter() - start, failed
+
+    def _record_call(
+        self,
+        player_index: int,
+        hook: str,
+        limits: Optional[Tuple[float, float]],
+        elapsed: float,
+        failed: bool,
+    ) -> None:
+        if failed:
+            self.bot_errors[player_index] += 1
+        if self.profiler is not None:
+            self.profiler.add("hook." + hook, elapsed)
+        if limits is not None:
+            self.time_used[player_index] += elapsed
+            if elapsed > min(limits):
+                logger.debug("bot %d ran out of time in %s", player_index, hook)
+                self.timeouts[player_index] += 1
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                self.hook_threads, thread_name_prefix="hooks"
+            )
+            weakref.finalize(self, self.executor.shutdown, wait=False)
+        return self.executor
+
+    def _time_limits(self, player_index: int) -> Optional[Tuple[float, float]]:
+        """Returns the seconds the player has left for a hook call and for the game, or None if there are no limits."""
+
+        if self.hook_time_limit is None and self.game_time_limit is None:
+            return None
+        return (
+            math.inf if self.hook_time_limit is None else self.hook_time_limit,
+            (
+                math.inf
+                if self.game_time_limit is None
+                else self.game_time_limit - self.time_used[player_index]
+            ),
+        )
+
+    def player_deadline(self, player_index: int = NO_PLAYER) -> Optional[float]:
+        """Returns the `time.perf_counter` time the current hook call, or the player's concurrent one, must end by."""
+
+        call = self.concurrent_calls.get(player_index)
+        return self.deadline if call is None else call.deadline
+
+    def time_remaining(self, player_index: int = NO_PLAYER) -> float:
+        """Returns the seconds left for the current hook call, or the player's concurrent one."""
+
+        deadline = self.player_deadline(player_index)
+        if deadline is None:
+            return math.inf
+        return max(0.0, deadline - time.perf_counter())
+
+    def distance(self, x: int, y: int) -> int:
+        """Returns the edge distance between the two intersections."""
+
+        return self.state.topology.distance(x, y)
+
+    ### STAGES ###
+
+    def _setup_placement(self, player_index: int) -> None:
+        state = self.state
+        self.setup_player = player_index
+        self.setup_settlement = None
+        self.setup_road_built = False
+        self.call(player_index, "place_settlement_and_road")
+
+        if self.setup_settlement is None:
+            # The bot didn't place a settlement, so the first legal positions are selected.
+            self.setup_settlement = min(state.placements.open_intersections)
+            state.build_settlement(player_index, self.setup_settlement, setup=True)
+        if not self.setup_road_built:
+            edges = state.placements.setup_road_edges(self.setup_settlement)
+            if edges:
+                state.place_setup_road(player_index, edges[0], self.setup_settlement)
+        if self.setup_round == 1:
+            state.give_setup_resources(player_index, self.setup_settlement)
+        self.setup_player = NO_PLAYER
+
+    def setup(self) -> None:
+        """Runs the setup stage, where every player places two settlements and roads in snake order."""
+
+        order = list(range(self.state.player_count))
+        for self.setup_round, players in enumerate((order, order[::-1])):
+            for player_index in players:
+                self._setup_placement(player_index)
+
+    def _move_robber(self, player_index: int) -> None:
+        state = self.state
+        self.robber_pending = False
+        robber = state.robber
+        self.call(player_index, "move_robber")
+        if state.robber == robber and robber != state.board.desert:
+            # The bot didn't move the robber, so it goes back to the desert.
+            state.place_robber(state.board.desert)
+            state.record(Events.MOVE_ROBBER, player_index, target=state.board.desert)
+
+    def _roll(self) -> None:
+        state = self.state
+        roll = state.roll_dice()
+        if roll != 7:
+            state.distribute(roll)
+            return
+
+        dropping = [
+            player_index
+            for player_index in self._players_from_current()
+            if sum(state.resources[player_index]) > MAX_HAND_SIZE
+        ]
+        if self.hook_threads:
+            calls = self.call_concurrently(dropping, "drop_resources")
+            for player_index, call in zip(dropping, calls):
+                if call is None or call.drop is None:
+                    state.drop(player_index, state.default_drop(player_index))
+                else:
+                    state.drop(player_index, call.drop)
+        else:
+            for player_index in dropping:
+                if not self.call(player_index, "drop_resources"):
+                    state.drop(player_index, state.default_drop(player_index))
+        self._move_robber(state.current_player)
+
+    def _resolve_trade(self, trade: Trade) -> None:
+        current = self.state.current_player
+        responders = self._players_from_current()[1:]
+        accepted = False
+        counter_offers: List[Tuple[int, Trade]] = []
+        if self.hook_threads:
+            self.pending_offers = [(current, trade)]
+            calls = self.call_concurrently(responders, "respond_to_trade_offers")
+            for player_index, call in zip(responders, calls):
+                if call is None:
+                    continue
+                if call.accepted_offer is not None:
+                    # The calls didn't change the state, so the trade is still affordable.
+                    self.state.exchange(current, player_index, trade)
+                    accepted = True
+                    break
+                if call.proposed_trade is not None:
+                    counter_offers.append((player_index, call.proposed_trade))
+        else:
+            for player_index in responders:
+                self.pending_offers = [(current, trade)]
+                self.proposed_trade = None
+                self.accepted_offer = None
+                self.call(player_index, "respond_to_trade_offers")
+                if self.accepted_offer is not None:
+                    accepted = True
+                    break
+                if self.proposed_trade is not None:
+                    counter_offers.append((player_index, self.proposed_trade))
+        if not accepted and counter_offers:
+            self.pending_offers = counter_offers
+            self.call(current, "respond_to_trade_offers")
+        self.pending_offers = []
+        self.proposed_trade = None
+        self.accepted_offer = None
+
+    def _play(self) -> None:
+        state = self.state
+        current = state.current_player
+        for _ in range(MAX_ACTIONS_PER_TURN):
+            acted = self.call(current, "play")
+            if self.robber_pending:
+                self._move_robber(current)
+            if self.proposed_trade is not None:
+                self._resolve_trade(self.proposed_trade)
+            if not acted or state.winner() is not None:
+                return
+
+    def _players_from_current(self) -> List[int]:
+        count = self.state.player_count
+        return [(self.state.current_player + i) % count for i in range(count)]
+
+    def play_turn(self) -> None:
+        """Plays a single turn of the current player."""
+
+        state = self.state
+        current = state.current_player
+        for player_index in self._players_from_current():
+            self.call(player_index, "before_dice")
+            if self.robber_pending:
+                self._move_robber(current)
+        if state.winner() is None:
+            self._roll()
+            self._play()
+
+        self.winner = state.winner()
+        state.end_turn()
+        for player_index in range(state.player_count):
+            self.call(player_index, "after_turn")
+        if self.winner is not None or state.turn >= self.max_turns:
+            self.finished = True
+
+    def run(self) -> GameResult:
+        """Plays the game until a player wins, the turn limit is reached, or a bot requests a breakpoint."""
+
+        self.breakpoint_requested = False
+        if not self.set_up:
+            self.setup()
+            self.set_up = True
+        while not self.finished and not self.breakpoint_requested:
+            self.play_turn()
+        return self.result()
+
+    def result(self) -> GameResult:
+        state = self.state
+        return GameResult(
+            self.winner,
+            [state.total_victory_points(p) for p in range(state.player_count)],
+            state.turn,
+            self.seed,
+        )
+
+
+class Simulation:
+    """
+    A forked game without bots, for lookahead search.
+
+    Its contexts may run any number of actions whenever it's their player's turn (and drop resources at any time),
+    without calling any hooks. Trade offers are never answered, and the robber and drops are not triggered by a 7.
+    Its time remaining counts down to the `time.perf_counter` deadline of the hook call it was forked in, if any.
+    """
+
+    def __init__(
+        self,
+        state: GameState,
+        distance: Callable[[int, int], int],
+        deadline: Optional[float] = None,
+    ):
+        self.state = state
+        self.distance = distance
+        self.deadline = deadline
+        self.seed = None
+        self.fork_count = 0
+        self.hook: Optional[str] = None
+        self.hook_player = NO_PLAYER
+        self.acted = False
+        self.breakpoint_requested = False
+        self.robber_pending = False
+        self.proposed_trade: Optional[Trade] = None
+        self.pending_offers: List[Tuple[int, Trade]] = []
+        self.accepted_offer: Optional[int] = None
+        self.setup_player = NO_PLAYER
+        self.setup_settlement: Optional[int] = None
+        self.setup_road_built = False
+        self.concurrent_calls: Dict[int, HookCall] = {}
+        self.contexts = [SimulationAPI(self, i) for i in range(state.player_count)]
+
+    def can_act(self, player_index: int, hooks: Sequence[str]) -> bool:
+        return player_index == self.state.current_player or "drop_resources" in hooks
+
+    def time_remaining(self, player_index: int = NO_PLAYER) -> float:
+        if self.deadline is None:
+            return math.inf
+        return max(0.0, self.deadline - time.perf_counter())
+
+
+class SimulationAPI(PlayerAPI):
+    """The `API` context of a player in a `Simulation`, which can also roll the dice and end turns."""
+
+    game: Simulation
+
+    def fork(self) -> "SimulationAPI":
+        state = self.state.clone()
+        simulation = Simulation(state, self.game.distance, self.game.deadline)
+        return simulation.contexts[self.player_index]
+
+    def roll_dice(self, value: Optional[int] = None) -> Exceptions:
+        state = self.state
+        if state.current_player != self.player_index:
+            return Exceptions.BAD_TIMING
+        if value is not None and not 2 <= value <= 12:
+            return Exceptions.BAD_AMOUNT
+        roll = state.roll_dice(value)
+        if roll != 7:
+            state.distribute(roll)
+        return Exceptions.OK
+
+    def end_turn(self) -> Exceptions:
+        if self.state.current_player != self.player_index:
+            return Exceptions.BAD_TIMING
+        self.state.end_turn()
+        return Exceptions.OK
+
+    def get_player_context(self, player_index: int) -> "SimulationAPI":
+        """Returns the context of another player in the same simulation, to play their turns."""
+
+        return self.game.contexts[player_index]
@@ -0,0 +1,264 @@
+"""
+Forecasts of how many turns a player needs until they can afford each price.
+
+A player's income is what their buildings produce on every roll of the two dice. From the income, the player's
+maritime rates and their hand, `forecast` works out the probability of affording each of `PRICES` on each of the
+next turns, counting the resources which trades with the bank turn into the missing ones:
+
+```python
+from forecast import forecast, roll_income
+
+class MyBot(CatanBot):
+    def play(self):
+        context = self.context
+        player_index = context.get_player_index()
+        turns = forecast(
+            roll_income(context, player_index),
+            context.get_maritime_rates(player_index),
+            context.get_resource_counts(),
+        )
+        if turns.city.expected() < turns.settlement.expected():
+            ...
+```
+
+The probabilities come from a dynamic program over the rolls of the dice, whose states are hands reduced to what
+matters to the price: the resources still missing, the surplus of each resource modulo its maritime rate, and the
+number of trades the surplus already pays for. Forecasts are memoized by income, rates and reduced hand, so asking
+again on the next turn usually costs a lookup. Rolls of 7 produce nothing, and the drops and robber moves they
+bring are left out, as is everything the player spends until then.
+"""
+
+import functools
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from api import API, Buildings, Lands, Resources
+from engine import PRICES
+from production import PIPS
+
+RESOURCE_COUNT = len(Resources)
+ROLLS_PER_TURN = 4
+"""The rolls from one of a player's turns to the next: one per player in a four-player game."""
+HORIZON = 12
+"""The default number of turns forecast."""
+CACHE_SIZE = 4096
+"""The number of forecasts, per price and reduced hand, kept by `turns_to_afford`."""
+
+Hand = Tuple[int, ...]
+Income = Tuple[Hand, ...]
+"""The resources a player gets on every roll of the dice, indexed by the roll from 0 to 12."""
+
+ROLL_PROBABILITIES = {roll: pips / 36 for roll, pips in PIPS.items()}
+ROLL_PROBABILITIES[7] = 6 / 36
+
+
+class TurnsToAfford(NamedTuple):
+    """The distribution of the number of turns until a price is affordable."""
+
+    probabilities: Tuple[float, ...]
+    """The probability of first affording the price in each of the next turns, where turn 0 is now."""
+
+    @property
+    def horizon(self) -> int:
+        return len(self.probabilities) - 1
+
+    def within(self, turns: int) -> float:
+        """Returns the probability of affording the price in the given number of turns."""
+
+        return sum(self.probabilities[: turns + 1])
+
+    def beyond(self) -> float:
+        """Returns the probability of not affording the price within the horizon."""
+
+        return max(0.0, 1.0 - sum(self.probabilities))
+
+    def expected(self) -> float:
+        """Returns the expected number of turns, counting those beyond the horizon as one turn past it."""
+
+        return (
+            sum(
+                turns * probability
+                for turns, probability in enumerate(self.probabilities)
+            )
+            + (self.horizon + 1) * self.beyond()
+        )
+
+
+class Forecast(NamedTuple):
+    city: TurnsToAfford
+    settlement: TurnsToAfford
+    road: TurnsToAfford
+    development_card: TurnsToAfford
+
+
+### INCOME ###
+
+
+def roll_income(api: API, player_index: int) -> Income:
+    """Returns what the player's buildings produce on every roll, with the robber where it is now."""
+
+    income = [[0] * RESOURCE_COUNT for _ in range(13)]
+    robber = api.get_current_robber_position()
+    for position, building in api.get_player_buildings(player_index):
+        amount = 2 if building == Buildings.CITY else 1
+        for terrain in api.get_adjacent_terrains(position):
+            land = api.get_land(terrain)
+            number = api.get_number(terrain)
+            if terrain == robber or land in (None, Lands.DESERT) or number is None:
+                continue
+            income[number][land] += amount
+    return tuple(tuple(resources) for resources in income)
+
+
+### FORECASTS ###
+
+
+def forecast(
+    income: Income,
+    rates: Sequence[int],
+    hand: Sequence[int],
+    rolls_per_turn: int = ROLLS_PER_TURN,
+    horizon: int = HORIZON,
+) -> Forecast:
+    """Returns the distribution of the turns until the player can afford each of `PRICES`."""
+
+    return Forecast(
+        *(
+            turns_to_afford(income, rates, hand, price, rolls_per_turn, horizon)
+            for price in (
+                PRICES.CITY,
+                PRICES.SETTLEMENT,
+                PRICES.ROAD,
+                PRICES.DEVELOPMENT_CARD,
+            )
+        )
+    )
+
+
+def turns_to_afford(
+    income: Income,
+    rates: Sequence[int],
+    hand: Sequence[int],
+    price: Sequence[int],
+    rolls_per_turn: int = ROLLS_PER_TURN,
+    horizon: int = HORIZON,
+) -> TurnsToAfford:
+    """
+    Returns the distribution of the turns until the player can afford the price, trading with the bank at the given
+    maritime rates.
+    """
+
+    income = tuple(tuple(resources) for resources in income)
+    rates, price = tuple(rates), tuple(price)
+    values, trades = _reduce(tuple(hand), rates, price)
+    return _turns_to_afford(
+        income, rates, price, values, trades, rolls_per_turn, horizon
+    )
+
+
+def _reduce(hand: Hand, rates: Hand, price: Hand) -> Tuple[Hand, int]:
+    """
+    Returns the reduced hand: for every resource, its count if the price needs more, or else the price plus the
+    surplus modulo the rate, and the number of trades the surplus pays for, which never needs to exceed the price.
+    """
+
+    values, trades = [], 0
+    for count, rate, needed in zip(hand, rates, price):
+        if count < needed:
+            values.append(count)
+        else:
+            values.append(needed + (count - needed) % rate)
+            trades += (count - needed) // rate
+    return tuple(values), min(trades, sum(price))
+
+
+def _shape(rates: Hand, price: Hand) -> Hand:
+    """Returns the shape of the program's states: the values of every resource of a reduced hand, then its trades."""
+
+    return tuple(needed + rate for needed, rate in zip(price, rates)) + (
+        sum(price) + 1,
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _states(rates: Hand, price: Hand) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the reduced hands, their trades and whether they afford the price, for every state of the program."""
+
+    shape = _shape(rates, price)
+    grid = np.indices(shape).reshape(len(shape), -1)
+    values, trades = grid[:RESOURCE_COUNT].T, grid[RESOURCE_COUNT]
+    missing = np.maximum(np.array(price) - values, 0).sum(axis=1)
+    return values, trades, trades >= missing
+
+
+@functools.lru_cache(maxsize=64)
+def _transitions(
+    income: Income, rates: Hand, price: Hand
+) -> List[Tuple[float, np.ndarray]]:
+    """
+    Returns the probability of every distinct income on a roll, with the state every state moves to on getting it.
+    A roll which produces nothing comes first, with no states since nothing moves.
+    """
+
+    values, trades, _ = _states(rates, price)
+    shape = _shape(rates, price)
+    price_array, rate_array = np.array(price), np.array(rates)
+    probabilities = {}
+    for roll, probability in ROLL_PROBABILITIES.items():
+        probabilities[income[roll]] = probabilities.get(income[roll], 0) + probability
+
+    idle = probabilities.pop((0,) * RESOURCE_COUNT, 0.0)
+    result = [(idle, np.zeros(0, np.int64))]
+    for resources, probability in probabilities.items():
+        counts = values + np.array(resources)
+        surplus = np.maximum(counts - price_array, 0)
+        moved = np.where(
+            counts < price_array, counts, price_array + surplus % rate_array
+        )
+        # A reduced surplus is below the rate, so every trade it pays for now is a new one.
+        moved_trades = np.minimum(
+            trades + (surplus // rate_array).sum(axis=1), sum(price)
+        )
+        result.append(
+            (
+                probability,
+                np.ravel_multi_index((*moved.T, moved_trades), shape),
+            )
+        )
+    return result
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _turns_to_afford(
+    income: Income,
+    rates: Hand,
+    price: Hand,
+    values: Hand,
+    trades: int,
+    rolls_per_turn: int,
+    horizon: int,
+) -> TurnsToAfford:
+    _, _, affordable = _states(rates, price)
+    shape = _shape(rates, price)
+    start = np.ravel_multi_index((*values, trades), shape)
+    if affordable[start]:
+        return TurnsToAfford((1.0,))
+
+    transitions = _transitions(income, rates, price)
+    (idle, _), moves = transitions[0], transitions[1:]
+    distribution = np.zeros(len(affordable))
+    distribution[start] = 1.0
+    probabilities = [0.0]
+    for _ in range(horizon):
+        for _ in range(rolls_per_turn):
+            # Hands only grow, so a price affordable after any roll is affordable on the player's next turn.
+            rolled = idle * distribution
+            for probability, moved in moves:
+                rolled += probability * np.bincount(
+                    moved, distribution, minlength=len(distribution)
+                )
+            distribution = rolled
+        probabilities.append(float(distribution[affordable].sum()))
+        distribution[affordable] = 0.0
+    return TurnsToAfford(tuple(probabilities))
@@ -0,0 +1,300 @@
+"""
+Inference of the opponents' hands from the game's public events.
+
+Every resource a player gains or spends is public except the card the robber steals, so a player's hand is known
+exactly until they are robbed or rob someone. `HandTracker` keeps the possible hands of every player with their
+probabilities, branching on every hidden steal and dropping the hands a later event rules out:
+
+```python
+from hands import HandTracker
+
+class MyBot(CatanBot):
+    def setup(self):
+        self.hands = HandTracker(self.context.get_player_index())
+        self.cursor = 0
+
+    def play(self):
+        events, self.cursor = self.context.get_events_since(self.cursor)
+        self.hands.update(events)
+        if self.hands.probability(2, Resources.ORE) > 0.5:
+            ...
+```
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from api import DevelopmentCards, Event, Events, ResourceCounts, Resources
+
+RESOURCE_COUNT = len(Resources)
+PLAYER_COUNT = 4
+MAX_HANDS = 256
+"""The default number of possible hands kept per player."""
+
+Hand = Tuple[int, ...]
+
+EMPTY_HAND: Hand = (0,) * RESOURCE_COUNT
+
+
+def _shifted(hand: Hand, counts: Sequence[int]) -> Optional[Hand]:
+    """Returns the hand changed by the counts, or None if that leaves a negative count."""
+
+    result = tuple(count + change for count, change in zip(hand, counts))
+    return None if min(result) < 0 else result
+
+
+def _closest(hand: Hand, counts: Sequence[int]) -> Hand:
+    """Returns the hand changed by the counts, with negative counts raised to 0 and as much taken from the largest ones."""
+
+    result = [count + change for count, change in zip(hand, counts)]
+    surplus = -sum(count for count in result if count < 0)
+    result = [max(count, 0) for count in result]
+    while surplus > 0:
+        result[result.index(max(result))] -= 1
+        surplus -= 1
+    return tuple(result)
+
+
+class HandTracker:
+    """
+    The possible hands of every player, as probabilities of (lumber, brick, grain, wool, ore) tuples.
+
+    A hidden steal branches the victim's hands into every card they could have lost, weighted by how many of it
+    they hold, and the thief's into every card they could have gained. The thief's and the victim's hands are
+    tracked independently, so a later event that reveals the card only narrows down the player it involves.
+    Each player keeps at most `max_hands` hands; the least likely ones are dropped beyond it.
+
+    Events are only read once a query needs them, and public changes are only summed up per player until a hidden
+    steal or a query needs the player's hands, so a bot which catches up on a long game pays little more than reading
+    its events, and nothing in the hooks that don't ask. A hand which couldn't have afforded a change along the way is
+    still ruled out, since the lowest point of every resource's sum is kept too. Once caught up, `probability` of
+    holding at least one of a resource and `expected_counts` take constant time.
+    """
+
+    def __init__(
+        self,
+        player_index: int,
+        player_count: int = PLAYER_COUNT,
+        max_hands: int = MAX_HANDS,
+    ):
+        """Starts from the empty hands of the start of a game, as seen by the given player."""
+
+        self.player_index = player_index
+        self.player_count = player_count
+        self.max_hands = max_hands
+        self._hands: List[Dict[Hand, float]] = [
+            {EMPTY_HAND: 1.0} for _ in range(player_count)
+        ]
+        self._expected: List[List[float]] = [
+            [0.0] * RESOURCE_COUNT for _ in range(player_count)
+        ]
+        self._any: List[List[float]] = [
+            [0.0] * RESOURCE_COUNT for _ in range(player_count)
+        ]
+        self._delta: List[List[int]] = [
+            [0] * RESOURCE_COUNT for _ in range(player_count)
+        ]
+        """The sum of every player's public changes which aren't applied to their hands yet."""
+        self._low: List[List[int]] = [[0] * RESOURCE_COUNT for _ in range(player_count)]
+        """The lowest every resource's sum in `_delta` went along the way, which a hand must have afforded."""
+        self._pending = [False] * player_count
+        self._unread: List[Event] = []
+        # The thief and the resource of a monopoly whose steals are being read.
+        self._monopoly: Optional[Tuple[int, Optional[Resources]]] = None
+
+    ### QUERIES ###
+
+    def hands(self, player_index: int) -> Dict[Hand, float]:
+        """Returns the possible hands of the player and their probabilities."""
+
+        self._catch_up(player_index)
+        return dict(self._hands[player_index])
+
+    def is_known(self, player_index: int) -> bool:
+        """Returns whether the player's hand is known exactly."""
+
+        self._catch_up(player_index)
+        return len(self._hands[player_index]) == 1
+
+    def most_likely_hand(self, player_index: int) -> ResourceCounts:
+        self._catch_up(player_index)
+        hands = self._hands[player_index]
+        return ResourceCounts(*max(hands, key=hands.__getitem__))
+
+    def total(self, player_index: int) -> int:
+        """Returns the number of resources the player holds, which is the same in all their possible hands."""
+
+        self._catch_up(player_index)
+        return sum(next(iter(self._hands[player_index])))
+
+    def expected_counts(self, player_index: int) -> List[float]:
+        """Returns the expected count of every resource in the player's hand."""
+
+        self._catch_up(player_index)
+        return self._expected[player_index][:]
+
+    def probability(
+        self, player_index: int, resource: Resources, at_least: int = 1
+    ) -> float:
+        """Returns the probability that the player holds at least the given count of the resource."""
+
+        if at_least <= 0:
+            return 1.0
+        self._catch_up(player_index)
+        if at_least == 1:
+            return self._any[player_index][resource]
+        return sum(
+            probability
+            for hand, probability in self._hands[player_index].items()
+            if hand[resource] >= at_least
+        )
+
+    ### UPDATES ###
+
+    def update(self, events: Iterable[Event]) -> None:
+        """Updates the hands from events returned by `API.get_events_since`, which must be passed in order."""
+
+        self._unread.extend(events)
+
+    def update_event(self, event: Event) -> None:
+        self._unread.append(event)
+
+    def _catch_up(self, player_index: int) -> None:
+        """Reads the unread events and applies the player's pending changes."""
+
+        if self._unread:
+            events, self._unread = self._unread, []
+            for event in events:
+                self._read(event)
+            if self._monopoly is not None:
+                # A monopoly's steals are recorded together, so none of them can be left to read.
+                self._finish_monopoly()
+        self._apply(player_index)
+
+    def _read(self, event: Event) -> None:
+        kind = event.type
+        if self._monopoly is not None and kind != Events.STEAL:
+            self._finish_monopoly()
+
+        counts = event.resource_counts
+        if kind == Events.STEAL:
+            if counts is None:
+                self._steal(event.player_index, event.other_player_index)
+                return
+            self._change(event.player_index, counts)
+            self._change(event.other_player_index, [-count for count in counts])
+            if self._monopoly is not None:
+                resource = Resources(max(range(RESOURCE_COUNT), key=counts.__getitem__))
+                self._monopoly = self._monopoly[0], resource
+        elif kind == Events.TRADE:
+            self._change(event.player_index, counts)
+            self._change(event.other_player_index, [-count for count in counts])
+        elif counts is not None:
+            self._change(event.player_index, counts)
+
+        if (
+            kind == Events.PLAY_DEVELOPMENT_CARD
+            and event.value == DevelopmentCards.MONOPOLY
+        ):
+            self._monopoly = event.player_index, None
+
+    def _set(self, player_index: int, hands: Dict[Hand, float]) -> None:
+        """Replaces the player's hands with the given ones, normalized and capped, and refreshes the summaries."""
+
+        if len(hands) > self.max_hands:
+            kept = sorted(hands, key=hands.__getitem__, reverse=True)[: self.max_hands]
+            hands = {hand: hands[hand] for hand in kept}
+        scale = 1 / sum(hands.values())
+        expected = [0.0] * RESOURCE_COUNT
+        any_ = [0.0] * RESOURCE_COUNT
+        for hand in hands:
+            probability = hands[hand] = hands[hand] * scale
+            for resource, count in enumerate(hand):
+                if count:
+                    expected[resource] += count * probability
+                    any_[resource] += probability
+        self._hands[player_index] = hands
+        self._expected[player_index] = expected
+        self._any[player_index] = any_
+
+    def _change(self, player_index: int, counts: Sequence[int]) -> None:
+        """Adds the counts to the player's pending changes."""
+
+        delta = self._delta[player_index]
+        low = self._low[player_index]
+        for resource in range(RESOURCE_COUNT):
+            total = delta[resource] = delta[resource] + counts[resource]
+            if total < low[resource]:
+                low[resource] = total
+        self._pending[player_index] = True
+
+    def _apply(self, player_index: int) -> None:
+        """Changes the player's hands by their pending changes, dropping the hands which couldn't afford them."""
+
+        if not self._pending[player_index]:
+            return
+        delta = self._delta[player_index]
+        low = self._low[player_index]
+        hands: Dict[Hand, float] = {}
+        for hand, probability in self._hands[player_index].items():
+            if _shifted(hand, low) is not None:
+                shifted = _shifted(hand, delta)
+                hands[shifted] = hands.get(shifted, 0.0) + probability
+        if not hands:
+            # The true hand was dropped by the cap, so fall back to the closest possible ones.
+            for hand, probability in self._hands[player_index].items():
+                closest = _closest(hand, delta)
+                hands[closest] = hands.get(closest, 0.0) + probability
+        self._set(player_index, hands)
+        self._delta[player_index] = [0] * RESOURCE_COUNT
+        self._low[player_index] = [0] * RESOURCE_COUNT
+        self._pending[player_index] = False
+
+    def _steal(self, thief: int, victim: int) -> None:
+        """Moves a hidden card from the victim to the thief."""
+
+        self._apply(victim)
+        self._apply(thief)
+        stolen = [0.0] * RESOURCE_COUNT
+        victim_hands: Dict[Hand, float] = {}
+        for hand, probability in self._hands[victim].items():
+            total = sum(hand)
+            for resource, count in enumerate(hand):
+                if count:
+                    weight = probability * count / total
+                    stolen[resource] += weight
+                    after = hand[:resource] + (count - 1,) + hand[resource + 1 :]
+                    victim_hands[after] = victim_hands.get(after, 0.0) + weight
+        if not victim_hands:
+            return
+
+        thief_hands: Dict[Hand, float] = {}
+        for hand, probability in self._hands[thief].items():
+            for resource, weight in enumerate(stolen):
+                if weight:
+                    after = (
+                        hand[:resource] + (hand[resource] + 1,) + hand[resource + 1 :]
+                    )
+                    thief_hands[after] = (
+                        thief_hands.get(after, 0.0) + probability * weight
+                    )
+        self._set(victim, victim_hands)
+        self._set(thief, thief_hands)
+
+    def _finish_monopoly(self) -> None:
+        """Rules out the monopolized resource from every player but the thief, since the monopoly took all of it."""
+
+        thief, resource = self._monopoly
+        self._monopoly = None
+        if resource is None:
+            return
+        for player_index in range(self.player_count):
+            if player_index == thief:
+                continue
+            self._apply(player_index)
+            hands = {
+                hand: probability
+                for hand, probability in self._hands[player_index].items()
+                if not hand[resource]
+            }
+            if hands:
+                self._set(player_index, hands)
@@ -0,0 +1,548 @@
+"""
+Hosting bots in isolated worker processes.
+
+`isolated` wraps a bot class so that `Game` runs the bot in a persistent worker process of its own. The board and
+the events of the game are published in a shared memory segment per worker (in the replay format, see `replay`),
+which the worker applies to its own copy of the state, so the bot's `API` getters run in the worker at in-process
+speed. Only hook calls and actions cross the pipe to the game:
+
+```python
+from bot import MyBot
+from engine import Game
+from isolation import isolated, shutdown
+
+game = Game([isolated(MyBot)] * 4, seed=1, hook_time_limit=1.0)
+try:
+    game.run()
+finally:
+    shutdown(game)
+```
+
+A worker which raises is treated like a bot which raises. A worker which exits, or doesn't return from a hook
+within the hook's time limit (or `hang_timeout` seconds without one) plus `HANG_GRACE`, is killed, and the hooks
+of its bot do nothing for the rest of the game.
+
+Workers are untrusted. A worker's segment only holds what its player may see: private events of other players are
+redacted by `EventRecord.seen_by`, and the seed is left out, since it would tell the dice and the deck. Each worker
+seeds the global `random` module from a hash of the game's seed and its player index instead, so isolated bots may
+run concurrently (see `Game`'s `hook_threads`) and their games are still repeatable; use seeds that can't be guessed
+if the bots mustn't find the game's seed by trying them. The game never unpickles what a worker sends: actions are
+JSON lists of an index in `FORWARDED_METHODS` and plain arguments, which are converted back to `API` types.
+"""
+
+import functools
+import hashlib
+import json
+import math
+import multiprocessing
+import operator
+import random
+import threading
+import time
+import traceback
+import weakref
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import Dict, Optional, Tuple, Type
+
+from api import Action, CatanBot, ResourceCounts, Trade, Vector
+from engine import ACTION_METHODS, EventRecord, Game, GameState, PlayerAPI
+from placements import NO_PLAYER
+from replay import (
+    ACTION_ARGUMENTS,
+    read_header,
+    read_record,
+    write_event,
+    write_header,
+)
+
+HOOKS = (
+    "place_settlement_and_road",
+    "play",
+    "respond_to_trade_offers",
+    "move_robber",
+    "drop_resources",
+    "before_dice",
+    "after_turn",
+)
+FORWARDED_METHODS = ACTION_METHODS + ("execute_plan", "breakpoint")
+"""The `API` methods a worker sends to the game instead of running on its copy of the state."""
+FORWARDED_ARGUMENTS = {**ACTION_ARGUMENTS, "execute_plan": "A", "breakpoint": ""}
+"""The kinds of the arguments of each forwarded method, as in `replay.ACTION_ARGUMENTS`, with `A` a list of `Action`."""
+DONE = -1
+"""The method index of the message a worker sends when a hook call returns, with its traceback or None."""
+MAX_MESSAGE_SIZE = 1 << 20
+LOG_CAPACITY = 1 << 16
+"""The initial size of the shared event log, which doubles whenever it fills up."""
+HANG_TIMEOUT = 10.0
+HANG_GRACE = 1.0
+
+
+class BotCrashed(Exception):
+    """The worker of a bot exited or stopped responding, and was killed."""
+
+
+class BotError(Exception):
+    """A bot raised an exception in its worker. The message is the worker's traceback."""
+
+
+### THE GAME'S PROCESS ###
+
+
+class EventLog:
+    """
+    The board and the events of a game as a player sees them, in a shared memory segment written by the game and read
+    by the player's worker.
+    """
+
+    def __init__(self, state: GameState, player_index: int):
+        if state.event_offset:
+            raise ValueError("the state must have the events of the whole game")
+        self.state = state
+        self.player_index = player_index
+        header = write_header(state.board, state.player_count, None)
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=max(LOG_CAPACITY, 2 * len(header))
+        )
+        self.memory.buf[: len(header)] = header
+        self.size = len(header)
+        self.written = 0
+        """The number of the state's events in the log."""
+        self.lock = threading.Lock()
+
+    def publish(self) -> Tuple[str, int]:
+        """Writes the events recorded since the last call, and returns the name of the segment and the log's size."""
+
+        with self.lock:
+            return self._publish()
+
+    def _publish(self) -> Tuple[str, int]:
+        events = self.state.events
+        if self.written < len(events):
+            body = bytearray()
+            for event in events[self.written :]:
+                write_event(body, event.seen_by(self.player_index))
+            end = self.size + len(body)
+            if end > self.memory.size:
+                # Workers attach to the new segment when they see its name.
+                memory = shared_memory.SharedMemory(
+                    create=True, size=max(2 * self.memory.size, end)
+                )
+                memory.buf[: self.size] = self.memory.buf[: self.size]
+                self.close()
+                self.memory = memory
+            self.memory.buf[self.size : end] = body
+            self.size = end
+            self.written = len(events)
+        return self.memory.name, self.size
+
+    def close(self) -> None:
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+_logs: "weakref.WeakKeyDictionary[Game, Dict[int, EventLog]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _event_log(game: Game, player_index: int) -> EventLog:
+    logs = _logs.setdefault(game, {})
+    log = logs.get(player_index)
+    if log is None:
+        log = logs[player_index] = EventLog(game.state, player_index)
+        weakref.finalize(game, log.close)
+    return log
+
+
+def _worker_seed(seed: Optional[int], player_index: int) -> Optional[int]:
+    """Returns the seed of a player's worker, which doesn't tell the game's seed without trying every seed."""
+
+    if seed is None:
+        return None
+    digest = hashlib.sha256(f"{seed}/{player_index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _decode(kind: str, value):
+    """
+    Converts a plain argument sent by a worker back to the `API` type of its kind. Values which can't be one are
+    passed as None, which the `API` rejects as it would in the game's process, or raise `TypeError`.
+    """
+
+    if kind in "it":
+        if (
+            isinstance(value, list)
+            and len(value) == 2
+            and all(type(coordinate) is int for coordinate in value)
+        ):
+            return tuple(value)
+        return None
+    if kind == "e":
+        if isinstance(value, list) and len(value) == 2:
+            ends = _decode("i", value[0]), _decode("i", value[1])
+            if None not in ends:
+                return ends
+        return None
+    if kind == "E":
+        if not isinstance(value, list):
+            raise TypeError("expected a list of edges")
+        return [_decode("e", ends) for ends in value]
+    if kind == "c":
+        if not isinstance(value, list) or any(
+            type(count) is not int for count in value
+        ):
+            raise TypeError("expected resource counts")
+        return ResourceCounts(*value) if len(value) == 5 else tuple(value)
+    if kind == "T":
+        if not isinstance(value, list) or len(value) != 2:
+            raise TypeError("expected a trade")
+        give, receive = _decode("c", value[0]), _decode("c", value[1])
+        return Trade(ResourceCounts(*give), ResourceCounts(*receive))
+    if kind == "A":
+        if not isinstance(value, list):
+            raise TypeError("expected a list of actions")
+        actions = []
+        for action in value:
+            if not isinstance(action, list) or len(action) != 2:
+                raise TypeError("expected an action")
+            method, arguments = action
+            if not isinstance(method, str) or method not in ACTION_ARGUMENTS:
+                # `execute_plan` fails actions it doesn't allow.
+                actions.append(Action(str(method)))
+                continue
+            actions.append(
+                Action(method, _decode_arguments(ACTION_ARGUMENTS[method], arguments))
+            )
+        return actions
+    return value if type(value) is int else None
+
+
+def _decode_arguments(kinds: str, values) -> tuple:
+    if not isinstance(values, list) or len(values) != len(kinds):
+        raise TypeError(f"expected {len(kinds)} arguments")
+    return tuple(_decode(kind, value) for kind, value in zip(kinds, values))
+
+
+def _fields(game: Game, log: EventLog, player_index: int) -> tuple:
+    """Returns the state of the game the player's worker mirrors, which is sent with every message."""
+
+    return (
+        *log.publish(),
+        player_index if player_index in game.concurrent_calls else game.hook_player,
+        game.setup_player,
+        game.setup_settlement,
+        game.setup_road_built,
+        game.pending_offers,
+        game.time_remaining(player_index),
+    )
+
+
+class IsolatedBot(CatanBot):
+    """
+    A bot whose hooks run in a worker process, created by `isolated`.
+
+    The worker is started in `setup`, and stopped by `close` or when the bot is garbage collected. Its hooks only
+    wait for the worker, so they may run concurrently with other bots'.
+    """
+
+    concurrent = True
+    bot_class: Type[CatanBot]
+    hooks: frozenset = frozenset(HOOKS)
+    """The hooks the bot class overrides. The others do nothing, so they aren't sent to the worker."""
+    hang_timeout: float = HANG_TIMEOUT
+
+    def setup(self) -> None:
+        context = self.context
+        game = context.game
+        self.log = _event_log(game, context.player_index)
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work,
+            args=(
+                worker_connection,
+                self.bot_class,
+                context.player_index,
+                _worker_seed(game.seed, context.player_index),
+                _fields(game, self.log, context.player_index),
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        worker_connection.close()
+        self._finalizer = weakref.finalize(self, _stop, self.process, self.connection)
+        self._serve()
+
+    def close(self) -> None:
+        """Stops the worker."""
+
+        self._finalizer()
+        self.connection = None
+
+    def _serve(self) -> None:
+        """Runs the actions the worker sends until it finishes the current hook call."""
+
+        context = self.context
+        game = context.game
+        while True:
+            time_left = game.time_remaining(context.player_index)
+            timeout = (self.hang_timeout if time_left == math.inf else time_left) + (
+                HANG_GRACE
+            )
+            try:
+                if not self.connection.poll(timeout):
+                    raise BotCrashed(
+                        f"the worker of player {context.player_index} hung"
+                    )
+                # Workers are untrusted, so their messages are JSON and never unpickled.
+                index, payload = json.loads(
+                    self.connection.recv_bytes(MAX_MESSAGE_SIZE)
+                )
+                if type(index) is not int or not (
+                    index == DONE or 0 <= index < len(FORWARDED_METHODS)
+                ):
+                    raise ValueError(f"no forwarded method {index!r}")
+            except (EOFError, OSError):
+                self.close()
+                raise BotCrashed(f"the worker of player {context.player_index} exited")
+            except (ValueError, TypeError):
+                self.close()
+                raise BotCrashed(
+                    f"the worker of player {context.player_index} sent a malformed message"
+                )
+            except BotCrashed:
+                self.close()
+                raise
+
+            if index == DONE:
+                if payload is not None:
+                    raise BotError(str(payload))
+                return
+            method = FORWARDED_METHODS[index]
+            try:
+                args = _decode_arguments(FORWARDED_ARGUMENTS[method], payload)
+                reply = (
+                    "result",
+                    getattr(context, method)(*args),
+                    _fields(game, self.log, context.player_index),
+                )
+            except Exception as e:
+                reply = ("raise", e, _fields(game, self.log, context.player_index))
+            self.connection.send(reply)
+
+    def _call(self, hook: str) -> None:
+        if self.connection is None or hook not in self.hooks:
+            return
+        context = self.context
+        self.connection.send(
+            ("call", hook, _fields(context.game, self.log, context.player_index))
+        )
+        self._serve()
+
+
+def _stop(process: multiprocessing.Process, connection: Connection) -> None:
+    connection.close()
+    process.kill()
+    process.join()
+
+
+def _hook(name: str):
+    def hook(self: IsolatedBot) -> None:
+        self._call(name)
+
+    hook.__name__ = name
+    return hook
+
+
+for _name in HOOKS:
+    setattr(IsolatedBot, _name, _hook(_name))
+
+
+@functools.lru_cache(maxsize=None)
+def isolated(
+    bot_class: Type[CatanBot], hang_timeout: float = HANG_TIMEOUT
+) -> Type[IsolatedBot]:
+    """Returns a bot class which runs the given bot in a worker process."""
+
+    hooks = frozenset(
+        hook
+        for hook in HOOKS
+        if getattr(bot_class, hook) is not getattr(CatanBot, hook)
+    )
+    return type(
+        "Isolated" + bot_class.__name__,
+        (IsolatedBot,),
+        {"bot_class": bot_class, "hooks": hooks, "hang_timeout": hang_timeout},
+    )
+
+
+def shutdown(game: Game) -> None:
+    """Stops the workers of the game's isolated bots and frees its event log."""
+
+    for bot in game.bots:
+        if isinstance(bot, IsolatedBot):
+            bot.close()
+    for log in _logs.pop(game, {}).values():
+        log.close()
+
+
+### THE WORKER'S PROCESS ###
+
+
+class WorkerGame:
+    """
+    The parts of a `Game` a `PlayerAPI` reads, mirrored in a worker from the fields sent by the game.
+
+    The state is rebuilt from the events the player sees, so the other players' resources and development cards are
+    placeholders (see `GameState.apply`), and `seed` is the worker's own.
+    """
+
+    def __init__(self, state: GameState, seed: Optional[int], player_index: int):
+        self.state = state
+        self.seed = seed
+        self.player_index = player_index
+        self.fork_count = 0
+        self.hook_player = NO_PLAYER
+        self.setup_player = NO_PLAYER
+        self.setup_settlement: Optional[int] = None
+        self.setup_road_built = False
+        self.pending_offers: list = []
+        self.concurrent_calls: dict = {}
+        self.deadline = math.inf
+
+        self.memory: Optional[shared_memory.SharedMemory] = None
+        self.log_offset = 0
+
+    def update(self, fields: tuple) -> None:
+        """Applies the new events in the event log, and updates the mirrored fields."""
+
+        (
+            name,
+            size,
+            self.hook_player,
+            self.setup_player,
+            self.setup_settlement,
+            self.setup_road_built,
+            self.pending_offers,
+            time_left,
+        ) = fields
+        self.deadline = time.perf_counter() + time_left
+
+        if self.memory is None or self.memory.name != name:
+            if self.memory is not None:
+                self.memory.close()
+            self.memory = shared_memory.SharedMemory(name=name)
+            if not self.log_offset:
+                *_, self.log_offset = read_header(self.memory.buf)
+        data = self.memory.buf
+        while self.log_offset < size:
+            record, self.log_offset = read_record(data, self.log_offset)
+            if isinstance(record, EventRecord):
+                self.state.apply(record, self.player_index)
+
+    def can_act(self, player_index: int, hooks) -> bool:
+        return False
+
+    def player_deadline(self, player_index: int = NO_PLAYER) -> float:
+        return self.deadline
+
+    def time_remaining(self, player_index: int = NO_PLAYER) -> float:
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def distance(self, x: int, y: int) -> int:
+        return self.state.topology.distance(x, y)
+
+
+class WorkerAPI(PlayerAPI):
+    """The `API` context of a bot in a worker: getters read the worker's state, and actions are sent to the game."""
+
+    game: WorkerGame
+
+    def __init__(self, game: WorkerGame, player_index: int, connection: Connection):
+        super().__init__(game, player_index)
+        self.connection = connection
+
+    def _forward(self, method: str, args: tuple):
+        _send(self.connection, FORWARDED_METHODS.index(method), _plain(args))
+        kind, result, fields = self.connection.recv()
+        self.game.update(fields)
+        if kind == "raise":
+            raise result
+        return result
+
+
+def _plain(value):
+    """Converts an action argument to JSON values, raising `TypeError` for a value the game can't take."""
+
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, Vector):
+        return list(value)
+    if isinstance(value, Trade):
+        return [_plain(value.give_counts), _plain(value.receive_counts)]
+    if isinstance(value, Action):
+        return [value.method, _plain(value.arguments)]
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return operator.index(value)
+
+
+def _send(connection: Connection, index: int, payload) -> None:
+    connection.send_bytes(json.dumps([index, payload]).encode())
+
+
+def _forwarded(name: str):
+    def method(self: WorkerAPI, *args):
+        return self._forward(name, args)
+
+    method.__name__ = name
+    return method
+
+
+for _name in FORWARDED_METHODS:
+    setattr(WorkerAPI, _name, _forwarded(_name))
+
+
+def _work(
+    connection: Connection,
+    bot_class: Type[CatanBot],
+    player_index: int,
+    seed: Optional[int],
+    fields: tuple,
+) -> None:
+    """Runs a bot in a worker, calling its hooks when the game asks until the pipe is closed."""
+
+    if seed is not None:
+        # Forked processes reseed the global `random` module from the OS, which would make games unrepeatable.
+        random.seed(seed)
+    memory = shared_memory.SharedMemory(name=fields[0])
+    player_count, _, board, _, _ = read_header(memory.buf)
+    memory.close()
+    game = WorkerGame(
+        GameState(board, player_count, random.Random(seed)), seed, player_index
+    )
+    game.update(fields)
+    context = WorkerAPI(game, player_index, connection)
+
+    bot: Optional[CatanBot] = None
+    try:
+        bot = bot_class(context)
+        _send(connection, DONE, None)
+    except Exception:
+        _send(connection, DONE, traceback.format_exc())
+
+    while True:
+        try:
+            _, hook, fields = connection.recv()
+        except (EOFError, OSError):
+            return
+        game.update(fields)
+        error = None
+        try:
+            if bot is not None:
+                getattr(bot, hook)()
+        except Exception:
+            error = traceback.format_exc()
+        _send(connection, DONE, error)
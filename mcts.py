@@ -0,0 +1,775 @@
+"""
+Monte Carlo tree search over a bot's decisions, with sampled hidden information and parallel playouts.
+
+`MCTS` searches the decisions of a single hook from a fork of the game. Every iteration samples what the searching
+player can't see (the opponents' resources and development cards and the order of the deck) into a copy of the
+state, descends the tree of the player's decisions in the hook, and plays the game out for a few turns with a fast
+random policy. It plugs into any hook in `HOOKS`:
+
+```python
+from mcts import MCTS
+
+class MyBot(CatanBot):
+    def setup(self):
+        self.search = MCTS(seconds=0.5, workers=4)
+
+    def play(self):
+        self.search.act(self.context, "play")
+```
+
+With `workers`, the search runs in a pool of processes, either root-parallel, where every process grows its own tree
+from its own samples and the statistics of the roots are summed, or leaf-parallel, where this process grows a single
+tree and every process plays out each new leaf. `SearchResult.rollouts_per_second` shows how the search scales.
+
+Playouts only build, buy development cards, trade with the bank and move the robber; nobody plays development
+cards or trades with other players in them.
+"""
+
+import math
+import random
+import time
+import weakref
+from multiprocessing.pool import Pool
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api import (
+    API,
+    CatanBot,
+    Action,
+    DevelopmentCards,
+    Exceptions,
+    ResourceCounts,
+    Resources,
+    Trade,
+)
+from engine import (
+    BANK_RESOURCE_COUNT,
+    MAX_HAND_SIZE,
+    PRICES,
+    WINNING_VICTORY_POINTS,
+    GameState,
+)
+from hands import HandTracker
+from opening import OpeningEvaluator
+from placements import NO_PLAYER
+
+HOOKS = (
+    "play",
+    "before_dice",
+    "move_robber",
+    "drop_resources",
+    "respond_to_trade_offers",
+)
+"""The hooks `MCTS` can search."""
+EXPLORATION = math.sqrt(2)
+ROLLOUT_TURNS = 8
+"""The turns a playout lasts after the hook before its state is scored, unless someone wins first."""
+MAX_DECISIONS = 6
+"""The actions the tree holds per `play` call; a playout makes the rest."""
+DROP_CANDIDATES = 12
+"""The number of different drops searched in `drop_resources`, besides the engine's default."""
+TIME_SHARE = 0.8
+"""The share of the hook's remaining time (see `API.get_time_remaining`) a search may take."""
+SAMPLE_ATTEMPTS = 8
+"""How many times the opponents' hands are sampled from a `HandTracker` before falling back to their hand sizes."""
+
+Move = Optional[Tuple[str, tuple]]
+"""A decision as the name of a `GameState` method and its arguments after the player's (the counts themselves for
+a drop), or None to do nothing."""
+
+
+class SearchResult(NamedTuple):
+    action: Optional[Action]
+    """The most visited decision, or None to do nothing (which ends the turn in `play`)."""
+    choices: List[Tuple[Optional[Action], int, float]]
+    """Every decision searched, with its visits and mean score, from the most visited."""
+    rollouts: int
+    seconds: float
+
+    @property
+    def rollouts_per_second(self) -> float:
+        return self.rollouts / self.seconds if self.seconds else 0.0
+
+
+class Node:
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children: Dict[Move, Node] = {}
+        self.visits = 0
+        self.value = 0.0
+        """The sum of the scores of the playouts through the node, for the searching player."""
+
+
+### SAMPLING ###
+
+
+def determinize(
+    state: GameState,
+    player_index: int,
+    rng: random.Random,
+    hands: Optional[HandTracker] = None,
+) -> GameState:
+    """
+    Returns a copy of the state where everything the player can't see is sampled again: the opponents' resources
+    (from `hands` if given, or else from every card outside the player's hand, knowing only the hand sizes), and the
+    opponents' development cards and the deck, shuffled together.
+    """
+
+    clone = state.clone(random.Random(rng.getrandbits(64)))
+    opponents = [p for p in range(state.player_count) if p != player_index]
+
+    sampled = None
+    if hands is not None:
+        for _ in range(SAMPLE_ATTEMPTS):
+            sampled = {}
+            for p in opponents:
+                possible = hands.hands(p)
+                sampled[p] = rng.choices(list(possible), list(possible.values()))[0]
+            totals = [
+                sum(
+                    sampled[p][r] if p in sampled else clone.resources[p][r]
+                    for p in range(state.player_count)
+                )
+                for r in range(len(Resources))
+            ]
+            if max(totals) <= BANK_RESOURCE_COUNT:
+                break
+            sampled = None
+    if sampled is None:
+        clone.sample_hidden_resources(player_index, rng)
+    else:
+        keys = clone.zobrist
+        for p in opponents:
+            hand = clone.resources[p]
+            for r, count in enumerate(sampled[p]):
+                if count != hand[r]:
+                    clone.hash ^= keys.resource(p, r, hand[r]) ^ keys.resource(
+                        p, r, count
+                    )
+                    hand[r] = count
+        for r in Resources:
+            clone.bank[r] = BANK_RESOURCE_COUNT - sum(
+                hand[r] for hand in clone.resources
+            )
+    clone.shuffle_hidden_development_cards(player_index, rng)
+    return clone
+
+
+### DECISIONS ###
+
+
+def _play_moves(state: GameState, player_index: int) -> List[Move]:
+    moves: List[Move] = [None]
+    placements = state.placements
+    hand = state.resources[player_index]
+    if state.cities_left[player_index] and PRICES.CITY <= hand:
+        moves += [("build_city", (i,)) for i in sorted(placements.cities[player_index])]
+    if state.settlements_left[player_index] and PRICES.SETTLEMENT <= hand:
+        moves += [
+            ("build_settlement", (i,))
+            for i in sorted(placements.settlements[player_index])
+        ]
+    if state.roads_left[player_index] and PRICES.ROAD <= hand:
+        moves += [("build_road", (e,)) for e in sorted(placements.roads[player_index])]
+    if state.deck and PRICES.DEVELOPMENT_CARD <= hand:
+        moves.append(("buy_development_card", ()))
+    rates = state.maritime_rates(player_index)
+    for sell in Resources:
+        if hand[sell] >= rates[sell]:
+            moves += [
+                ("maritime_trade", (sell, receive))
+                for receive in Resources
+                if receive != sell and state.bank[receive]
+            ]
+    if (
+        not state.played_development_card
+        and state.development_cards[player_index][DevelopmentCards.KNIGHT]
+    ):
+        moves.append(("play_knight", ()))
+    return moves
+
+
+def _robber_moves(state: GameState, player_index: int) -> List[Move]:
+    moves: List[Move] = []
+    for terrain_id in range(state.topology.num_terrains):
+        if terrain_id != state.robber:
+            victims = state.robber_victims(player_index, terrain_id) or [-1]
+            moves += [("move_robber", (terrain_id, victim)) for victim in victims]
+    return moves
+
+
+def _drop_moves(state: GameState, player_index: int) -> List[Move]:
+    hand = state.resources[player_index]
+    count = sum(hand) // 2
+    # The candidates only depend on the player's own hand, so they're the same in every sample.
+    rng = random.Random(repr(list(hand)))
+    cards = [r for r in Resources for _ in range(hand[r])]
+    drops = {tuple(state.default_drop(player_index))}
+    for _ in range(DROP_CANDIDATES * 2):
+        if len(drops) > DROP_CANDIDATES:
+            break
+        drop = [0] * len(Resources)
+        for r in rng.sample(cards, count):
+            drop[r] += 1
+        drops.add(tuple(drop))
+    return [("drop", drop) for drop in sorted(drops)]
+
+
+def _moves(
+    state: GameState,
+    player_index: int,
+    hook: str,
+    offers: Sequence[Tuple[int, Trade]],
+) -> List[Move]:
+    """Returns the player's legal decisions in the hook, in the same order for the same public information."""
+
+    if hook == "play":
+        return _play_moves(state, player_index)
+    if hook == "before_dice":
+        if (
+            not state.played_development_card
+            and state.development_cards[player_index][DevelopmentCards.KNIGHT]
+        ):
+            return [None, ("play_knight", ())]
+        return [None]
+    if hook == "move_robber":
+        return _robber_moves(state, player_index)
+    if hook == "drop_resources":
+        return _drop_moves(state, player_index)
+    if hook == "respond_to_trade_offers":
+        return [None] + [
+            ("exchange", (index,))
+            for index, (proposer, trade) in enumerate(offers)
+            if state.check_exchange(proposer, player_index, trade) == Exceptions.OK
+        ]
+    raise ValueError(f"can't search {hook}")
+
+
+def _run(
+    state: GameState,
+    player_index: int,
+    move: Move,
+    offers: Sequence[Tuple[int, Trade]],
+    rng: random.Random,
+) -> None:
+    method, arguments = move
+    if method == "exchange":
+        proposer, trade = offers[arguments[0]]
+        state.exchange(proposer, player_index, trade)
+        return
+    if method == "drop":
+        state.drop(player_index, ResourceCounts(*arguments))
+        return
+    getattr(state, method)(player_index, *arguments)
+    if method == "play_knight":
+        _policy_robber(state, player_index, rng)
+
+
+def _action(state: GameState, move: Move) -> Optional[Action]:
+    """Returns the `API` action of a decision."""
+
+    if move is None:
+        return None
+    topology = state.topology
+    method, arguments = move
+    if method in ("build_city", "build_settlement"):
+        return Action(method, (topology.intersection_positions[arguments[0]],))
+    if method == "build_road":
+        return Action(method, (topology.edge_positions[arguments[0]],))
+    if method == "maritime_trade":
+        return Action(method, tuple(Resources(r) for r in arguments))
+    if method == "move_robber":
+        terrain_id, victim = arguments
+        return Action(method, (topology.terrain_positions[terrain_id], victim))
+    if method == "drop":
+        return Action("set_resources_to_drop", (ResourceCounts(*arguments),))
+    if method == "exchange":
+        return Action("accept_trade_offer", arguments)
+    return Action(method)
+
+
+### PLAYOUTS ###
+
+
+def _policy_robber(state: GameState, player_index: int, rng: random.Random) -> None:
+    """Moves the robber to a random terrain with an opponent's building, and robs one of them."""
+
+    terrains = list(range(state.topology.num_terrains))
+    rng.shuffle(terrains)
+    for terrain_id in terrains:
+        if terrain_id == state.robber:
+            continue
+        victims = state.robber_victims(player_index, terrain_id)
+        if victims:
+            state.move_robber(player_index, terrain_id, rng.choice(victims))
+            return
+    for terrain_id in terrains:
+        if terrain_id != state.robber:
+            state.move_robber(player_index, terrain_id, -1)
+            return
+
+
+def _policy_roll(state: GameState, rng: random.Random) -> None:
+    roll = state.roll_dice()
+    if roll != 7:
+        state.distribute(roll)
+        return
+    for player_index in range(state.player_count):
+        if sum(state.resources[player_index]) > MAX_HAND_SIZE:
+            state.drop(player_index, state.default_drop(player_index))
+    _policy_robber(state, state.current_player, rng)
+
+
+def _policy_play(state: GameState, player_index: int, rng: random.Random) -> None:
+    """Builds the most valuable thing the player can afford, at random places, until they can't."""
+
+    placements = state.placements
+    hand = state.resources[player_index]
+    for _ in range(MAX_DECISIONS * 2):
+        if state.cities_left[player_index] and PRICES.CITY <= hand:
+            cities = placements.cities[player_index]
+            if cities:
+                state.build_city(player_index, rng.choice(sorted(cities)))
+                continue
+        if state.settlements_left[player_index] and PRICES.SETTLEMENT <= hand:
+            settlements = placements.settlements[player_index]
+            if settlements:
+                state.build_settlement(player_index, rng.choice(sorted(settlements)))
+                continue
+        if (
+            state.roads_left[player_index]
+            and PRICES.ROAD <= hand
+            and (not placements.settlements[player_index] or rng.random() < 0.5)
+        ):
+            roads = placements.roads[player_index]
+            if roads:
+                state.build_road(player_index, rng.choice(sorted(roads)))
+                continue
+        if state.deck and PRICES.DEVELOPMENT_CARD <= hand and rng.random() < 0.5:
+            state.buy_development_card(player_index)
+            continue
+        if sum(hand) > MAX_HAND_SIZE:
+            # Trade the most plentiful resource for the scarcest before a 7 halves the hand.
+            rates = state.maritime_rates(player_index)
+            sell = max(Resources, key=lambda r: hand[r] - rates[r])
+            receive = min(Resources, key=lambda r: hand[r])
+            if (
+                hand[sell] >= rates[sell]
+                and sell != receive
+                and state.maritime_trade(player_index, sell, receive) == Exceptions.OK
+            ):
+                continue
+        return
+
+
+def _end_turn(state: GameState) -> None:
+    """Ends the turn unless the current player won, since `GameState.winner` only looks at the current player."""
+
+    if state.winner() is None:
+        state.end_turn()
+
+
+def _policy_turn(state: GameState, rng: random.Random) -> None:
+    player_index = state.current_player
+    _policy_roll(state, rng)
+    _policy_play(state, player_index, rng)
+    _end_turn(state)
+
+
+def _finish_hook(
+    state: GameState, player_index: int, hook: str, decided: bool, rng: random.Random
+) -> None:
+    """Plays the rest of the turn the hook was called in, after the player's decisions in it."""
+
+    if hook == "play":
+        if not decided:
+            _policy_play(state, player_index, rng)
+        _end_turn(state)
+        return
+    if hook == "before_dice":
+        _policy_roll(state, rng)
+    elif hook == "drop_resources":
+        _policy_robber(state, state.current_player, rng)
+    _policy_play(state, state.current_player, rng)
+    _end_turn(state)
+
+
+def score(state: GameState, player_index: int) -> float:
+    """Returns 1 if the player won, 0 if another player did, and otherwise how far they lead in victory points."""
+
+    winner = state.winner()
+    if winner is not None:
+        return 1.0 if winner == player_index else 0.0
+    points = [state.total_victory_points(p) for p in range(state.player_count)]
+    lead = points[player_index] - max(
+        points[p] for p in range(state.player_count) if p != player_index
+    )
+    return min(max(0.5 + lead / (2 * WINNING_VICTORY_POINTS), 0.0), 1.0)
+
+
+def playout(
+    state: GameState,
+    player_index: int,
+    hook: str,
+    decided: bool,
+    rng: random.Random,
+    turns: int = ROLLOUT_TURNS,
+) -> float:
+    """Plays the state out from the player's decisions in the hook, and returns its score."""
+
+    if state.winner() is None:
+        _finish_hook(state, player_index, hook, decided, rng)
+    for _ in range(turns):
+        if state.winner() is not None:
+            break
+        _policy_turn(state, rng)
+    return score(state, player_index)
+
+
+### SEARCH ###
+
+
+class _Task(NamedTuple):
+    """The position a search starts from, sent to the worker processes."""
+
+    state: GameState
+    player_index: int
+    hook: str
+    offers: List[Tuple[int, Trade]]
+    hands: Optional[HandTracker]
+    rollout_turns: int
+    exploration: float
+
+
+Playouts = Callable[[GameState, bool, random.Random], Tuple[int, float]]
+"""Plays out a leaf's state, given whether the player's decisions are over, and returns the count and sum of scores."""
+
+
+def _grow(
+    task: _Task,
+    root: Node,
+    rng: random.Random,
+    deadline: float,
+    iterations: Optional[int],
+    playouts: Playouts,
+) -> int:
+    """Runs iterations on the tree until the deadline or the iteration count, and returns the number of playouts."""
+
+    player_index, hook, offers = task.player_index, task.hook, task.offers
+    rollouts = 0
+    iteration = 0
+    while (iterations is None or iteration < iterations) and (
+        iteration == 0 or time.perf_counter() < deadline
+    ):
+        iteration += 1
+        state = determinize(task.state, player_index, rng, task.hands)
+        node = root
+        path = [root]
+        decided = False
+        for _ in range(MAX_DECISIONS):
+            moves = _moves(state, player_index, hook, offers)
+            untried = [move for move in moves if move not in node.children]
+            if untried:
+                move = untried[0]
+                node.children[move] = Node()
+            else:
+                log_visits = math.log(node.visits)
+                move = max(
+                    moves,
+                    key=lambda m: node.children[m].value / node.children[m].visits
+                    + task.exploration
+                    * math.sqrt(log_visits / node.children[m].visits),
+                )
+            node = node.children[move]
+            path.append(node)
+            if move is not None:
+                _run(state, player_index, move, offers, rng)
+            if move is None or hook != "play" or state.winner() is not None:
+                decided = True
+                break
+            if untried:
+                break
+
+        count, value = playouts(state, decided, rng)
+        rollouts += count
+        for node in path:
+            node.visits += count
+            node.value += value
+    return rollouts
+
+
+def _search(
+    arguments: Tuple[_Task, int, float, Optional[int]],
+) -> Tuple[Dict[Move, Tuple[int, float]], int]:
+    """Grows a tree in a process of its own, and returns the visits and score sums of the root's children."""
+
+    task, seed, seconds, iterations = arguments
+    deadline = time.perf_counter() + seconds
+    root = Node()
+
+    def playouts(state, decided, rng):
+        return 1, playout(
+            state, task.player_index, task.hook, decided, rng, task.rollout_turns
+        )
+
+    rollouts = _grow(task, root, random.Random(seed), deadline, iterations, playouts)
+    return {
+        move: (child.visits, child.value) for move, child in root.children.items()
+    }, rollouts
+
+
+def _playouts(arguments: Tuple[GameState, int, str, bool, int, int, int]) -> float:
+    """Plays a leaf's state out in a process of its own, and returns the sum of the scores."""
+
+    state, player_index, hook, decided, turns, seed, count = arguments
+    rng = random.Random(seed)
+    return sum(
+        playout(
+            state.clone(random.Random(rng.getrandbits(64))),
+            player_index,
+            hook,
+            decided,
+            rng,
+            turns,
+        )
+        for _ in range(count)
+    )
+
+
+class MCTS:
+    """
+    A reusable search of a bot's decisions, for the contexts of this engine's `Game`.
+
+    Each search takes `seconds` (or the share `TIME_SHARE` of the hook's remaining time, if less), or exactly
+    `iterations` iterations if given, which makes it repeatable for a `seed`. With `workers`, the search runs in a
+    pool of that many processes, started on the first search and stopped by `close`:
+    `parallel="root"` grows a tree in every process, and `parallel="leaf"` grows one tree here and plays every new
+    leaf out `leaf_playouts` times in every process.
+    """
+
+    def __init__(
+        self,
+        seconds: float = 1.0,
+        iterations: Optional[int] = None,
+        workers: int = 0,
+        parallel: str = "root",
+        exploration: float = EXPLORATION,
+        rollout_turns: int = ROLLOUT_TURNS,
+        leaf_playouts: int = 1,
+        seed: Optional[int] = None,
+    ):
+        if parallel not in ("root", "leaf"):
+            raise ValueError(f"unknown parallelism {parallel!r}")
+        self.seconds = seconds
+        self.iterations = iterations
+        self.workers = workers
+        self.parallel = parallel
+        self.exploration = exploration
+        self.rollout_turns = rollout_turns
+        self.leaf_playouts = leaf_playouts
+        self.rng = random.Random(seed)
+        self.pool: Optional[Pool] = None
+        self.last: Optional[SearchResult] = None
+        """The result of the last search."""
+
+    def _pool(self) -> Pool:
+        if self.pool is None:
+            self.pool = Pool(self.workers)
+            self._finalizer = weakref.finalize(self, self.pool.terminate)
+        return self.pool
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+
+        if self.pool is not None:
+            self._finalizer()
+            self.pool = None
+
+    def search(
+        self, context: API, hook: str = "play", hands: Optional[HandTracker] = None
+    ) -> SearchResult:
+        """
+        Searches the decisions of the context's player in the hook being called. Pass the player's `HandTracker` to
+        sample the opponents' resources from what the events tell, instead of from their hand sizes alone.
+        """
+
+        start = time.perf_counter()
+        state = context.fork().state
+        player_index = context.get_player_index()
+        offers = []
+        if hook == "respond_to_trade_offers" and state.current_player != player_index:
+            # Only the current player's offers have a known proposer.
+            offers = [
+                (state.current_player, trade)
+                for trade in context.get_pending_trade_offers()
+            ]
+        _moves(state, player_index, hook, offers)  # Fail early on an unknown hook.
+        task = _Task(
+            state,
+            player_index,
+            hook,
+            offers,
+            hands,
+            self.rollout_turns,
+            self.exploration,
+        )
+        seconds = min(self.seconds, context.get_time_remaining() * TIME_SHARE)
+
+        totals: Dict[Move, List[float]] = {}
+        if self.workers and self.parallel == "root":
+            results = self._pool().map(
+                _search,
+                [
+                    (
+                        task,
+                        self.rng.getrandbits(64),
+                        start + seconds - time.perf_counter(),
+                        self.iterations,
+                    )
+                    for _ in range(self.workers)
+                ],
+            )
+            rollouts = 0
+            for children, count in results:
+                rollouts += count
+                for move, (visits, value) in children.items():
+                    total = totals.setdefault(move, [0, 0.0])
+                    total[0] += visits
+                    total[1] += value
+        else:
+            root = Node()
+            if self.workers:
+                pool = self._pool()
+
+                def playouts(state, decided, rng):
+                    values = pool.map(
+                        _playouts,
+                        [
+                            (
+                                state,
+                                player_index,
+                                hook,
+                                decided,
+                                self.rollout_turns,
+                                rng.getrandbits(64),
+                                self.leaf_playouts,
+                            )
+                            for _ in range(self.workers)
+                        ],
+                    )
+                    return self.workers * self.leaf_playouts, sum(values)
+
+            else:
+
+                def playouts(state, decided, rng):
+                    return 1, playout(
+                        state, player_index, hook, decided, rng, self.rollout_turns
+                    )
+
+            rollouts = _grow(
+                task,
+                root,
+                random.Random(self.rng.getrandbits(64)),
+                start + seconds,
+                self.iterations,
+                playouts,
+            )
+            totals = {
+                move: [child.visits, child.value]
+                for move, child in root.children.items()
+            }
+
+        ranked = sorted(
+            totals.items(),
+            key=lambda item: (item[1][0], item[1][1] / max(item[1][0], 1)),
+            reverse=True,
+        )
+        choices = [
+            (_action(state, move), int(visits), value / max(visits, 1))
+            for move, (visits, value) in ranked
+        ]
+        self.last = SearchResult(
+            choices[0][0] if choices else None,
+            choices,
+            rollouts,
+            time.perf_counter() - start,
+        )
+        return self.last
+
+    def act(
+        self, context: API, hook: str = "play", hands: Optional[HandTracker] = None
+    ) -> Optional[Exceptions]:
+        """Searches the hook and runs the best decision on the context, returning its result, or None to do nothing."""
+
+        action = self.search(context, hook, hands).action
+        if action is None:
+            return None
+        return getattr(context, action.method)(*action.arguments)
+
+
+class MCTSBot(CatanBot):
+    """
+    Searches every decision it can with `MCTS`, sampling the opponents' hands from a `HandTracker`. The setup
+    placements aren't searched: they're the best ones of `OpeningEvaluator`, by production, new resources and harbors.
+
+    Its search is seeded from the global `random` module, which the tournament runner seeds before every game.
+    """
+
+    seconds: float = 0.5
+    workers: int = 0
+    diversity_weight: float = 2.0
+    harbor_weight: float = 0.5
+
+    def setup(self) -> None:
+        self.search = MCTS(
+            seconds=self.seconds, workers=self.workers, seed=random.getrandbits(64)
+        )
+        self.hands = HandTracker(self.context.get_player_index())
+        self.cursor = 0
+        self.opening: Optional[OpeningEvaluator] = None
+
+    def _hands(self) -> HandTracker:
+        events, self.cursor = self.context.get_events_since(self.cursor)
+        self.hands.update(events)
+        return self.hands
+
+    def place_settlement_and_road(self) -> None:
+        state = self.context.fork().state
+        topology = state.topology
+        if self.opening is None:
+            self.opening = OpeningEvaluator.from_api(self.context, topology)
+        occupied = np.array(state.building_owners) != NO_PLAYER
+        best = self.opening.best_placement(
+            self.opening.legal_mask(occupied),
+            (1.0,) * len(Resources),
+            list(state.production.player(self.context.get_player_index())),
+            self.diversity_weight,
+            self.harbor_weight,
+            np.array(state.road_owners) == NO_PLAYER,
+        )
+        if best:
+            intersection_id, edge_id, _ = best
+            self.context.build_settlement(
+                topology.intersection_positions[intersection_id]
+            )
+            if edge_id is not None:
+                self.context.build_road(topology.edge_positions[edge_id])
+
+    def play(self) -> None:
+        # The engine calls `play` again after every action, so one decision per call is enough.
+        self.search.act(self.context, "play", self._hands())
+
+    def before_dice(self) -> None:
+        self.search.act(self.context, "before_dice", self._hands())
+
+    def move_robber(self) -> None:
+        self.search.act(self.context, "move_robber", self._hands())
+
+    def drop_resources(self) -> None:
+        self.search.act(self.context, "drop_resources", self._hands())
+
+    def respond_to_trade_offers(self) -> None:
+        self.search.act(self.context, "respond_to_trade_offers", self._hands())
@@ -0,0 +1,215 @@
+"""
+A vectorized evaluator for opening placements.
+
+`OpeningEvaluator` turns the board into NumPy arrays once per game (the intersection x resource production matrix,
+the edge ends and the harbor of every intersection), and then scores every legal intersection in a handful of
+array operations.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api import API, Lands, Resources
+from production import PIPS
+from topology import BoardTopology
+
+RESOURCE_COUNT = len(Resources)
+GENERIC_HARBOR = RESOURCE_COUNT
+"""The harbor kind of a 3-to-1 harbor in `OpeningEvaluator.harbors`."""
+NO_HARBOR = -1
+
+Placement = Tuple[int, Optional[int], float]
+"""An opening placement: a settlement's intersection ID, its road's edge ID or None, and the settlement's score."""
+
+
+class OpeningEvaluator:
+    """
+    Scores opening settlements and their roads for a board, over `BoardTopology` IDs.
+
+    An intersection's score is its production weighted per resource, plus a bonus for every resource it adds that the
+    player doesn't produce yet, plus a bonus for a harbor: a 2-to-1 harbor is worth the production of its resource
+    (the intersection's plus the player's), and a 3-to-1 harbor a third of the total production.
+    """
+
+    def __init__(
+        self,
+        topology: BoardTopology,
+        lands: Sequence[Optional[Lands]],
+        numbers: Sequence[Optional[int]],
+        harbors: Sequence[Tuple[int, Optional[Resources]]],
+    ):
+        """Builds the arrays from the land and number of every terrain and the (edge ID, resource) of every harbor."""
+
+        self.topology = topology
+        terrain_production = np.zeros((topology.num_terrains, RESOURCE_COUNT))
+        for terrain_id, (land, number) in enumerate(zip(lands, numbers)):
+            if land is not None and land != Lands.DESERT and number in PIPS:
+                terrain_production[terrain_id, land] = PIPS[number]
+
+        indptr = np.frombuffer(topology.intersection_terrains_indptr, dtype=np.int32)
+        indices = np.frombuffer(topology.intersection_terrains_indices, dtype=np.int32)
+        rows = np.repeat(np.arange(topology.num_intersections), np.diff(indptr))
+        self.production = np.zeros((topology.num_intersections, RESOURCE_COUNT))
+        """The production of every intersection in pips per resource, ignoring the robber."""
+        np.add.at(self.production, rows, terrain_production[indices])
+
+        self.edge_ends = np.frombuffer(topology.edge_ends, dtype=np.int32).reshape(
+            -1, 2
+        )
+        self.harbors = np.full(topology.num_intersections, NO_HARBOR)
+        """The harbor kind of every intersection: a resource, `GENERIC_HARBOR` or `NO_HARBOR`."""
+        for edge_id, resource in harbors:
+            self.harbors[self.edge_ends[edge_id]] = (
+                GENERIC_HARBOR if resource is None else int(resource)
+            )
+        self._harbor_rows = np.flatnonzero(self.harbors >= 0)
+        self._harbor_kinds = self.harbors[self._harbor_rows]
+
+    @classmethod
+    def from_api(
+        cls, api: API, topology: Optional[BoardTopology] = None
+    ) -> "OpeningEvaluator":
+        """Builds the evaluator of the current game's board, with `BoardTopology.from_api` if a topology isn't given."""
+
+        if topology is None:
+            topology = BoardTopology.from_api(api)
+        return cls(
+            topology,
+            [api.get_land(position) for position in topology.terrain_positions],
+            [api.get_number(position) for position in topology.terrain_positions],
+            [
+                (topology.edge_id(ends), resource)
+                for ends, resource in api.get_harbor_positions()
+            ],
+        )
+
+    def legal_mask(self, occupied: np.ndarray) -> np.ndarray:
+        """Returns which intersections satisfy the distance rule, given a boolean array of intersections with a building."""
+
+        blocked = occupied.copy()
+        a, b = self.edge_ends[:, 0], self.edge_ends[:, 1]
+        blocked[a[occupied[b]]] = True
+        blocked[b[occupied[a]]] = True
+        return ~blocked
+
+    def scores(
+        self,
+        legal: np.ndarray,
+        resource_weights: Sequence[float],
+        player_production: Sequence[float] = (0,) * RESOURCE_COUNT,
+        diversity_weight: float = 0.0,
+        harbor_weight: float = 0.0,
+    ) -> np.ndarray:
+        """Returns the score of every intersection, which is -inf for intersections not in the boolean `legal` mask."""
+
+        production = self.production
+        player_production = np.asarray(player_production, dtype=float)
+        result = production @ np.asarray(resource_weights, dtype=float)
+        if diversity_weight:
+            new = (production > 0) & (player_production == 0)
+            result += diversity_weight * new.sum(axis=1)
+        if harbor_weight and len(self._harbor_rows):
+            total = production[self._harbor_rows] + player_production
+            specific = self._harbor_kinds < GENERIC_HARBOR
+            value = np.where(
+                specific,
+                total[
+                    np.arange(len(self._harbor_rows)),
+                    np.minimum(self._harbor_kinds, RESOURCE_COUNT - 1),
+                ],
+                total.sum(axis=1) / 3,
+            )
+            result[self._harbor_rows] += harbor_weight * value
+        result[~legal] = -np.inf
+        return result
+
+    def best_road(
+        self, intersection_id: int, road_edges: Sequence[int], scores: np.ndarray
+    ) -> Optional[int]:
+        """
+        Returns the edge among `road_edges` leading towards the best settlement spot two edges away from the given
+        intersection, according to `scores`, or None if there are no road edges.
+        """
+
+        topology = self.topology
+        best_edge, best_score = None, -np.inf
+        for edge_id in road_edges:
+            a, b = self.edge_ends[edge_id]
+            far = b if a == intersection_id else a
+            neighbors = [
+                z for z in topology.intersection_neighbors(far) if z != intersection_id
+            ]
+            score = scores[neighbors].max() if neighbors else -np.inf
+            if best_edge is None or score > best_score:
+                best_edge, best_score = edge_id, score
+        return best_edge
+
+    def ranked_placements(
+        self,
+        legal: np.ndarray,
+        resource_weights: Sequence[float],
+        player_production: Sequence[float] = (0,) * RESOURCE_COUNT,
+        diversity_weight: float = 0.0,
+        harbor_weight: float = 0.0,
+        open_edges: Optional[np.ndarray] = None,
+        count: int = 1,
+    ) -> List[Placement]:
+        """
+        Returns up to `count` legal intersections from the best down, each with the best road from it among the
+        boolean `open_edges` mask (all edges by default), or None if it has no open edge, and its score.
+        """
+
+        scores = self.scores(
+            legal, resource_weights, player_production, diversity_weight, harbor_weight
+        )
+        topology = self.topology
+        placements = []
+        for intersection_id in np.argsort(-scores, kind="stable")[:count]:
+            intersection_id = int(intersection_id)
+            score = float(scores[intersection_id])
+            if score == -np.inf:
+                break
+            # Settling here blocks the intersection and its neighbors, so they can't be the road's target.
+            targets = scores.copy()
+            targets[intersection_id] = -np.inf
+            targets[np.asarray(topology.intersection_neighbors(intersection_id))] = (
+                -np.inf
+            )
+            road_edges = [
+                edge_id
+                for edge_id in topology.intersection_edges(intersection_id)
+                if open_edges is None or open_edges[edge_id]
+            ]
+            placements.append(
+                (
+                    intersection_id,
+                    self.best_road(intersection_id, road_edges, targets),
+                    score,
+                )
+            )
+        return placements
+
+    def best_placement(
+        self,
+        legal: np.ndarray,
+        resource_weights: Sequence[float],
+        player_production: Sequence[float] = (0,) * RESOURCE_COUNT,
+        diversity_weight: float = 0.0,
+        harbor_weight: float = 0.0,
+        open_edges: Optional[np.ndarray] = None,
+    ) -> Optional[Placement]:
+        """
+        Returns the best legal intersection, the best road from it among the boolean `open_edges` mask (all edges by
+        default), or None if it has no open edge, and the intersection's score. Returns None if no intersection is legal.
+        """
+
+        placements = self.ranked_placements(
+            legal,
+            resource_weights,
+            player_production,
+            diversity_weight,
+            harbor_weight,
+            open_edges,
+        )
+        return placements[0] if placements else None
@@ -0,0 +1,396 @@
+"""
+A persistent opening book of ranked setup placements, shared across games, tournaments and processes.
+
+Boards repeat whenever seeds do, and a rotated or mirrored board is the same board to a bot. `BoardLayout` finds
+the canonical form of a layout under the 12 symmetries of the hexagonal board, and `OpeningBook` keeps the ranked
+placements of every canonical layout, taken intersections and roads, and evaluation parameters in an SQLite
+database, which the workers of a tournament can read and write at the same time:
+
+```python
+book = OpeningBook("opening_book.sqlite3")
+layout = BoardLayout.from_api(context, topology)
+placements = book.ranked_placements(layout, lambda: evaluator, occupied, roads, weights)
+```
+
+Bots reach the book named by the `CATAN_OPENING_BOOK` environment variable with `default_book`, which
+`tournament.py --opening-book` sets.
+"""
+
+import collections
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from array import array
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api import API, Lands, Position, Resources
+from opening import RESOURCE_COUNT, OpeningEvaluator, Placement
+from topology import BoardTopology, Edge
+
+OPENING_BOOK_ENV = "CATAN_OPENING_BOOK"
+MAX_ENTRIES = 100_000
+"""The default number of entries a book keeps on disk, evicting the least recently used ones beyond it."""
+CACHED_ENTRIES = 1024
+"""The default number of entries a book keeps in memory, so repeated lookups don't read the database."""
+RANKED_PLACEMENTS = 8
+CACHED_LAYOUTS = 16
+BUSY_TIMEOUT = 30.0
+"""The seconds to wait for another process holding the database's write lock."""
+RECENCY_RESOLUTION = 3600.0
+"""The seconds within which uses of an entry count as one, so most lookups don't write to the database."""
+
+Symmetry = Tuple[array, array, array]
+"""The terrain, intersection and edge IDs every terrain, intersection and edge is moved to by a symmetry."""
+
+
+### SYMMETRIES ###
+
+
+def _rotate(position: Position) -> Position:
+    # A 60 degree turn around the center terrain, in the coordinates of `board`, where x is a multiple of 4 and y of 2.
+    x, y = position
+    return x // 2 - y, 3 * x // 4 + y // 2
+
+
+def _reflect(position: Position) -> Position:
+    x, y = position
+    return -x, y
+
+
+def symmetries(topology: BoardTopology) -> List[Symmetry]:
+    """
+    Returns the rotations and reflections which map the board onto itself, starting with the identity. A board of
+    rings around a center terrain has all 12. The result is cached by the board's positions, so it must not be modified.
+    """
+
+    return _symmetries(
+        tuple(topology.terrain_positions),
+        tuple(topology.intersection_positions),
+        tuple(topology.edge_positions),
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _symmetries(
+    terrains: Tuple[Position, ...],
+    intersections: Tuple[Position, ...],
+    edges: Tuple[Edge, ...],
+) -> List[Symmetry]:
+    terrain_ids = {position: i for i, position in enumerate(terrains)}
+    intersection_ids = {position: i for i, position in enumerate(intersections)}
+    edge_ids = {}
+    for i, (a, b) in enumerate(edges):
+        edge_ids[(a, b)] = edge_ids[(b, a)] = i
+
+    result = []
+    for reflected in (False, True):
+        for turns in range(6):
+
+            def move(position):
+                if reflected:
+                    position = _reflect(position)
+                for _ in range(turns):
+                    position = _rotate(position)
+                return position
+
+            try:
+                result.append(
+                    (
+                        array("i", (terrain_ids[move(p)] for p in terrains)),
+                        array("i", (intersection_ids[move(p)] for p in intersections)),
+                        array("i", (edge_ids[(move(a), move(b))] for a, b in edges)),
+                    )
+                )
+            except KeyError:
+                continue
+    return result
+
+
+def _inverse(permutation: array) -> array:
+    result = array("i", bytes(len(permutation) * permutation.itemsize))
+    for i, j in enumerate(permutation):
+        result[j] = i
+    return result
+
+
+class BoardLayout:
+    """
+    A board's lands, numbers and harbors in their canonical orientation: the smallest layout among the board's
+    symmetries. Boards which are rotations or reflections of each other have the same `digest`.
+    """
+
+    def __init__(
+        self,
+        topology: BoardTopology,
+        lands: Sequence[Optional[Lands]],
+        numbers: Sequence[Optional[int]],
+        harbors: Sequence[Tuple[int, Optional[Resources]]],
+    ):
+        """Finds the canonical layout from the land and number of every terrain and the (edge ID, resource) of every harbor."""
+
+        best = None
+        for symmetry in symmetries(topology):
+            terrains, _, edges = symmetry
+            cells = [(0, 0)] * topology.num_terrains
+            for terrain_id, (land, number) in enumerate(zip(lands, numbers)):
+                cells[terrains[terrain_id]] = (
+                    -1 if land is None else int(land),
+                    number or 0,
+                )
+            form = (
+                tuple(cells),
+                tuple(
+                    sorted(
+                        (edges[edge_id], -1 if resource is None else int(resource))
+                        for edge_id, resource in harbors
+                    )
+                ),
+            )
+            if best is None or form < best[0]:
+                best = form, symmetry
+
+        form, (_, intersections, edges) = best
+        self.intersections: array = intersections
+        """The canonical ID of every intersection of the board."""
+        self.edges: array = edges
+        """The canonical ID of every edge of the board."""
+        self.intersection_ids = _inverse(intersections)
+        self.edge_ids = _inverse(edges)
+        self.digest = hashlib.blake2b(repr(form).encode(), digest_size=16).hexdigest()
+
+    @classmethod
+    def from_api(
+        cls, api: API, topology: Optional[BoardTopology] = None
+    ) -> "BoardLayout":
+        """Reads the current game's board, with `BoardTopology.from_api` if a topology isn't given."""
+
+        if topology is None:
+            topology = BoardTopology.from_api(api)
+        lands = tuple(api.get_land(position) for position in topology.terrain_positions)
+        numbers = tuple(
+            api.get_number(position) for position in topology.terrain_positions
+        )
+        harbors = tuple(
+            (topology.edge_id(ends), resource)
+            for ends, resource in api.get_harbor_positions()
+        )
+        # Every bot of a game reads the same board, so only the first one finds its canonical layout.
+        key = (
+            tuple(topology.terrain_positions),
+            tuple(topology.intersection_positions),
+            tuple(topology.edge_positions),
+            lands,
+            numbers,
+            harbors,
+        )
+        layout = _layouts.get(key)
+        if layout is None:
+            layout = _layouts[key] = cls(topology, lands, numbers, harbors)
+            if len(_layouts) > CACHED_LAYOUTS:
+                _layouts.popitem(last=False)
+        return layout
+
+    def key(
+        self,
+        intersection_ids: Iterable[int],
+        edge_ids: Iterable[int],
+        parameters: Sequence[float],
+    ) -> str:
+        """Returns the book key of the layout with the given taken intersections and roads, and evaluation parameters."""
+
+        intersections = sorted(self.intersections[i] for i in intersection_ids)
+        edges = sorted(self.edges[e] for e in edge_ids)
+        values = ",".join(f"{value:.6g}" for value in parameters)
+        return f"{self.digest}/{intersections}/{edges}/{values}"
+
+    def to_canonical(self, placements: Sequence[Placement]) -> List[Placement]:
+        return [
+            (
+                self.intersections[intersection_id],
+                None if edge_id is None else self.edges[edge_id],
+                score,
+            )
+            for intersection_id, edge_id, score in placements
+        ]
+
+    def from_canonical(self, placements: Sequence[Placement]) -> List[Placement]:
+        return [
+            (
+                self.intersection_ids[intersection_id],
+                None if edge_id is None else self.edge_ids[edge_id],
+                score,
+            )
+            for intersection_id, edge_id, score in placements
+        ]
+
+
+_layouts: "collections.OrderedDict[tuple, BoardLayout]" = collections.OrderedDict()
+
+
+### BOOK ###
+
+
+class OpeningBook:
+    """
+    Ranked placements by book key (see `BoardLayout.key`), in canonical IDs, stored in an SQLite database.
+
+    Every process opens its own connection, and writes are single transactions, so any number of processes may
+    share a book. The database keeps the `max_entries` most recently used entries, and every process keeps the
+    `cached_entries` it used last in memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = MAX_ENTRIES,
+        cached_entries: int = CACHED_ENTRIES,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.cached_entries = cached_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._cache: "collections.OrderedDict[str, List[Placement]]" = (
+            collections.OrderedDict()
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections can't cross a fork, so a forked process opens its own.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS placements"
+                " (key TEXT PRIMARY KEY, placements TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS placements_used ON placements (used)"
+            )
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _remember(self, key: str, placements: List[Placement]) -> None:
+        self._cache[key] = placements
+        if len(self._cache) > self.cached_entries:
+            self._cache.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Placement]]:
+        """Returns the placements of the key, or None if the book doesn't have them."""
+
+        placements = self._cache.get(key)
+        if placements is not None:
+            self._cache.move_to_end(key)
+            return placements
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT placements, used FROM placements WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > RECENCY_RESOLUTION:
+            connection.execute(
+                "UPDATE placements SET used = ? WHERE key = ?", (now, key)
+            )
+        placements = [tuple(placement) for placement in json.loads(row[0])]
+        self._remember(key, placements)
+        return placements
+
+    def put(self, key: str, placements: List[Placement]) -> None:
+        """Stores the placements of the key, evicting the least recently used entries beyond `max_entries`."""
+
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO placements VALUES (?, ?, ?)",
+                (key, json.dumps(placements), time.time()),
+            )
+            (count,) = connection.execute("SELECT COUNT(*) FROM placements").fetchone()
+            if count > self.max_entries:
+                connection.execute(
+                    "DELETE FROM placements WHERE key IN"
+                    " (SELECT key FROM placements ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._remember(key, placements)
+
+    def ranked_placements(
+        self,
+        layout: BoardLayout,
+        evaluator: Callable[[], OpeningEvaluator],
+        occupied: np.ndarray,
+        roads: np.ndarray,
+        resource_weights: Sequence[float],
+        player_production: Sequence[float] = (0,) * RESOURCE_COUNT,
+        diversity_weight: float = 0.0,
+        harbor_weight: float = 0.0,
+        count: int = RANKED_PLACEMENTS,
+    ) -> List[Placement]:
+        """
+        Returns `OpeningEvaluator.ranked_placements` in the setup stage, given boolean arrays of the intersections
+        with a building and the edges with a road, from the book if it has them. Otherwise `evaluator` is called for
+        the board's evaluator, and the placements it ranks are stored in the book.
+        """
+
+        key = layout.key(
+            np.flatnonzero(occupied),
+            np.flatnonzero(roads),
+            [
+                *resource_weights,
+                *player_production,
+                diversity_weight,
+                harbor_weight,
+                count,
+            ],
+        )
+        placements = self.get(key)
+        if placements is not None:
+            self.hits += 1
+            return layout.from_canonical(placements)
+        self.misses += 1
+        opening = evaluator()
+        placements = opening.ranked_placements(
+            opening.legal_mask(occupied),
+            resource_weights,
+            player_production,
+            diversity_weight,
+            harbor_weight,
+            ~roads,
+            count,
+        )
+        self.put(key, layout.to_canonical(placements))
+        return placements
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+
+@functools.lru_cache(maxsize=None)
+def open_book(path: str) -> OpeningBook:
+    """Returns the book at the path, shared by every bot of the process."""
+
+    return OpeningBook(path)
+
+
+def default_book() -> Optional[OpeningBook]:
+    """Returns the book at the path in the `CATAN_OPENING_BOOK` environment variable, or None if it isn't set."""
+
+    path = os.environ.get(OPENING_BOOK_ENV)
+    return open_book(path) if path else None
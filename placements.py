@@ -0,0 +1,117 @@
+"""
+Incrementally maintained sets of legal building positions.
+
+`LegalPlacements` is fed every build event of a game and keeps, per player, the set of intersections where a
+settlement or city may be built and the set of edges where a road may be built, so none of these have to be
+recomputed by scanning the board.
+"""
+
+from typing import List, Set
+
+from topology import BoardTopology
+
+NO_PLAYER = -1
+
+
+class LegalPlacements:
+    """
+    Legal settlement, city and road positions (as topology IDs) for every player.
+
+    Only positioning rules are considered; resources and remaining pieces are checked by the caller.
+    Call `add_settlement`, `add_city` and `add_road` after every build.
+    """
+
+    def __init__(self, topology: BoardTopology, player_count: int):
+        self.topology = topology
+        self.player_count = player_count
+
+        self.building_owners: List[int] = [NO_PLAYER] * topology.num_intersections
+        self.road_owners: List[int] = [NO_PLAYER] * topology.num_edges
+
+        self.open_intersections: Set[int] = set(range(topology.num_intersections))
+        """Intersections which are empty and have no neighboring building, i.e. the legal settlements in the setup stage."""
+        self.settlements: List[Set[int]] = [set() for _ in range(player_count)]
+        """Intersections which are open and touch one of the player's roads."""
+        self.cities: List[Set[int]] = [set() for _ in range(player_count)]
+        """The player's settlements, which may be upgraded to cities."""
+        self.roads: List[Set[int]] = [set() for _ in range(player_count)]
+        """Empty edges connected to the player's buildings or road network."""
+
+    def copy(self) -> "LegalPlacements":
+        result = object.__new__(LegalPlacements)
+        result.topology = self.topology
+        result.player_count = self.player_count
+        result.building_owners = self.building_owners[:]
+        result.road_owners = self.road_owners[:]
+        result.open_intersections = set(self.open_intersections)
+        result.settlements = [set(s) for s in self.settlements]
+        result.cities = [set(s) for s in self.cities]
+        result.roads = [set(s) for s in self.roads]
+        return result
+
+    ### QUERIES ###
+
+    def is_connected(self, player_index: int, edge_id: int) -> bool:
+        """Returns whether the given edge touches one of the player's buildings, or one of their roads not cut by another player's building."""
+
+        topology = self.topology
+        for end in topology.edge_intersections(edge_id):
+            owner = self.building_owners[end]
+            if owner == player_index:
+                return True
+            if owner != NO_PLAYER:
+                continue
+            for other_edge in topology.intersection_edges(end):
+                if self.road_owners[other_edge] == player_index:
+                    return True
+        return False
+
+    def setup_road_edges(self, intersection_id: int) -> List[int]:
+        """Returns the empty edges touching the given intersection, which are the legal roads for a settlement placed in the setup stage."""
+
+        return [
+            edge_id
+            for edge_id in self.topology.intersection_edges(intersection_id)
+            if self.road_owners[edge_id] == NO_PLAYER
+        ]
+
+    ### EVENTS ###
+
+    def add_settlement(self, player_index: int, intersection_id: int) -> None:
+        topology = self.topology
+        self.building_owners[intersection_id] = player_index
+        self.cities[player_index].add(intersection_id)
+
+        closed = [intersection_id, *topology.intersection_neighbors(intersection_id)]
+        for closed_id in closed:
+            self.open_intersections.discard(closed_id)
+            for settlements in self.settlements:
+                settlements.discard(closed_id)
+
+        # The settlement extends its owner's network, and cuts the others' roads through it.
+        for edge_id in topology.intersection_edges(intersection_id):
+            if self.road_owners[edge_id] != NO_PLAYER:
+                continue
+            self.roads[player_index].add(edge_id)
+            for other in range(self.player_count):
+                if other != player_index and not self.is_connected(other, edge_id):
+                    self.roads[other].discard(edge_id)
+
+    def add_city(self, player_index: int, intersection_id: int) -> None:
+        self.cities[player_index].discard(intersection_id)
+
+    def add_road(self, player_index: int, edge_id: int) -> None:
+        topology = self.topology
+        self.road_owners[edge_id] = player_index
+        for roads in self.roads:
+            roads.discard(edge_id)
+
+        for end in topology.edge_intersections(edge_id):
+            owner = self.building_owners[end]
+            if owner != NO_PLAYER and owner != player_index:
+                continue
+            if end in self.open_intersections:
+                self.settlements[player_index].add(end)
+            for other_edge in topology.intersection_edges(end):
+                if self.road_owners[other_edge] == NO_PLAYER:
+                    self.roads[player_index].add(other_edge)
@@ -0,0 +1,116 @@
+"""
+Expected production of intersections and players.
+
+Production is measured in pips: the number of the 36 outcomes of the two dice which produce from a terrain.
+`ProductionTable` computes the production of every intersection once per board and only updates the terrains the
+robber leaves and enters, and keeps every player's production from their buildings up to date.
+"""
+
+from typing import List
+
+from api import Buildings, Lands, ResourceCounts
+from board import Board
+from placements import NO_PLAYER
+
+RESOURCE_COUNT = 5
+
+PIPS = {2: 1, 3: 2, 4: 3, 5: 4, 6: 5, 8: 5, 9: 4, 10: 3, 11: 2, 12: 1}
+"""The number of dice outcomes (out of 36) producing each number."""
+
+
+class ProductionTable:
+    """
+    The expected production of every intersection and player, in pips per resource, with the robber's terrain excluded.
+
+    Reads the building owners and types of a `GameState`, so it must be created before any building is placed, and be
+    told about every building after it is recorded there and about every robber move.
+    """
+
+    def __init__(
+        self,
+        board: Board,
+        player_count: int,
+        building_owners: List[int],
+        building_types: List[int],
+    ):
+        topology = board.topology
+        self.topology = topology
+        self.building_owners = building_owners
+        self.building_types = building_types
+
+        self.terrain_pips: List[int] = [
+            0 if land == Lands.DESERT or number is None else PIPS[number]
+            for land, number in zip(board.lands, board.numbers)
+        ]
+        self.terrain_resources: List[int] = [int(land) for land in board.lands]
+
+        self.intersections: List[int] = [0] * (
+            topology.num_intersections * RESOURCE_COUNT
+        )
+        """The production of intersection `i` of resource `r` is at `intersections[i * 5 + r]`."""
+        self.players: List[List[int]] = [
+            [0] * RESOURCE_COUNT for _ in range(player_count)
+        ]
+        self.robber = board.desert
+        for terrain_id in range(topology.num_terrains):
+            if terrain_id != self.robber:
+                self._add_terrain(terrain_id, 1)
+
+    def copy(
+        self, building_owners: List[int], building_types: List[int]
+    ) -> "ProductionTable":
+        """Returns a copy which reads the given building owners and types."""
+
+        result = object.__new__(ProductionTable)
+        result.__dict__.update(self.__dict__)
+        result.building_owners = building_owners
+        result.building_types = building_types
+        result.intersections = self.intersections[:]
+        result.players = [production[:] for production in self.players]
+        return result
+
+    def _add_terrain(self, terrain_id: int, sign: int) -> None:
+        pips = self.terrain_pips[terrain_id]
+        if not pips:
+            return
+        resource = self.terrain_resources[terrain_id]
+        for intersection_id in self.topology.terrain_intersections(terrain_id):
+            self.intersections[intersection_id * RESOURCE_COUNT + resource] += (
+                sign * pips
+            )
+            owner = self.building_owners[intersection_id]
+            if owner != NO_PLAYER:
+                multiplier = (
+                    2 if self.building_types[intersection_id] == Buildings.CITY else 1
+                )
+                self.players[owner][resource] += sign * multiplier * pips
+
+    ### QUERIES ###
+
+    def intersection(self, intersection_id: int) -> ResourceCounts:
+        """Returns the production of the given intersection."""
+
+        start = intersection_id * RESOURCE_COUNT
+        return ResourceCounts(*self.intersections[start : start + RESOURCE_COUNT])
+
+    def player(self, player_index: int) -> ResourceCounts:
+        """Returns the production of the given player's buildings."""
+
+        return ResourceCounts(*self.players[player_index])
+
+    ### EVENTS ###
+
+    def add_building(self, player_index: int, intersection_id: int) -> None:
+        """Adds the production of a new settlement, or of the settlement upgraded to a city."""
+
+        production = self.players[player_index]
+        start = intersection_id * RESOURCE_COUNT
+        for resource in range(RESOURCE_COUNT):
+            production[resource] += self.intersections[start + resource]
+
+    def move_robber(self, terrain_id: int) -> None:
+        if terrain_id == self.robber:
+            return
+        self._add_terrain(self.robber, 1)
+        self._add_terrain(terrain_id, -1)
+        self.robber = terrain_id
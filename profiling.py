@@ -0,0 +1,206 @@
+"""
+Optional profiling of bot hooks and `API` calls.
+
+Pass a `Profiler` to `Game` to time every `CatanBot` hook and every `API` method a bot calls, or run a tournament
+with `--profile report.json`. Without a profiler the `API` isn't wrapped, so the only overhead is reading the clock
+around each hook:
+
+```python
+from engine import Game
+from bot import MyBot
+from profiling import Profiler
+
+profiler = Profiler()
+Game([MyBot] * 4, seed=1, profiler=profiler).run()
+profiler.dump("report.json")
+```
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from api import API
+
+BUCKETS_PER_DECADE = 20
+MIN_SECONDS = 1e-7
+BUCKET_COUNT = 9 * BUCKETS_PER_DECADE
+"""Latencies are bucketed logarithmically from 100ns to 100s, with about 12% resolution."""
+
+
+def _bucket(seconds: float) -> int:
+    if seconds <= MIN_SECONDS:
+        return 0
+    return min(
+        int(math.log10(seconds / MIN_SECONDS) * BUCKETS_PER_DECADE), BUCKET_COUNT - 1
+    )
+
+
+def _bucket_seconds(bucket: int) -> float:
+    """Returns the upper bound of the given bucket."""
+
+    return MIN_SECONDS * 10 ** ((bucket + 1) / BUCKETS_PER_DECADE)
+
+
+class Histogram:
+    """The call count, total and maximum time, and a logarithmic latency histogram of a single hook or method."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = _bucket(seconds)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def percentile(self, fraction: float) -> float:
+        """Returns an upper bound of the given percentile (from 0 to 1) of the latencies, within the bucket resolution."""
+
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(_bucket_seconds(bucket), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "buckets": sorted(self.buckets.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        result = cls()
+        result.count = data["count"]
+        result.total = data["total"]
+        result.max = data["max"]
+        result.buckets = {bucket: count for bucket, count in data["buckets"]}
+        return result
+
+
+class Profiler:
+    """
+    Latency histograms keyed by `hook.<name>` for `CatanBot` hooks and `api.<name>` for `API` methods.
+
+    Hook times include the API calls made inside them. A profiler may be shared by several games and by the hooks
+    a game calls concurrently, and profilers of different processes can be combined with `to_dict` and `merge`.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def add(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.histogram(name).add(seconds)
+
+    def merge(self, other: "Profiler") -> None:
+        with self.lock:
+            for name, histogram in other.histograms.items():
+                self.histogram(name).merge(histogram)
+
+    def report(self) -> Dict[str, dict]:
+        """Returns the summary of every histogram, sorted by total time."""
+
+        ordered: List[Tuple[str, Histogram]] = sorted(
+            self.histograms.items(), key=lambda item: -item[1].total
+        )
+        return {name: histogram.summary() for name, histogram in ordered}
+
+    def dump(self, path: str) -> None:
+        """Writes the report as JSON."""
+
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def to_dict(self) -> Dict[str, dict]:
+        """Returns the full histograms, for sending to another process."""
+
+        return {
+            name: histogram.to_dict() for name, histogram in self.histograms.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, dict]) -> "Profiler":
+        result = cls()
+        result.histograms = {
+            name: Histogram.from_dict(histogram) for name, histogram in data.items()
+        }
+        return result
+
+
+API_METHODS = tuple(
+    name
+    for name, value in vars(API).items()
+    if callable(value) and not name.startswith("_")
+)
+"""The names of all public `API` methods."""
+
+
+def _timed(name: str, method):
+    histogram_name = "api." + name
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._profiler.add(histogram_name, time.perf_counter() - start)
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def profiled_api_class(api_class: type) -> type:
+    """
+    Returns a subclass of the given `API` implementation which times every public `API` method into the
+    `Profiler` in its `_profiler` attribute.
+    """
+
+    methods = {
+        name: _timed(name, getattr(api_class, name))
+        for name in API_METHODS
+        if hasattr(api_class, name)
+    }
+    return type("Profiled" + api_class.__name__, (api_class,), methods)
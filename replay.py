@@ -0,0 +1,529 @@
+"""
+A compact binary replay format.
+
+A replay holds the board, the seed and the seats of a game, followed by every event the game recorded (see
+`API.get_events_since`) and every action the bots ran along with its `Exceptions` result, and ends with an index of
+the offset of each turn. Replays are memory-mapped when read, so a turn's records are read without parsing the turns
+before it, and `Replay.state_at` rebuilds the state at the start of any turn by applying the events before it:
+
+```python
+from bot import MyBot
+from replay import Replay, record_game
+
+record_game([MyBot] * 4, "game.ctnr", seed=1)
+with Replay("game.ctnr") as replay:
+    game = replay.game_at(50, [MyBot] * 4)
+    game.play_turn()
+```
+
+The layout, with little-endian integers:
+
+- The header: `MAGIC`, the version, player count, board radius, whether there is a seed and the seed, the land and
+  number of every terrain, the desert, the harbors, and the seats.
+- The records: an event is its `Events` type, a byte of `EVENT_*` flags, the player index, and the fields set by the
+  flags. An action is `ACTION_FLAG` with its index in `ACTION_METHODS`, the player index, the result and its
+  arguments, converted to `BoardTopology` IDs. An action follows the events it caused.
+- The index: the offset of the first record of every turn (the setup stage is part of turn 0).
+- The footer: the offset of the index, the number of turns and `INDEX_MAGIC`.
+"""
+
+import mmap
+import random
+import struct
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+
+from api import (
+    CatanBot,
+    DevelopmentCards,
+    Events,
+    Exceptions,
+    Lands,
+    ResourceCounts,
+    Resources,
+    Trade,
+)
+from board import Board, build_topology
+from engine import (
+    ACTION_METHODS,
+    MAX_TURNS,
+    EventRecord,
+    Game,
+    GameResult,
+    GameState,
+    PlayerAPI,
+)
+from placements import NO_PLAYER
+from topology import BoardTopology
+
+MAGIC = b"CTNR"
+INDEX_MAGIC = b"CTNI"
+VERSION = 1
+
+EVENT_OTHER_PLAYER = 1
+EVENT_TARGET = 2
+EVENT_RESOURCE_COUNTS = 4
+EVENT_VALUE = 8
+EVENT_PRIVATE = 16
+ACTION_FLAG = 0x80
+
+NO_ID = 0xFFFF
+"""The ID of an action argument which isn't a position on the board."""
+NO_NUMBER = -128
+"""An action argument which isn't a small integer."""
+
+ACTION_ARGUMENTS = {
+    "play_knight": "",
+    "play_road_building": "E",
+    "play_year_of_plenty": "c",
+    "play_monopoly": "n",
+    "build_road": "e",
+    "build_settlement": "i",
+    "build_city": "i",
+    "buy_development_card": "",
+    "maritime_trade": "nn",
+    "propose_trade_offer": "T",
+    "accept_trade_offer": "n",
+    "move_robber": "tn",
+    "set_resources_to_drop": "c",
+}
+"""
+The kinds of the arguments of each action: `i`, `e` and `t` are intersection, edge and terrain IDs, `E` a list of
+edge IDs, `c` resource counts, `T` a `Trade`, and `n` a small integer such as a resource or a player index.
+"""
+
+_HEADER = struct.Struct("<4sBBBBq")
+_FOOTER = struct.Struct("<QI4s")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_COUNTS = struct.Struct("<5b")
+_NUMBER = struct.Struct("<b")
+
+
+class ActionRecord(NamedTuple):
+    """An action run by a bot, with its arguments converted to `BoardTopology` IDs."""
+
+    player_index: int
+    method: str
+    """The name of the `API` method."""
+    arguments: tuple
+    result: Exceptions
+
+
+Record = Union[EventRecord, ActionRecord]
+
+
+def _clamp(value: int) -> int:
+    return max(-127, min(127, value))
+
+
+def _number(value) -> int:
+    try:
+        return _clamp(int(value))
+    except (TypeError, ValueError):
+        return NO_NUMBER
+
+
+def _counts(values) -> List[int]:
+    try:
+        values = [_number(value) for value in values]
+    except TypeError:
+        values = []
+    return values if len(values) == 5 else [NO_NUMBER] * 5
+
+
+def _id(ids: dict, key) -> int:
+    try:
+        result = ids.get(tuple(key))
+    except TypeError:
+        return NO_ID
+    return NO_ID if result is None else result
+
+
+def _edge_id(topology: BoardTopology, ends) -> int:
+    try:
+        a, b = ends
+        return _id(topology.edge_ids, (tuple(a), tuple(b)))
+    except (TypeError, ValueError):
+        return NO_ID
+
+
+def write_header(
+    board: Board, player_count: int, seed: Optional[int], seats: Sequence[str] = ()
+) -> bytes:
+    """Returns the header of a replay of a game on the board."""
+
+    radius = 0
+    while 3 * radius * (radius + 1) + 1 < board.topology.num_terrains:
+        radius += 1
+    result = bytearray(
+        _HEADER.pack(MAGIC, VERSION, player_count, radius, seed is not None, seed or 0)
+    )
+    result += bytes(int(land) for land in board.lands)
+    result += bytes(number or 0 for number in board.numbers)
+    result += _U16.pack(board.desert)
+    result += _U16.pack(len(board.harbors))
+    for edge_id, resource in board.harbors:
+        result += _U16.pack(edge_id)
+        result += _U8.pack(0xFF if resource is None else int(resource))
+    result += _U8.pack(len(seats))
+    for seat in seats:
+        encoded = seat.encode()
+        result += _U16.pack(len(encoded)) + encoded
+    return bytes(result)
+
+
+def read_header(data) -> Tuple[int, Optional[int], Board, List[str], int]:
+    """Returns the player count, seed, board and seats of a replay, and the offset of its first record."""
+
+    magic, version, player_count, radius, has_seed, seed = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} replay")
+
+    topology = build_topology(radius)
+    offset = _HEADER.size
+    count = topology.num_terrains
+    lands = [Lands(land) for land in data[offset : offset + count]]
+    offset += count
+    numbers = [number or None for number in data[offset : offset + count]]
+    offset += count
+    (desert,) = _U16.unpack_from(data, offset)
+    (harbor_count,) = _U16.unpack_from(data, offset + 2)
+    offset += 4
+    harbors = []
+    for _ in range(harbor_count):
+        (edge_id,) = _U16.unpack_from(data, offset)
+        resource = data[offset + 2]
+        harbors.append((edge_id, None if resource == 0xFF else Resources(resource)))
+        offset += 3
+    board = Board(topology, lands, numbers, harbors, desert)
+
+    seats = []
+    seat_count = data[offset]
+    offset += 1
+    for _ in range(seat_count):
+        (length,) = _U16.unpack_from(data, offset)
+        seats.append(bytes(data[offset + 2 : offset + 2 + length]).decode())
+        offset += 2 + length
+    return player_count, (seed if has_seed else None), board, seats, offset
+
+
+class ReplayWriter:
+    """
+    Records a game into a replay. Pass it as the `on_action` of a `Game`, and call `finish` once the game is over.
+
+    Events are read from the game's state, so the writer keeps no copy of them until the game is finished.
+    """
+
+    def __init__(self, seats: Sequence[str] = ()):
+        self.seats = list(seats)
+        self.actions: List[Tuple[int, ActionRecord]] = []
+        """Every action and the number of events recorded before it."""
+
+    def __call__(
+        self, context: PlayerAPI, method: str, arguments: tuple, result: Exceptions
+    ) -> None:
+        topology = context.topology
+        converted = []
+        for kind, argument in zip(ACTION_ARGUMENTS[method], arguments):
+            if kind == "i":
+                converted.append(_id(topology.intersection_ids, argument))
+            elif kind == "t":
+                converted.append(_id(topology.terrain_ids, argument))
+            elif kind == "e":
+                converted.append(_edge_id(topology, argument))
+            elif kind == "E":
+                try:
+                    converted.append(
+                        tuple(_edge_id(topology, ends) for ends in argument)[:255]
+                    )
+                except TypeError:
+                    converted.append(())
+            elif kind == "c":
+                converted.append(ResourceCounts(*_counts(argument)))
+            elif kind == "T":
+                give = getattr(argument, "give_counts", ())
+                receive = getattr(argument, "receive_counts", ())
+                converted.append(
+                    Trade(
+                        ResourceCounts(*_counts(give)),
+                        ResourceCounts(*_counts(receive)),
+                    )
+                )
+            else:
+                converted.append(_number(argument))
+        self.actions.append(
+            (
+                len(context.state.events) + context.state.event_offset,
+                ActionRecord(
+                    context.player_index, method, tuple(converted), Exceptions(result)
+                ),
+            )
+        )
+
+    def finish(self, game: Game) -> bytes:
+        """Returns the replay of the finished game."""
+
+        state = game.state
+        header = write_header(state.board, state.player_count, game.seed, self.seats)
+        body = bytearray()
+        turn_offsets = [len(header)]
+        actions = iter(self.actions)
+        next_action = next(actions, None)
+        for event_index, event in enumerate(state.events):
+            while next_action is not None and next_action[0] <= event_index:
+                _write_action(body, next_action[1])
+                next_action = next(actions, None)
+            write_event(body, event)
+            if event.type == Events.END_TURN:
+                turn_offsets.append(len(header) + len(body))
+        while next_action is not None:
+            _write_action(body, next_action[1])
+            next_action = next(actions, None)
+
+        index_offset = len(header) + len(body)
+        index = struct.pack(f"<{len(turn_offsets)}Q", *turn_offsets)
+        return (
+            header
+            + bytes(body)
+            + index
+            + _FOOTER.pack(index_offset, len(turn_offsets), INDEX_MAGIC)
+        )
+
+
+def write_event(body: bytearray, event: EventRecord) -> None:
+    flags = 0
+    fields = bytearray()
+    if event.other_player_index != NO_PLAYER:
+        flags |= EVENT_OTHER_PLAYER
+        fields += _U8.pack(event.other_player_index)
+    if event.target != -1:
+        flags |= EVENT_TARGET
+        fields += _U16.pack(event.target)
+    if event.resource_counts is not None:
+        flags |= EVENT_RESOURCE_COUNTS
+        fields += _COUNTS.pack(*event.resource_counts)
+    if event.value is not None:
+        flags |= EVENT_VALUE
+        fields += _U8.pack(int(event.value))
+    if event.private:
+        flags |= EVENT_PRIVATE
+    body += bytes((int(event.type), flags, event.player_index))
+    body += fields
+
+
+def _write_action(body: bytearray, action: ActionRecord) -> None:
+    body += bytes(
+        (
+            ACTION_FLAG | ACTION_METHODS.index(action.method),
+            action.player_index,
+            int(action.result),
+        )
+    )
+    for kind, argument in zip(ACTION_ARGUMENTS[action.method], action.arguments):
+        if kind in "iet":
+            body += _U16.pack(argument)
+        elif kind == "E":
+            body += _U8.pack(len(argument))
+            for edge_id in argument:
+                body += _U16.pack(edge_id)
+        elif kind == "c":
+            body += _COUNTS.pack(*argument)
+        elif kind == "T":
+            body += _COUNTS.pack(*argument.give_counts)
+            body += _COUNTS.pack(*argument.receive_counts)
+        else:
+            body += _NUMBER.pack(argument)
+
+
+class Replay:
+    """A memory-mapped replay file, which can be used as a context manager to close it."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._map
+
+        player_count, seed, board, seats, _ = read_header(data)
+        self.player_count: int = player_count
+        self.seed: Optional[int] = seed
+        self.board: Board = board
+        self.seats: List[str] = seats
+        """The bot spec of every player, if they were recorded."""
+
+        index_offset, turn_count, index_magic = _FOOTER.unpack_from(
+            data, len(data) - _FOOTER.size
+        )
+        if index_magic != INDEX_MAGIC:
+            raise ValueError(f"{path} has no turn index")
+        self._index_offset = index_offset
+        self.turn_offsets: Sequence[int] = struct.unpack_from(
+            f"<{turn_count}Q", data, index_offset
+        )
+        """The offset of the first record of each turn, and of the records after the last turn ended."""
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "Replay":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def turn_count(self) -> int:
+        """The number of turns which ended, not counting a turn in progress when the game stopped."""
+
+        return len(self.turn_offsets) - 1
+
+    def records(
+        self, start_turn: int = 0, end_turn: Optional[int] = None
+    ) -> Iterator[Record]:
+        """Yields the events and actions from the start of `start_turn` to the start of `end_turn` (or the end)."""
+
+        data = self._map
+        offset = self.turn_offsets[start_turn]
+        end = (
+            self._index_offset
+            if end_turn is None or end_turn >= len(self.turn_offsets)
+            else self.turn_offsets[end_turn]
+        )
+        while offset < end:
+            record, offset = read_record(data, offset)
+            yield record
+
+    def events(
+        self, start_turn: int = 0, end_turn: Optional[int] = None
+    ) -> Iterator[EventRecord]:
+        for record in self.records(start_turn, end_turn):
+            if isinstance(record, EventRecord):
+                yield record
+
+    def actions(
+        self, start_turn: int = 0, end_turn: Optional[int] = None
+    ) -> Iterator[ActionRecord]:
+        for record in self.records(start_turn, end_turn):
+            if isinstance(record, ActionRecord):
+                yield record
+
+    def state_at(self, turn: int, rng: Optional[random.Random] = None) -> GameState:
+        """
+        Returns the state at the start of the given turn, with the events before it.
+
+        Dice, steals and development cards after it are drawn from `rng`, which defaults to one seeded by the
+        replay's seed and the turn, so the undrawn development cards are shuffled.
+        """
+
+        if rng is None:
+            rng = random.Random(hash((self.seed or 0, turn)))
+        state = GameState(self.board, self.player_count, rng)
+        for event in self.events(0, turn):
+            state.apply(event)
+        return state
+
+    def game_at(
+        self,
+        turn: int,
+        bot_classes: Sequence[Type[CatanBot]],
+        max_turns: int = MAX_TURNS,
+        rng: Optional[random.Random] = None,
+    ) -> Game:
+        """
+        Returns a game continuing from the start of the given turn (after the setup stage) with the given bots.
+
+        The bots are newly set up, so they don't remember anything from the turns before.
+        """
+
+        if turn < 1:
+            raise ValueError(
+                "games can only continue from a turn after the setup stage"
+            )
+        return Game(
+            bot_classes,
+            seed=self.seed,
+            max_turns=max_turns,
+            state=self.state_at(turn, rng),
+        )
+
+
+def read_record(data, offset: int) -> Tuple[Record, int]:
+    kind = data[offset]
+    if kind & ACTION_FLAG:
+        method = ACTION_METHODS[kind & ~ACTION_FLAG]
+        player_index = data[offset + 1]
+        result = Exceptions(data[offset + 2])
+        offset += 3
+        arguments = []
+        for argument_kind in ACTION_ARGUMENTS[method]:
+            if argument_kind in "iet":
+                arguments.append(_U16.unpack_from(data, offset)[0])
+                offset += 2
+            elif argument_kind == "E":
+                count = data[offset]
+                arguments.append(struct.unpack_from(f"<{count}H", data, offset + 1))
+                offset += 1 + 2 * count
+            elif argument_kind == "c":
+                arguments.append(ResourceCounts(*_COUNTS.unpack_from(data, offset)))
+                offset += 5
+            elif argument_kind == "T":
+                arguments.append(
+                    Trade(
+                        ResourceCounts(*_COUNTS.unpack_from(data, offset)),
+                        ResourceCounts(*_COUNTS.unpack_from(data, offset + 5)),
+                    )
+                )
+                offset += 10
+            else:
+                arguments.append(_NUMBER.unpack_from(data, offset)[0])
+                offset += 1
+        return ActionRecord(player_index, method, tuple(arguments), result), offset
+
+    event_type = Events(kind)
+    flags = data[offset + 1]
+    player_index = data[offset + 2]
+    offset += 3
+    other = NO_PLAYER
+    target = -1
+    counts = None
+    value = None
+    if flags & EVENT_OTHER_PLAYER:
+        other = data[offset]
+        offset += 1
+    if flags & EVENT_TARGET:
+        (target,) = _U16.unpack_from(data, offset)
+        offset += 2
+    if flags & EVENT_RESOURCE_COUNTS:
+        counts = ResourceCounts(*_COUNTS.unpack_from(data, offset))
+        offset += 5
+    if flags & EVENT_VALUE:
+        value = data[offset]
+        if event_type in (Events.BUY_DEVELOPMENT_CARD, Events.PLAY_DEVELOPMENT_CARD):
+            value = DevelopmentCards(value)
+        offset += 1
+    record = EventRecord(
+        event_type,
+        player_index,
+        other,
+        target,
+        counts,
+        value,
+        bool(flags & EVENT_PRIVATE),
+    )
+    return record, offset
+
+
+def record_game(
+    bot_classes: Sequence[Type[CatanBot]],
+    path: str,
+    seed: Optional[int] = None,
+    max_turns: int = MAX_TURNS,
+    seats: Sequence[str] = (),
+) -> GameResult:
+    """Plays a game and writes its replay to the given path."""
+
+    writer = ReplayWriter(seats)
+    game = Game(bot_classes, seed=seed, max_turns=max_turns, on_action=writer)
+    result = game.run()
+    with open(path, "wb") as file:
+        file.write(writer.finish(game))
+    return result
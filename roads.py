@@ -0,0 +1,275 @@
+"""
+Incremental longest-road tracking.
+
+`RoadNetwork` splits every player's roads into connected components (roads meeting at an intersection which isn't
+another player's building), and caches the longest trail of each component. Building a road only recomputes the
+component it joins, and building a settlement only recomputes the components it cuts.
+
+`RoadNetwork.shortest_path` plans the roads a player has to build to reach an intersection, over the live board.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Set
+
+from placements import NO_PLAYER
+from topology import BoardTopology
+
+NO_COMPONENT = -1
+
+
+class RoadNetwork:
+    """
+    The road components of every player and the length of their longest trails, over `BoardTopology` IDs.
+
+    Reads the building and road owners owned by `LegalPlacements`, so it must be told about every road and
+    settlement after they are recorded there.
+    """
+
+    def __init__(
+        self,
+        topology: BoardTopology,
+        player_count: int,
+        building_owners: List[int],
+        road_owners: List[int],
+    ):
+        self.topology = topology
+        self.building_owners = building_owners
+        self.road_owners = road_owners
+
+        self.edge_components: List[int] = [NO_COMPONENT] * topology.num_edges
+        self.components: Dict[int, Set[int]] = {}
+        """The edges of each component."""
+        self.component_lengths: Dict[int, int] = {}
+        self.player_components: List[Set[int]] = [set() for _ in range(player_count)]
+        self.lengths: List[int] = [0] * player_count
+        """The longest road length of each player."""
+        self._next_component = 0
+
+    def copy(self, building_owners: List[int], road_owners: List[int]) -> "RoadNetwork":
+        """Returns a copy which reads the given building and road owners."""
+
+        result = object.__new__(RoadNetwork)
+        result.topology = self.topology
+        result.building_owners = building_owners
+        result.road_owners = road_owners
+        result.edge_components = self.edge_components[:]
+        result.components = {
+            component: set(edges) for component, edges in self.components.items()
+        }
+        result.component_lengths = dict(self.component_lengths)
+        result.player_components = [set(c) for c in self.player_components]
+        result.lengths = self.lengths[:]
+        result._next_component = self._next_component
+        return result
+
+    ### TRAILS ###
+
+    def _walk(self, player_index: int, edges: Set[int], start: int, used: set) -> int:
+        topology = self.topology
+        best = 0
+        for edge_id in topology.intersection_edges(start):
+            if edge_id in used or edge_id not in edges:
+                continue
+            a, b = topology.edge_intersections(edge_id)
+            end = b if a == start else a
+            owner = self.building_owners[end]
+            used.add(edge_id)
+            if owner == NO_PLAYER or owner == player_index:
+                length = 1 + self._walk(player_index, edges, end, used)
+            else:
+                length = 1
+            used.discard(edge_id)
+            if length > best:
+                best = length
+        return best
+
+    def trail_length(self, player_index: int, edges: Set[int]) -> int:
+        """Returns the longest trail over the given edges, which can't pass through other players' buildings."""
+
+        topology = self.topology
+        starts = set()
+        for edge_id in edges:
+            starts.update(topology.edge_intersections(edge_id))
+        best = 0
+        for start in starts:
+            length = self._walk(player_index, edges, start, set())
+            if length > best:
+                best = length
+        return best
+
+    def _connected_components(self, player_index: int, edge_id: int) -> Set[int]:
+        """Returns the player's components which a road at the given edge would connect to."""
+
+        topology = self.topology
+        components = set()
+        for end in topology.edge_intersections(edge_id):
+            owner = self.building_owners[end]
+            if owner != NO_PLAYER and owner != player_index:
+                continue
+            for other_edge in topology.intersection_edges(end):
+                if (
+                    other_edge != edge_id
+                    and self.road_owners[other_edge] == player_index
+                ):
+                    components.add(self.edge_components[other_edge])
+        return components
+
+    def _max_length(self, player_index: int, excluded: Iterable[int] = ()) -> int:
+        lengths = self.component_lengths
+        return max(
+            (
+                lengths[component]
+                for component in self.player_components[player_index]
+                if component not in excluded
+            ),
+            default=0,
+        )
+
+    ### QUERIES ###
+
+    def length_with(self, player_index: int, edge_id: int) -> int:
+        """Returns the player's longest road length if they built a road at the given empty edge."""
+
+        if self.road_owners[edge_id] != NO_PLAYER:
+            return self.lengths[player_index]
+        joined = self._connected_components(player_index, edge_id)
+        edges = {edge_id}
+        for component in joined:
+            edges |= self.components[component]
+        return max(
+            self.trail_length(player_index, edges),
+            self._max_length(player_index, joined),
+        )
+
+    def network_intersections(self, player_index: int) -> Set[int]:
+        """Returns the intersections a new road of the player can start from: their buildings and the ends of their roads which aren't other players' buildings."""
+
+        topology = self.topology
+        result = {
+            intersection_id
+            for intersection_id, owner in enumerate(self.building_owners)
+            if owner == player_index
+        }
+        for component in self.player_components[player_index]:
+            for edge_id in self.components[component]:
+                for end in topology.edge_intersections(edge_id):
+                    owner = self.building_owners[end]
+                    if owner == NO_PLAYER or owner == player_index:
+                        result.add(end)
+        return result
+
+    def shortest_path(
+        self, player_index: int, target: int, max_length: Optional[int] = None
+    ) -> Optional[List[int]]:
+        """
+        Returns the fewest empty edges the player has to build roads on to reach the target intersection, ordered from
+        their network to the target, or None if it can't be reached (within `max_length` roads, if given).
+
+        Roads can't pass through other players' buildings or roads. The search is an A* search guided by
+        `BoardTopology.distance`, so it only explores around the path when it isn't blocked.
+        """
+
+        topology = self.topology
+        sources = self.network_intersections(player_index)
+        if target in sources:
+            return []
+        # Ties between estimates are broken towards longer paths, which are closer to the target.
+        queue = [(topology.distance(source, target), 0, source) for source in sources]
+        heapq.heapify(queue)
+        lengths = {source: 0 for source in sources}
+        came_from: Dict[int, int] = {}
+        """The edge each reached intersection was reached by."""
+        while queue:
+            _, negative_length, intersection_id = heapq.heappop(queue)
+            length = -negative_length
+            if intersection_id == target:
+                path = []
+                while intersection_id not in sources:
+                    edge_id = came_from[intersection_id]
+                    path.append(edge_id)
+                    a, b = topology.edge_intersections(edge_id)
+                    intersection_id = a if b == intersection_id else b
+                return path[::-1]
+            if length > lengths[intersection_id]:
+                continue
+            owner = self.building_owners[intersection_id]
+            if owner != NO_PLAYER and owner != player_index:
+                continue
+            if max_length is not None and length >= max_length:
+                continue
+            for edge_id in topology.intersection_edges(intersection_id):
+                if self.road_owners[edge_id] != NO_PLAYER:
+                    continue
+                a, b = topology.edge_intersections(edge_id)
+                neighbor = b if a == intersection_id else a
+                if length + 1 < lengths.get(neighbor, length + 2):
+                    lengths[neighbor] = length + 1
+                    came_from[neighbor] = edge_id
+                    heapq.heappush(
+                        queue,
+                        (
+                            length + 1 + topology.distance(neighbor, target),
+                            -length - 1,
+                            neighbor,
+                        ),
+                    )
+        return None
+
+    ### EVENTS ###
+
+    def _add_component(self, player_index: int, edges: Set[int]) -> None:
+        component = self._next_component
+        self._next_component += 1
+        self.components[component] = edges
+        self.component_lengths[component] = self.trail_length(player_index, edges)
+        self.player_components[player_index].add(component)
+        for edge_id in edges:
+            self.edge_components[edge_id] = component
+
+    def _remove_component(self, player_index: int, component: int) -> Set[int]:
+        self.player_components[player_index].discard(component)
+        del self.component_lengths[component]
+        return self.components.pop(component)
+
+    def add_road(self, player_index: int, edge_id: int) -> None:
+        edges = {edge_id}
+        for component in self._connected_components(player_index, edge_id):
+            edges |= self._remove_component(player_index, component)
+        self._add_component(player_index, edges)
+        self.lengths[player_index] = self._max_length(player_index)
+
+    def add_settlement(self, player_index: int, intersection_id: int) -> List[int]:
+        """Splits the other players' components passing through the settlement, and returns the players whose road length changed."""
+
+        topology = self.topology
+        cut = {}
+        for edge_id in topology.intersection_edges(intersection_id):
+            owner = self.road_owners[edge_id]
+            if owner != NO_PLAYER and owner != player_index:
+                cut.setdefault(owner, set()).add(self.edge_components[edge_id])
+
+        changed = []
+        for owner, components in sorted(cut.items()):
+            for component in components:
+                remaining = self._remove_component(owner, component)
+                while remaining:
+                    # Flood fill a new component through intersections which aren't other players' buildings.
+                    edges = set()
+                    frontier = [remaining.pop()]
+                    while frontier:
+                        current = frontier.pop()
+                        edges.add(current)
+                        for end in topology.edge_intersections(current):
+                            building_owner = self.building_owners[end]
+                            if building_owner != NO_PLAYER and building_owner != owner:
+                                continue
+                            for other_edge in topology.intersection_edges(end):
+                                if other_edge in remaining:
+                                    remaining.discard(other_edge)
+                                    frontier.append(other_edge)
+                    self._add_component(owner, edges)
+            length = self._max_length(owner)
+            if length != self.lengths[owner]:
+                self.lengths[owner] = length
+                changed.append(owner)
+        return changed
@@ -0,0 +1,26 @@
+from api import DevelopmentCards, Event, Events, ResourceCounts
+from hands import HandTracker
+
+
+def test_monopoly_takes_every_card_of_the_resource():
+    hands = HandTracker(0)
+    hands.update(
+        [
+            Event(Events.PRODUCE, 1, resource_counts=ResourceCounts(ore=2, wool=1)),
+            Event(Events.PRODUCE, 2, resource_counts=ResourceCounts(ore=1, grain=1)),
+            Event(Events.STEAL, 3, 1),
+            Event(Events.STEAL, 3, 2),
+        ]
+    )
+    assert len(hands.hands(1)) == 2 and len(hands.hands(2)) == 2
+
+    # Player 1 lost a single ore, so the hidden steal took the other one, and nobody else had any left.
+    hands.update(
+        [
+            Event(Events.PLAY_DEVELOPMENT_CARD, 0, value=DevelopmentCards.MONOPOLY),
+            Event(Events.STEAL, 0, 1, resource_counts=ResourceCounts(ore=1)),
+        ]
+    )
+    assert hands.hands(1) == {(0, 0, 0, 1, 0): 1.0}
+    assert hands.hands(2) == {(0, 0, 1, 0, 0): 1.0}
+    assert hands.hands(3) == {(0, 0, 1, 1, 0): 1.0}
@@ -0,0 +1,19 @@
+from baselines import RandomBot
+from engine import Game
+from isolation import isolated, shutdown
+from mcts import MCTSBot
+
+
+class QuickMCTSBot(MCTSBot):
+    seconds = 0.01
+
+
+def test_isolated_bot_forks_and_searches():
+    game = Game(
+        [isolated(QuickMCTSBot), RandomBot, RandomBot, RandomBot], seed=3, max_turns=20
+    )
+    try:
+        game.run()
+    finally:
+        shutdown(game)
+    assert game.bot_errors == [0, 0, 0, 0]
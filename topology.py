@@ -0,0 +1,239 @@
+"""
+A precomputed index of the board's topology.
+
+`BoardTopology` assigns dense integer IDs to every terrain, intersection and edge, and stores the adjacency between them
+as compact arrays in CSR form (an `indptr` array of row offsets and an `indices` array of neighbour IDs),
+so topology queries are array slices instead of `API` calls.
+"""
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from api import API, Position
+
+Edge = Tuple[Position, Position]
+"""An edge, as the positions of its two ends."""
+
+
+def _csr(rows: Sequence[Iterable[int]]) -> Tuple[array, array]:
+    indptr = array("i", [0])
+    indices = array("i")
+    for row in rows:
+        indices.extend(row)
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+class BoardTopology:
+    """
+    Dense integer IDs and CSR adjacency arrays for a board.
+
+    Terrains, intersections and edges are numbered from 0 in the order they were given.
+    The topology never changes during a game, so build it once (see `from_api`) and share it.
+    """
+
+    def __init__(
+        self,
+        terrains: Sequence[Position],
+        intersections: Sequence[Position],
+        edges: Sequence[Edge],
+        terrain_intersections: Dict[Position, Sequence[Position]],
+    ):
+        """
+        Builds the index from the board's positions.
+
+        `terrain_intersections` maps every terrain position to the positions of its surrounding intersections.
+        """
+
+        self.terrain_positions: List[Position] = [tuple(t) for t in terrains]
+        self.intersection_positions: List[Position] = [tuple(i) for i in intersections]
+        self.edge_positions: List[Edge] = [(tuple(a), tuple(b)) for a, b in edges]
+
+        self.terrain_ids: Dict[Position, int] = {
+            position: terrain_id
+            for terrain_id, position in enumerate(self.terrain_positions)
+        }
+        self.intersection_ids: Dict[Position, int] = {
+            position: intersection_id
+            for intersection_id, position in enumerate(self.intersection_positions)
+        }
+        self.edge_ids: Dict[Edge, int] = {}
+        for edge_id, (a, b) in enumerate(self.edge_positions):
+            self.edge_ids[(a, b)] = edge_id
+            self.edge_ids[(b, a)] = edge_id
+
+        self.num_terrains = len(self.terrain_positions)
+        self.num_intersections = len(self.intersection_positions)
+        self.num_edges = len(self.edge_positions)
+
+        self.edge_ends = array("i")
+        """The intersection IDs of the ends of edge `e` are at `edge_ends[2 * e]` and `edge_ends[2 * e + 1]`."""
+        intersection_neighbors: List[List[int]] = [
+            [] for _ in range(self.num_intersections)
+        ]
+        intersection_edges: List[List[int]] = [
+            [] for _ in range(self.num_intersections)
+        ]
+        for edge_id, (a, b) in enumerate(self.edge_positions):
+            a_id, b_id = self.intersection_ids[a], self.intersection_ids[b]
+            self.edge_ends.append(a_id)
+            self.edge_ends.append(b_id)
+            intersection_neighbors[a_id].append(b_id)
+            intersection_neighbors[b_id].append(a_id)
+            intersection_edges[a_id].append(edge_id)
+            intersection_edges[b_id].append(edge_id)
+
+        terrain_rows: List[List[int]] = []
+        intersection_terrains: List[List[int]] = [
+            [] for _ in range(self.num_intersections)
+        ]
+        for terrain_id, position in enumerate(self.terrain_positions):
+            row = [
+                self.intersection_ids[tuple(i)] for i in terrain_intersections[position]
+            ]
+            terrain_rows.append(row)
+            for intersection_id in row:
+                intersection_terrains[intersection_id].append(terrain_id)
+
+        terrain_edges: List[List[int]] = []
+        for row in terrain_rows:
+            corners = set(row)
+            terrain_edges.append(
+                sorted(
+                    {
+                        edge_id
+                        for intersection_id in row
+                        for edge_id in intersection_edges[intersection_id]
+                        if self.edge_ends[2 * edge_id] in corners
+                        and self.edge_ends[2 * edge_id + 1] in corners
+                    }
+                )
+            )
+
+        self.terrain_intersections_indptr, self.terrain_intersections_indices = _csr(
+            terrain_rows
+        )
+        self.terrain_edges_indptr, self.terrain_edges_indices = _csr(terrain_edges)
+        self.intersection_terrains_indptr, self.intersection_terrains_indices = _csr(
+            intersection_terrains
+        )
+        self.intersection_neighbors_indptr, self.intersection_neighbors_indices = _csr(
+            intersection_neighbors
+        )
+        self.intersection_edges_indptr, self.intersection_edges_indices = _csr(
+            intersection_edges
+        )
+        self._distances: Optional[array] = None
+
+    @classmethod
+    def from_api(cls, api: API) -> "BoardTopology":
+        """Builds the topology of the current game's board, using one `get_adjacent_intersections` call per terrain."""
+
+        terrains = api.get_terrains()
+        return cls(
+            terrains,
+            api.get_intersections(),
+            api.get_edges(),
+            {
+                tuple(terrain): api.get_adjacent_intersections(terrain)
+                for terrain in terrains
+            },
+        )
+
+    ### ID LOOKUPS ###
+
+    def terrain_id(self, position: Position) -> int:
+        """Returns the ID of the terrain at the given position."""
+
+        return self.terrain_ids[position]
+
+    def intersection_id(self, position: Position) -> int:
+        """Returns the ID of the intersection at the given position."""
+
+        return self.intersection_ids[position]
+
+    def edge_id(self, ends: Edge) -> int:
+        """
+        Returns the ID of the edge between the given positions.
+
+        **Note:** the order of the `ends` doesn't matter.
+        """
+
+        return self.edge_ids[ends]
+
+    ### ADJACENCY ###
+
+    def terrain_intersections(self, terrain_id: int) -> array:
+        """Returns the IDs of the intersections around the given terrain."""
+
+        indptr = self.terrain_intersections_indptr
+        return self.terrain_intersections_indices[
+            indptr[terrain_id] : indptr[terrain_id + 1]
+        ]
+
+    def terrain_edges(self, terrain_id: int) -> array:
+        """Returns the IDs of the edges around the given terrain."""
+
+        indptr = self.terrain_edges_indptr
+        return self.terrain_edges_indices[indptr[terrain_id] : indptr[terrain_id + 1]]
+
+    def intersection_terrains(self, intersection_id: int) -> array:
+        """Returns the IDs of the terrains adjacent to the given intersection."""
+
+        indptr = self.intersection_terrains_indptr
+        return self.intersection_terrains_indices[
+            indptr[intersection_id] : indptr[intersection_id + 1]
+        ]
+
+    def intersection_neighbors(self, intersection_id: int) -> array:
+        """Returns the IDs of the intersections one edge away from the given intersection."""
+
+        indptr = self.intersection_neighbors_indptr
+        return self.intersection_neighbors_indices[
+            indptr[intersection_id] : indptr[intersection_id + 1]
+        ]
+
+    def intersection_edges(self, intersection_id: int) -> array:
+        """Returns the IDs of the edges touching the given intersection."""
+
+        indptr = self.intersection_edges_indptr
+        return self.intersection_edges_indices[
+            indptr[intersection_id] : indptr[intersection_id + 1]
+        ]
+
+    def edge_intersections(self, edge_id: int) -> Tuple[int, int]:
+        """Returns the IDs of the intersections at the ends of the given edge."""
+
+        return self.edge_ends[2 * edge_id], self.edge_ends[2 * edge_id + 1]
+
+    ### DISTANCES ###
+
+    def distances(self) -> array:
+        """
+        Returns the edge distances between all pairs of intersections, computed on the first call: the distance between
+        `x` and `y` is at `x * num_intersections + y`.
+        """
+
+        if self._distances is None:
+            count = self.num_intersections
+            distances = array("i", [-1]) * (count * count)
+            for source in range(count):
+                row = source * count
+                distances[row + source] = 0
+                frontier = [source]
+                while frontier:
+                    next_frontier = []
+                    for intersection_id in frontier:
+                        distance = distances[row + intersection_id] + 1
+                        for neighbor in self.intersection_neighbors(intersection_id):
+                            if distances[row + neighbor] == -1:
+                                distances[row + neighbor] = distance
+                                next_frontier.append(neighbor)
+                    frontier = next_frontier
+            self._distances = distances
+        return self._distances
+
+    def distance(self, x: int, y: int) -> int:
+        """Returns the edge distance between the two intersections."""
+
+        return self.distances()[x * self.num_intersections + y]
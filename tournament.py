@@ -0,0 +1,341 @@
+"""
+A multi-process tournament runner.
+
+Every game is fully determined by its seed and lineup, so results are reproducible from the seed list regardless
+of how many workers ran them:
+
+```
+python tournament.py bot.MyBot baselines.RandomBot --games 10000 --workers 8
+```
+"""
+
+import argparse
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from api import CatanBot
+from engine import MAX_TURNS, Game
+from opening_book import OPENING_BOOK_ENV
+from profiling import Profiler
+from replay import ReplayWriter
+
+PLAYER_COUNT = 4
+Z_95 = 1.959963984540054
+
+
+def load_bot(spec: str) -> type:
+    """Returns the bot class of a spec in the form `module.ClassName`, such as `bot.MyBot`."""
+
+    module_name, _, class_name = spec.rpartition(".")
+    bot_class = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(bot_class, type) and issubclass(bot_class, CatanBot)):
+        raise TypeError(f"{spec} is not a CatanBot")
+    return bot_class
+
+
+def seat_lineup(lineup: Sequence[str], game_index: int) -> List[str]:
+    """Rotates the lineup by the game index, so every bot plays from every seat equally often."""
+
+    shift = game_index % len(lineup)
+    return list(lineup[shift:]) + list(lineup[:shift])
+
+
+@dataclass
+class GameSettings:
+    """The settings shared by every game of a tournament."""
+
+    max_turns: int = MAX_TURNS
+    profile: bool = False
+    hook_time_limit: Optional[float] = None
+    game_time_limit: Optional[float] = None
+    replay_directory: Optional[str] = None
+    """Write the replay of every game to `<seed>.ctnr` in this directory, if given."""
+
+
+@dataclass
+class GameRecord:
+    """The result of a single tournament game."""
+
+    game_index: int
+    seed: int
+    seats: List[str]
+    """The bot spec of each player index."""
+    winner: Optional[int]
+    victory_points: List[int]
+    turns: int
+    bot_errors: List[int]
+    timeouts: List[int] = field(default_factory=list)
+    profile: Optional[dict] = None
+    """The `Profiler.to_dict` of the game, if it was profiled."""
+
+
+def play_game(game: Tuple[int, int, Sequence[str], GameSettings]) -> GameRecord:
+    """Plays a single game of (index, seed, seats, settings). Bots using the global `random` module are seeded too."""
+
+    game_index, seed, seats, settings = game
+    random.seed(seed)
+    profiler = Profiler() if settings.profile else None
+    writer = ReplayWriter(seats) if settings.replay_directory else None
+    played = Game(
+        [load_bot(spec) for spec in seats],
+        seed=seed,
+        max_turns=settings.max_turns,
+        profiler=profiler,
+        hook_time_limit=settings.hook_time_limit,
+        game_time_limit=settings.game_time_limit,
+        on_action=writer,
+    )
+    result = played.run()
+    if writer is not None:
+        path = os.path.join(settings.replay_directory, f"{seed}.ctnr")
+        with open(path, "wb") as file:
+            file.write(writer.finish(played))
+    return GameRecord(
+        game_index,
+        seed,
+        list(seats),
+        result.winner,
+        result.victory_points,
+        result.turns,
+        played.bot_errors,
+        played.timeouts,
+        profiler.to_dict() if profiler else None,
+    )
+
+
+@dataclass
+class BotStats:
+    """Aggregated statistics of a single bot spec, over every seat it played."""
+
+    games: int = 0
+    wins: int = 0
+    victory_points: int = 0
+    victory_points_squared: int = 0
+    errors: int = 0
+    timeouts: int = 0
+
+    def add(self, won: bool, victory_points: int, errors: int, timeouts: int) -> None:
+        self.games += 1
+        self.wins += won
+        self.victory_points += victory_points
+        self.victory_points_squared += victory_points * victory_points
+        self.errors += errors
+        self.timeouts += timeouts
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    def win_rate_interval(self, z: float = Z_95) -> Tuple[float, float]:
+        """Returns the Wilson score interval of the win rate."""
+
+        if not self.games:
+            return 0.0, 1.0
+        n, p = self.games, self.win_rate
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    @property
+    def average_victory_points(self) -> float:
+        return self.victory_points / self.games if self.games else 0.0
+
+    def victory_points_interval(self, z: float = Z_95) -> Tuple[float, float]:
+        """Returns the normal approximation interval of the average victory points."""
+
+        if self.games < 2:
+            return 0.0, float("inf")
+        mean = self.average_victory_points
+        variance = (self.victory_points_squared - self.games * mean * mean) / (
+            self.games - 1
+        )
+        margin = z * math.sqrt(max(variance, 0.0) / self.games)
+        return mean - margin, mean + margin
+
+    def summary(self) -> dict:
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.win_rate,
+            "win_rate_95": self.win_rate_interval(),
+            "average_victory_points": self.average_victory_points,
+            "victory_points_95": self.victory_points_interval(),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+@dataclass
+class TournamentStats:
+    """Statistics aggregated from `GameRecord`s in any order."""
+
+    games: int = 0
+    unfinished: int = 0
+    turns: int = 0
+    bots: Dict[str, BotStats] = field(default_factory=dict)
+
+    def add(self, record: GameRecord) -> None:
+        self.games += 1
+        self.turns += record.turns
+        self.unfinished += record.winner is None
+        for player_index, spec in enumerate(record.seats):
+            self.bots.setdefault(spec, BotStats()).add(
+                record.winner == player_index,
+                record.victory_points[player_index],
+                record.bot_errors[player_index],
+                record.timeouts[player_index],
+            )
+
+    @property
+    def average_turns(self) -> float:
+        return self.turns / self.games if self.games else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "games": self.games,
+            "unfinished": self.unfinished,
+            "average_turns": self.average_turns,
+            "bots": {
+                spec: stats.summary() for spec, stats in sorted(self.bots.items())
+            },
+        }
+
+
+def schedule(
+    lineup: Sequence[str], seeds: Iterable[int], settings: GameSettings
+) -> List[Tuple[int, int, List[str], GameSettings]]:
+    """Returns the games of a tournament, as arguments of `play_game`."""
+
+    return [
+        (game_index, seed, seat_lineup(lineup, game_index), settings)
+        for game_index, seed in enumerate(seeds)
+    ]
+
+
+def run_games(
+    games: Sequence[Tuple[int, int, Sequence[str], GameSettings]], workers: int = 1
+) -> Iterator[GameRecord]:
+    """Plays the given games across a process pool, yielding each record as soon as it finishes."""
+
+    if workers <= 1:
+        yield from map(play_game, games)
+        return
+    chunksize = max(1, min(64, len(games) // (workers * 8)))
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(play_game, games, chunksize=chunksize)
+
+
+def run_tournament(
+    lineup: Sequence[str],
+    seeds: Iterable[int],
+    workers: int = 1,
+    max_turns: int = MAX_TURNS,
+    on_record: Optional[Callable[[GameRecord], None]] = None,
+    profiler: Optional[Profiler] = None,
+    hook_time_limit: Optional[float] = None,
+    game_time_limit: Optional[float] = None,
+    replay_directory: Optional[str] = None,
+) -> TournamentStats:
+    """
+    Plays one game per seed, rotating the seats of the lineup, and aggregates the results.
+
+    `on_record` is called with every game's record as it is streamed back from the workers.
+    If a `profiler` is given, every game is profiled and merged into it.
+    The time limits are passed to every `Game`, and the replays are written to `replay_directory` if given.
+    """
+
+    for spec in set(lineup):
+        load_bot(spec)  # Fail early on a bad spec, before starting the workers.
+    stats = TournamentStats()
+    if replay_directory is not None:
+        os.makedirs(replay_directory, exist_ok=True)
+    settings = GameSettings(
+        max_turns,
+        profiler is not None,
+        hook_time_limit,
+        game_time_limit,
+        replay_directory,
+    )
+    games = schedule(lineup, seeds, settings)
+    for record in run_games(games, workers):
+        stats.add(record)
+        if profiler is not None and record.profile is not None:
+            profiler.merge(Profiler.from_dict(record.profile))
+        if on_record is not None:
+            on_record(record)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "bots",
+        nargs="+",
+        help="bot specs such as bot.MyBot; the last one fills the remaining seats",
+    )
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="the first game seed")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument(
+        "--records", help="write every game record to this JSON lines file"
+    )
+    parser.add_argument(
+        "--profile", help="time every hook and API call, and write a JSON report here"
+    )
+    parser.add_argument(
+        "--hook-time", type=float, help="the seconds a bot may spend in a single hook"
+    )
+    parser.add_argument(
+        "--game-time", type=float, help="the seconds a bot may spend in a whole game"
+    )
+    parser.add_argument(
+        "--replays", help="write the replay of every game to this directory"
+    )
+    parser.add_argument(
+        "--opening-book",
+        help="share the opening placements of bots which use one in this database",
+    )
+    args = parser.parse_args()
+    if args.opening_book:
+        # The workers inherit the environment, and bots find the book through it.
+        os.environ[OPENING_BOOK_ENV] = os.path.abspath(args.opening_book)
+
+    lineup = args.bots[:PLAYER_COUNT]
+    lineup += lineup[-1:] * (PLAYER_COUNT - len(lineup))
+    seeds = range(args.seed, args.seed + args.games)
+
+    records = open(args.records, "w") if args.records else None
+    profiler = Profiler() if args.profile else None
+    try:
+        stats = run_tournament(
+            lineup,
+            seeds,
+            args.workers,
+            args.max_turns,
+            (
+                (lambda record: records.write(json.dumps(asdict(record)) + "\n"))
+                if records
+                else None
+            ),
+            profiler,
+            args.hook_time,
+            args.game_time,
+            args.replays,
+        )
+    finally:
+        if records:
+            records.close()
+    if profiler is not None:
+        profiler.dump(args.profile)
+    print(json.dumps(stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
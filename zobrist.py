@@ -0,0 +1,88 @@
+"""
+Zobrist hashing of game states.
+
+A state's hash is the XOR of a random 64-bit key per feature of the state (each building, road, the robber's
+position, each player's count of each resource and development card, and whose turn it is), so `GameState` can
+update it in O(1) per change by XORing the keys of the old and new values.
+"""
+
+import functools
+import random
+from typing import List
+
+from topology import BoardTopology
+
+RESOURCE_COUNT = 5
+DEVELOPMENT_CARD_COUNT = 5
+BUILDING_COUNT = 2
+MAX_COUNT = 25
+"""The largest count of a single resource or development card (or army size) a player can have."""
+COUNT_STRIDE = MAX_COUNT + 1
+SEED = 0x5EED
+
+
+class ZobristKeys:
+    """
+    The random keys of every feature of a game state, indexed by `BoardTopology` IDs.
+
+    The key of a zero count is 0, so an empty hand or army doesn't contribute to the hash.
+    """
+
+    def __init__(self, topology: BoardTopology, player_count: int, seed: int = SEED):
+        rng = random.Random(seed)
+        self.player_count = player_count
+
+        def keys(count: int) -> List[int]:
+            return [rng.getrandbits(64) for _ in range(count)]
+
+        def count_keys(features: int) -> List[int]:
+            result = keys(features * COUNT_STRIDE)
+            for feature in range(features):
+                result[feature * COUNT_STRIDE] = 0
+            return result
+
+        self.buildings = keys(
+            topology.num_intersections * player_count * BUILDING_COUNT
+        )
+        self.roads = keys(topology.num_edges * player_count)
+        self.robber = keys(topology.num_terrains)
+        self.current_player = keys(player_count)
+        self.played_development_card = rng.getrandbits(64)
+        self.resources = count_keys(player_count * RESOURCE_COUNT)
+        self.development_cards = count_keys(player_count * DEVELOPMENT_CARD_COUNT)
+        self.new_development_cards = count_keys(player_count * DEVELOPMENT_CARD_COUNT)
+        self.army_sizes = count_keys(player_count)
+
+    def building(self, intersection_id: int, player_index: int, building: int) -> int:
+        return self.buildings[
+            (intersection_id * self.player_count + player_index) * BUILDING_COUNT
+            + building
+        ]
+
+    def road(self, edge_id: int, player_index: int) -> int:
+        return self.roads[edge_id * self.player_count + player_index]
+
+    def resource(self, player_index: int, resource: int, count: int) -> int:
+        return self.resources[
+            (player_index * RESOURCE_COUNT + resource) * COUNT_STRIDE + count
+        ]
+
+    def development_card(self, player_index: int, card: int, count: int) -> int:
+        return self.development_cards[
+            (player_index * DEVELOPMENT_CARD_COUNT + card) * COUNT_STRIDE + count
+        ]
+
+    def new_development_card(self, player_index: int, card: int, count: int) -> int:
+        return self.new_development_cards[
+            (player_index * DEVELOPMENT_CARD_COUNT + card) * COUNT_STRIDE + count
+        ]
+
+    def army_size(self, player_index: int, size: int) -> int:
+        return self.army_sizes[player_index * COUNT_STRIDE + size]
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_keys(topology: BoardTopology, player_count: int) -> ZobristKeys:
+    """Returns the shared keys for the given topology and player count."""
+
+    return ZobristKeys(topology, player_count)